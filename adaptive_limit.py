@@ -0,0 +1,106 @@
+"""
+自适应并发控制（AIMD）
+功能：每个后端一个并发上限，延迟和错误率正常时每完成约 limit 个请求加 1（加性增），
+遇到 429、超时/失败或延迟突增时减半（乘性减），
+这样同一个后端在不同时段都能自动运行在接近其真实容量的并发数上
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+# 延迟超过基线的多少倍视为突增
+LATENCY_FACTOR = 2.0
+
+# 基线延迟的指数移动平均系数
+BASELINE_ALPHA = 0.1
+
+# 至少有这么多个成功样本后才按延迟判断
+MIN_SAMPLES = 5
+
+
+class AIMDLimiter:
+    """
+    可调整上限的信号量
+    用法：acquire() 后调用 release(latency, ok)，被限流时另外调用 congested()
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None,
+                 increase: float = 1.0, decrease: float = 0.5, adaptive: bool = True):
+        self.maximum = max(1, int(maximum))
+        self.minimum = max(1, min(int(minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.adaptive = adaptive
+        if not adaptive:
+            initial = self.maximum
+        self.limit = float(max(self.minimum, min(initial or min(2, self.maximum), self.maximum)))
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self.samples = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def current(self) -> int:
+        """当前的并发上限"""
+        return int(self.limit)
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, ok: bool = True):
+        """归还一个并发名额，并根据本次请求的结果调整上限"""
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if self.adaptive:
+                if not ok:
+                    self._decrease()
+                elif latency is not None:
+                    self._observe(latency)
+            self._cond.notify_all()
+
+    def congested(self):
+        """收到 429 等过载信号时立即降低上限"""
+        with self._cond:
+            if self.adaptive:
+                self._decrease()
+
+    def _observe(self, latency: float):
+        spike = (self.baseline is not None and self.samples >= MIN_SAMPLES
+                 and latency > self.baseline * LATENCY_FACTOR)
+        self.baseline = latency if self.baseline is None else (
+            self.baseline + BASELINE_ALPHA * (latency - self.baseline))
+        self.samples += 1
+        if spike:
+            self._decrease()
+        else:
+            # 每完成约 limit 个健康请求上限加 increase
+            self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def _decrease(self):
+        # 同一批过载信号只减一次：距上次减少不足一个基线延迟时忽略
+        now = time.monotonic()
+        if now - self._last_decrease < max(self.baseline or 0.0, 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.decreases += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release(ok=exc_type is None)
+        return False
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"limit": self.current, "in_flight": self.in_flight,
+                    "baseline": self.baseline or 0.0, "decreases": self.decreases}
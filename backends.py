@@ -0,0 +1,154 @@
+"""
+模型后端注册表
+功能：登记所有 OpenAI 兼容的接口（地址、模型、默认参数、并发上限），
+内置 glm/deepseek/qwen/gpt，也可以从 backends.json 或模型配置中声明新的后端，
+包括局域网或本机上的 llama.cpp / vLLM 等服务
+"""
+
+import ipaddress
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import usage_tracker
+from adaptive_limit import AIMDLimiter
+
+
+# 额外后端的配置文件，默认位于程序目录
+BACKENDS_FILE = os.getenv("BACKENDS_FILE", "backends.json")
+
+
+def is_local_url(url: str) -> bool:
+    """地址是否指向本机或局域网服务（回环地址、私有网段、localhost）"""
+    host = urlsplit(url if "://" in url else "//" + url).hostname or ""
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return host == "localhost" or host.endswith(".localhost")
+    return address.is_loopback or address.is_private
+
+
+class Backend:
+    """一个 OpenAI 兼容的模型后端"""
+
+    def __init__(self, name: str, base_url: str, model: str, params: Optional[dict] = None,
+                 max_concurrency: int = 16, request_interval: float = 1.0,
+                 api_key_required: bool = True, adaptive: bool = True, min_concurrency: int = 1):
+        self.name = name.lower()
+        self.base_url = base_url
+        self.model = model
+        self.params = params or {}  # 请求时附带的默认参数，如 temperature、top_p
+        self.max_concurrency = max(1, int(max_concurrency))  # 自适应时为并发上限的上界
+        self.request_interval = request_interval  # 每次请求后的等待时间（秒），本地服务可设为 0
+        self.api_key_required = api_key_required
+        self.adaptive = adaptive
+        self.min_concurrency = min_concurrency
+        # AIMD 并发控制；adaptive 为 False 时固定为 max_concurrency
+        self.slots = AIMDLimiter(self.max_concurrency, min_concurrency, adaptive=adaptive)
+
+    @property
+    def is_local(self) -> bool:
+        """是否为本机或局域网服务"""
+        return is_local_url(self.base_url)
+
+    def override(self, base_url: str = "", model: str = "") -> "Backend":
+        """返回替换了地址或模型的副本（共享并发限制）"""
+        if (not base_url or base_url == self.base_url) and (not model or model == self.model):
+            return self
+        backend = Backend(self.name, base_url or self.base_url, model or self.model, self.params,
+                          self.max_concurrency, self.request_interval, self.api_key_required,
+                          self.adaptive, self.min_concurrency)
+        backend.slots = self.slots
+        return backend
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "Backend":
+        """从配置字典创建后端"""
+        base_url = data.get("base_url", "")
+        local = is_local_url(base_url)
+        return cls(
+            name=name,
+            base_url=base_url,
+            model=data.get("model", name),
+            params=data.get("params"),
+            max_concurrency=data.get("max_concurrency", 8 if local else 16),
+            request_interval=data.get("request_interval", 0.0 if local else 1.0),
+            api_key_required=data.get("api_key_required", not local),
+            adaptive=data.get("adaptive", True),
+            min_concurrency=data.get("min_concurrency", 1),
+        )
+
+
+# 内置后端
+_registry: Dict[str, Backend] = {
+    "glm": Backend("glm", "https://open.bigmodel.cn/api/paas/v4/", "glm-4-Air",
+                   {"top_p": 0.7, "temperature": 0.9}),
+    "deepseek": Backend("deepseek", "https://api.deepseek.com", "deepseek-chat",
+                        {"stream": False}),
+    "qwen": Backend("qwen", "https://dashscope.aliyuncs.com/compatible-mode/v1", "qwen-flash",
+                    {"top_p": 0.7, "temperature": 0.9}),
+    "gpt": Backend("gpt", "https://api.aliyy.cc/v1", "gpt-4o-mini",
+                   {"temperature": 0.7, "presence_penalty": 1, "frequency_penalty": 1.1,
+                    "top_p": 1, "max_tokens": 400}),
+}
+BUILTIN_BACKENDS = tuple(_registry)
+_registry_lock = threading.Lock()
+
+
+def register_backend(backend: Backend):
+    """注册（或替换）一个后端"""
+    with _registry_lock:
+        _registry[backend.name] = backend
+
+
+def get_backend(name: str) -> Optional[Backend]:
+    """按名称查找后端"""
+    with _registry_lock:
+        return _registry.get(name.lower())
+
+
+def list_backends() -> Dict[str, Backend]:
+    with _registry_lock:
+        return dict(_registry)
+
+
+def load_backends(config: dict):
+    """
+    从配置字典注册后端，格式：
+    {"local": {"base_url": "http://127.0.0.1:8080/v1", "model": "qwen2.5-7b",
+               "max_concurrency": 8, "adaptive": true, "params": {"temperature": 0.3},
+               "price": {"input": 0, "output": 0, "rpm": 600}}}
+    """
+    for name, data in (config or {}).items():
+        register_backend(Backend.from_dict(name, data))
+        if "price" in data:
+            price = {"input": 0.0, "output": 0.0, "rpm": 60}
+            price.update(data["price"])
+            usage_tracker.PRICE_TABLE[name.lower()] = price
+
+
+def load_backends_file(path: str = BACKENDS_FILE) -> bool:
+    """加载 backends.json，文件不存在时返回 False"""
+    if not os.path.exists(path):
+        return False
+    with open(path, 'r', encoding='utf-8') as f:
+        load_backends(json.load(f))
+    return True
+
+
+def resolve(model_name: str, base_url: str = "") -> Backend:
+    """
+    根据模型名称和可选的地址确定后端：
+    已注册的名称使用对应后端（填写了地址时覆盖地址）；
+    未注册的名称在填写了地址时视为该地址上的同名模型，否则默认使用 glm
+    """
+    backend = get_backend(model_name)
+    if backend is not None:
+        return backend.override(base_url=base_url)
+    if base_url:
+        backend = Backend.from_dict(model_name, {"base_url": base_url, "model": model_name})
+        register_backend(backend)
+        return backend
+    return get_backend("glm")
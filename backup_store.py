@@ -0,0 +1,236 @@
+"""
+集中备份库
+功能：把原始 About.xml 按内容哈希压缩保存到模组目录之外的一个集中目录，
+相同内容只存一份，并以 packageId 建立索引（原文哈希 + 译名）。
+翻译时不再在每个模组里写 About_old.xml，还原和重新应用译名都由索引批量完成，
+Steam 校验文件删掉模组目录里的备份也不影响还原
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+# 默认的集中备份目录
+DEFAULT_DIR = "mod_backups"
+
+# 批量还原/重新应用时写文件的线程数
+WRITE_WORKERS = 16
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _read_about(folder: str) -> Optional[bytes]:
+    try:
+        with open(os.path.join(folder, 'About', 'About.xml'), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _package_id(data: bytes) -> str:
+    try:
+        return (ET.fromstring(data).findtext('packageId') or '').strip().lower()
+    except ET.ParseError:
+        return ''
+
+
+class BackupStore:
+    """
+    objects/ab/abcdef....xml.gz 保存原始文件，index.json 保存 packageId → 条目
+    条目字段：f 文件夹名，o 原始 About.xml 的 sha1，t 译名，time 备份时间
+    journal.jsonl 在 About.xml 被覆盖之前逐条追加并落盘，运行中断时打开备份库会把它合并进索引，
+    save() 写入索引后清空日志
+    """
+
+    def __init__(self, root: str = DEFAULT_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.json')
+        self.journal_path = os.path.join(root, 'journal.jsonl')
+        self._lock = threading.Lock()
+        self.index: Dict[str, dict] = {}
+        os.makedirs(self.objects_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        self._replay_journal()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+    
+    def _replay_journal(self):
+        """合并上次运行中断时未写入索引的备份记录（跳过写了一半的行）"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        key, entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.index[key] = entry
+        except OSError:
+            pass
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest + '.xml.gz')
+
+    def put(self, data: bytes) -> str:
+        """保存一份原始文件，已存在相同内容时不重复写入，返回内容哈希"""
+        digest = _digest(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read()
+
+    def backup(self, folder: str, translated: str):
+        """在写入译名之前备份模组当前的 About.xml"""
+        data = _read_about(folder)
+        if data is None:
+            raise FileNotFoundError(os.path.join(folder, 'About', 'About.xml'))
+        digest = self.put(data)
+        key = _package_id(data) or os.path.basename(folder)
+        entry = {"f": os.path.basename(folder), "o": digest, "t": translated, "time": int(time.time())}
+        with self._lock:
+            self.index[key] = entry
+            # 调用方随后会覆盖 About.xml，先让记录落盘
+            self._journal.write(json.dumps([key, entry], ensure_ascii=False) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+
+    def lookup(self, folder: str) -> Optional[dict]:
+        """按模组当前 About.xml 的 packageId（没有时为文件夹名）查找备份条目"""
+        data = _read_about(folder)
+        key = (_package_id(data) if data is not None else '') or os.path.basename(folder)
+        with self._lock:
+            entry = self.index.get(key)
+        return dict(entry) if entry else None
+    
+    def translated_for(self, folder: str) -> Optional[str]:
+        """模组 About.xml 与备份的原文完全相同时（例如被 Steam 还原）返回记录的译名"""
+        data = _read_about(folder)
+        if data is None:
+            return None
+        digest = _digest(data)
+        with self._lock:
+            entry = self.index.get(_package_id(data) or os.path.basename(folder))
+        if entry and entry["o"] == digest:
+            return entry["t"]
+        return None
+
+    def save(self):
+        """原子地写入索引，然后清空日志"""
+        with self._lock:
+            data = json.dumps(self.index, ensure_ascii=False)
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+            self._journal.seek(0)
+            self._journal.truncate()
+
+    def _bulk(self, directory: str, action: Callable[[str, dict], str]) -> Dict[str, int]:
+        with self._lock:
+            entries = list(self.index.values())
+        stats: Dict[str, int] = {}
+
+        def run(entry):
+            folder = os.path.join(directory, entry["f"])
+            if not os.path.isdir(folder):
+                return "missing"
+            try:
+                return action(folder, entry)
+            except (OSError, ET.ParseError):
+                return "failed"
+
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as executor:
+            for status in executor.map(run, entries):
+                stats[status] = stats.get(status, 0) + 1
+        return stats
+
+    def restore_all(self, directory: str, log: Callable[[str], None] = print) -> Dict[str, int]:
+        """把所有带中文译名的 About.xml 批量还原为备份的原文"""
+        start_time = time.time()
+
+        def restore(folder, entry):
+            data = _read_about(folder)
+            if data is not None and _digest(data) == entry["o"]:
+                return "already"
+            current = ET.fromstring(data).findtext('name') if data else None
+            if data is not None and current != entry["t"]:
+                return "drifted"  # 模组已更新，当前文件不是我们写入的
+            with open(os.path.join(folder, 'About', 'About.xml'), 'wb') as f:
+                f.write(self.get(entry["o"]))
+            return "restored"
+
+        stats = self._bulk(directory, restore)
+        log(self._format("↩️ 还原", stats, time.time() - start_time))
+        return stats
+
+    def reapply_all(self, directory: str, log: Callable[[str], None] = print) -> Dict[str, int]:
+        """对仍是原文的 About.xml 批量重新写入译名"""
+        start_time = time.time()
+
+        def reapply(folder, entry):
+            data = _read_about(folder)
+            if data is None:
+                return "missing"
+            if _digest(data) != entry["o"]:
+                name = ET.fromstring(data).findtext('name')
+                return "already" if name == entry["t"] else "drifted"
+            tree = ET.ElementTree(ET.fromstring(data))
+            tree.getroot().find('name').text = entry["t"]
+            tree.write(os.path.join(folder, 'About', 'About.xml'), encoding='utf-8', xml_declaration=True)
+            return "reapplied"
+
+        stats = self._bulk(directory, reapply)
+        log(self._format("🔁 重新应用译名", stats, time.time() - start_time))
+        return stats
+
+    @staticmethod
+    def _format(title: str, stats: Dict[str, int], elapsed: float) -> str:
+        done = stats.get("restored", 0) + stats.get("reapplied", 0)
+        return (
+            f"{title}：完成 {done} 个，无需处理 {stats.get('already', 0)} 个，"
+            f"模组已更新 {stats.get('drifted', 0)} 个，文件夹不存在 {stats.get('missing', 0)} 个，"
+            f"失败 {stats.get('failed', 0)} 个，用时 {elapsed:.2f} 秒"
+        )
+
+    def summary(self) -> str:
+        with self._lock:
+            count = len(self.index)
+            objects = len({entry["o"] for entry in self.index.values()})
+        return f"🗃️ 集中备份：{count} 个模组，{objects} 份原文件（{self.root}）"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="集中备份库：批量还原或重新应用译名")
+    parser.add_argument("command", choices=["restore", "reapply"])
+    parser.add_argument("directory", help="模组所在文件夹")
+    parser.add_argument("--store", default=DEFAULT_DIR, help="集中备份目录")
+    args = parser.parse_args()
+
+    store = BackupStore(args.store)
+    if args.command == "restore":
+        store.restore_all(args.directory)
+    else:
+        store.reapply_all(args.directory)
+
+
+if __name__ == "__main__":
+    main()
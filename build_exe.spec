@@ -10,7 +10,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['PySide6', 'chat2gpt4o'],
+    hiddenimports=['PySide6', 'chat2gpt4o', 'mod_scanner', 'languages_pipeline', 'shared_cache', 'translation_pack', 'watch_mode', 'load_order', 'backup_store', 'live_stats', 'adaptive_limit', 'retry_policy', 'run_plan', 'mod_catalog', 'run_log', 'multi_lang', 'run_deadline', 'output_check', 'transport', 'job_queue', 'connections', 'profiler'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -1,166 +1,308 @@
-import requests
 import json
-from openai import OpenAI
 import time
 import os
+from functools import partial
 from dotenv import load_dotenv
 
+from usage_tracker import UsageTracker
+from live_stats import LiveStats
+import key_pool
+import backends
+import retry_policy
+import run_log
+from run_deadline import Deferred
+import transport
+import connections
+from key_pool import KeyRejected, RateLimited, NoKeyAvailable
+
 # 加载环境变量
 load_dotenv()
 
-def send_chat(message, pormet, use_url2=False):
-    url = "https://api.aliyy.cc/v1/chat/completions"
+# 加载 backends.json 中声明的额外后端（如本地 llama.cpp / vLLM 服务）
+backends.load_backends_file()
+
+# 读取上次运行记录的延迟，用于超时和运行预估
+retry_policy.load_history()
+
+# 全局用量统计，所有模型调用共享
+usage_tracker = UsageTracker()
+
+# 全局实时统计（请求速率、延迟、错误和限流），界面定时读取
+live_stats = LiveStats()
+
+# 模型调用日志（JSON 写入运行日志文件，不显示在界面）
+log = run_log.get_logger("api")
+
+
+def _usage_field(obj, name):
+    """从 dict 或 OpenAI SDK 对象中读取字段"""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    value = getattr(obj, name, None)
+    if value is None:
+        # SDK 未声明的字段（如 DeepSeek 的 prompt_cache_hit_tokens）保存在 model_extra 中
+        value = (getattr(obj, 'model_extra', None) or {}).get(name)
+    return value
+
+
+def _record_usage(provider, usage, mod_id=""):
+    """记录一次请求的 token 用量和前缀缓存命中数，兼容 dict 和 OpenAI SDK 对象"""
+    if usage is None:
+        return
+    prompt_tokens = _usage_field(usage, 'prompt_tokens') or 0
+    completion_tokens = _usage_field(usage, 'completion_tokens') or 0
+    # DeepSeek 返回 prompt_cache_hit_tokens，通义千问/智谱/OpenAI 返回 prompt_tokens_details.cached_tokens
+    cached_tokens = _usage_field(usage, 'prompt_cache_hit_tokens')
+    if cached_tokens is None:
+        cached_tokens = _usage_field(_usage_field(usage, 'prompt_tokens_details'), 'cached_tokens')
+    usage_tracker.record(provider, prompt_tokens, completion_tokens, mod_id, cached_tokens or 0)
+
+
+def build_messages(message, pormet, few_shots=None):
+    """
+    构造请求消息：系统提示词和示例问答放在最前面且保持不变，只有最后一条用户消息随请求变化，
+    这样同一轮运行的所有请求共享相同的前缀，可以命中 DeepSeek/通义千问等服务端的前缀缓存
+    Args:
+        message: 用户消息
+        pormet: 系统提示词
+        few_shots: 示例问答列表 [(用户消息, 回答), ...]
+    """
+    messages = [{"role": "system", "content": pormet}]
+    for question, answer in few_shots or []:
+        messages.append({"role": "user", "content": question})
+        messages.append({"role": "assistant", "content": answer})
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+# 额度用尽相关的错误码（OpenAI / 智谱）
+QUOTA_ERROR_CODES = ('insufficient_quota', '1113')
+
+
+def _check_key_error(status_code, detail=""):
+    """
+    根据 HTTP 状态码判断是否为密钥问题
+    401/402/403 或额度用尽时抛出 KeyRejected，429 时抛出 RateLimited
+    """
+    if status_code in (401, 402, 403) or any(code in str(detail) for code in QUOTA_ERROR_CODES):
+        raise KeyRejected(f"{status_code}: {detail}")
+    if status_code == 429:
+        raise RateLimited(f"{status_code}: {detail}")
+
+def send_chat(message, pormet, use_url2=False, mod_id="", api_key=None, base_url=None, few_shots=None, max_tokens=0):
+    backend = backends.get_backend("gpt")
+    url = f"{(base_url or backend.base_url).rstrip('/')}/chat/completions"
     url2 = 'https://free.zeroai.chat/v1/chat/completions'
     headers = {
         'Content-Type': 'application/json',
-        'Authorization': f"Bearer {os.getenv('ALIYY_API_KEY')}"
+        'Authorization': f"Bearer {api_key or os.getenv('ALIYY_API_KEY')}"
     }
     data = {
-        "model": "gpt-4o-mini",
+        "model": backend.model,
         "stream": False,
-        "messages": [
-            {
-                "role": "system",
-                "content": pormet
-            },
-            {
-                "role": "user",
-                "content": message
-            }
-        ],
-        "temperature": 0.7, 
-        "presence_penalty": 1, 
-        "frequency_penalty": 1.1, 
-        "top_p": 1, 
-        "max_tokens": 400
+        "messages": build_messages(message, pormet, few_shots),
+        **_params(backend, max_tokens)
     }
-
-    max_retries = 3
-    retry_delay = 1
     url_to_use = url2 if use_url2 else url
-    
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url_to_use, headers=headers, data=json.dumps(data), timeout=10)
-            if response.status_code == 200:
-                result = response.json()
-                result = result['choices'][0]['message']
-                return result['content']
-            else:
-                print(f"Error: {response.status_code}, {response.text}")
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"Failed after {max_retries} attempts: {e}")
-                return None
-            time.sleep(retry_delay)
-            retry_delay *= 2
 
-def deepseek(message, pormet):
-    max_retries = 3
-    retry_delay = 1
-    
-    for attempt in range(max_retries):
-        try:
-            client = OpenAI(api_key=os.getenv('DEEPSEEK_API_KEY'), base_url="https://api.deepseek.com", timeout=10)
-            response = client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": pormet},
-                    {"role": "user", "content": message},
-                ],
-                stream=False
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"Failed after {max_retries} attempts: {e}")
-                return None
-            time.sleep(retry_delay)
-            retry_delay *= 2
+    def send(timeout):
+        # 共用该地址的长连接（运行开始时已预热）
+        response = connections.client(url_to_use).post(url_to_use, headers=headers, content=json.dumps(data),
+                                                        timeout=timeout)
+        if response.status_code != 200:
+            _check_key_error(response.status_code, response.text)
+            raise RuntimeError(f"Error: {response.status_code}, {response.text}")
+        result = response.json()
+        return result['choices'][0]['message']['content'], result.get('usage')
 
-def glm(message, pormet):
-    max_retries = 3
-    retry_delay = 1
-    
-    for attempt in range(max_retries):
-        try:
-            client = OpenAI(
-                api_key=os.getenv('GLM_API_KEY'),
-                base_url="https://open.bigmodel.cn/api/paas/v4/",
-                timeout=10
-            )
-            completion = client.chat.completions.create(
-                model="glm-4-Air",  
-                messages=[    
-                    {"role": "system", "content": pormet},    
-                    {"role": "user", "content": message} 
-                ],
-                top_p=0.7,
-                temperature=0.9
-            )
-            return completion.choices[0].message.content
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"Failed after {max_retries} attempts: {e}")
-                return None
-            time.sleep(retry_delay)
-            retry_delay *= 2
+    def attempt(timeout):
+        # 经过传输层，可录制或离线回放
+        content, usage = transport.exchange("gpt", data, timeout, send)
+        _record_usage("gpt", usage, mod_id)
+        return content
 
-def qwen_flash(message, pormet):
-    max_retries = 3
-    retry_delay = 1
-    
-    for attempt in range(max_retries):
+    return retry_policy.call_with_retry("gpt", attempt, _message_chars(data["messages"]))
+
+def _params(backend, max_tokens=0):
+    """后端默认参数；后端设置了输出上限且小于 max_tokens 时提高上限（批量请求的回答较长）"""
+    params = dict(backend.params)
+    if "max_tokens" in params and max_tokens > params["max_tokens"]:
+        params["max_tokens"] = max_tokens
+    return params
+
+def _message_chars(messages):
+    return sum(len(m["content"]) for m in messages)
+
+def _chat_completion(provider, api_key, base_url, model, messages, params, mod_id=""):
+    """通过 OpenAI SDK 调用，超时和重试由 retry_policy 统一控制"""
+    def send(timeout):
+        # 同一地址和密钥复用客户端及其长连接
+        client = connections.openai_client(base_url, api_key)
         try:
-            client = OpenAI(
-                api_key=os.getenv('QWEN_API_KEY'),
-                base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-                timeout=10
-            )
-            completion = client.chat.completions.create(
-                model="qwen-flash",
-                messages=[
-                    {"role": "system", "content": pormet},
-                    {"role": "user", "content": message}
-                ],
-                top_p=0.7,
-                temperature=0.9
-            )
-            return completion.choices[0].message.content
+            completion = client.chat.completions.create(model=model, messages=messages, timeout=timeout, **params)
         except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"Failed after {max_retries} attempts: {e}")
-                return None
-            time.sleep(retry_delay)
-            retry_delay *= 2
+            _check_key_error(getattr(e, 'status_code', None), getattr(e, 'body', None) or e)
+            raise
+        usage = completion.usage.model_dump() if completion.usage is not None else None
+        return completion.choices[0].message.content, usage
+
+    def attempt(timeout):
+        # 经过传输层，可录制或离线回放
+        request = {"model": model, "messages": messages, **params}
+        content, usage = transport.exchange(provider, request, timeout, send)
+        _record_usage(provider, usage, mod_id)
+        return content
 
-def call_model(model_name: str, message: str, pormet: str, api_key: str = "", base_url: str = ""):
+    return retry_policy.call_with_retry(provider, attempt, _message_chars(messages))
+
+def deepseek(message, pormet, mod_id="", api_key=None, base_url=None, few_shots=None, max_tokens=0):
+    backend = backends.get_backend("deepseek")
+    return _chat_completion(
+        "deepseek",
+        api_key=api_key or os.getenv('DEEPSEEK_API_KEY'),
+        base_url=base_url or backend.base_url,
+        model=backend.model,
+        messages=build_messages(message, pormet, few_shots),
+        params=_params(backend, max_tokens),
+        mod_id=mod_id
+    )
+
+def glm(message, pormet, mod_id="", api_key=None, base_url=None, few_shots=None, max_tokens=0):
+    backend = backends.get_backend("glm")
+    return _chat_completion(
+        "glm",
+        api_key=api_key or os.getenv('GLM_API_KEY'),
+        base_url=base_url or backend.base_url,
+        model=backend.model,
+        messages=build_messages(message, pormet, few_shots),
+        params=_params(backend, max_tokens),
+        mod_id=mod_id
+    )
+
+def qwen_flash(message, pormet, mod_id="", api_key=None, base_url=None, few_shots=None, max_tokens=0):
+    backend = backends.get_backend("qwen")
+    return _chat_completion(
+        "qwen",
+        api_key=api_key or os.getenv('QWEN_API_KEY'),
+        base_url=base_url or backend.base_url,
+        model=backend.model,
+        messages=build_messages(message, pormet, few_shots),
+        params=_params(backend, max_tokens),
+        mod_id=mod_id
+    )
+
+def openai_compatible(message, pormet, backend, mod_id="", api_key=None, few_shots=None, max_tokens=0):
+    """调用任意 OpenAI 兼容的后端（包括本地 llama.cpp / vLLM 服务）"""
+    return _chat_completion(
+        backend.name,
+        api_key=api_key or os.getenv(f'{backend.name.upper()}_API_KEY') or "EMPTY",
+        base_url=backend.base_url,
+        model=backend.model,
+        messages=build_messages(message, pormet, few_shots),
+        params=_params(backend, max_tokens),
+        mod_id=mod_id
+    )
+
+def call_model(model_name: str, message: str, pormet: str, api_key: str = "", base_url: str = "", mod_id: str = "",
+               few_shots: list = None, max_tokens: int = 0, deadline=None):
     """
     通用模型调用函数
     Args:
-        model_name: 模型名称 (glm, deepseek, qwen, gpt)
+        model_name: 模型名称 (glm, deepseek, qwen, gpt，或 backends.json 中声明的后端)
         message: 用户消息
         pormet: 系统提示词
         api_key: API密钥
-        base_url: API基础URL
+        base_url: API基础URL，填写时覆盖后端的默认地址
+        mod_id: 模组标识，用于按模组统计用量
+        few_shots: 示例问答列表，与系统提示词一起构成不变的前缀
+        max_tokens: 预计的输出 token 数，超过后端默认的 max_tokens 时提高上限，0 表示使用默认参数
+        deadline: 限时运行的准入控制（run_deadline.RunDeadline），拿到并发名额后才申请准入
+    Raises:
+        Deferred: 限时运行不再准入，请求没有发出
     """
-    # 设置环境变量以便现有函数使用
-    if api_key:
-        env_key = f"{model_name.upper()}_API_KEY"
-        os.environ[env_key] = api_key
-    
-    # 根据模型名称调用相应的函数
-    if model_name.lower() == "glm":
-        return glm(message, pormet)
-    elif model_name.lower() == "deepseek":
-        return deepseek(message, pormet)
-    elif model_name.lower() == "qwen":
-        return qwen_flash(message, pormet)
-    elif model_name.lower() == "gpt":
-        return send_chat(message, pormet)
+    # 预算将尽时降速，用完时抛出 BudgetExceeded
+    usage_tracker.check_budget()
+
+    # 根据模型名称和地址确定后端，未知名称且未填写地址时默认使用GLM
+    backend = backends.resolve(model_name, base_url)
+    functions = {
+        "glm": glm,
+        "deepseek": deepseek,
+        "qwen": qwen_flash,
+        "gpt": send_chat,
+    }
+    if backend.name in functions:
+        func = partial(functions[backend.name], base_url=backend.base_url, few_shots=few_shots,
+                       max_tokens=max_tokens)
     else:
-        # 默认使用GLM
-        return glm(message, pormet)
+        func = partial(openai_compatible, backend=backend, few_shots=few_shots, max_tokens=max_tokens)
+    
+    # 每个后端有自己的自适应并发上限，请求结果和延迟反馈给 AIMD 控制器
+    backend.slots.acquire()
+    # 排队等名额和预算降速的时间都已过去，此时再按剩余时间判断能否在截止前完成
+    if deadline is not None and deadline.enabled:
+        request_chars = len(pormet) + len(message) + sum(len(q) + len(a) for q, a in few_shots or [])
+        if not deadline.admit(backend.name, request_chars):
+            backend.slots.release()
+            raise Deferred(deadline.reason)
+    started = live_stats.begin(backend.name)
+    result = None
+    retry_policy.take_attempt_latency()
+    try:
+        result = _call_with_keys(backend, func, message, pormet, api_key, mod_id)
+        return result
+    finally:
+        latency = time.monotonic() - started
+        live_stats.end(backend.name, started, ok=result is not None)
+        # AIMD 按最后一次 HTTP 请求的耗时判断延迟突增，换密钥、退避和重试的等待不计入
+        backend.slots.release(retry_policy.take_attempt_latency(), ok=result is not None)
+        log.info("model call", extra={
+            "provider": backend.name, "mod_id": mod_id, "latency": round(latency, 3),
+            "ok": result is not None, "chars": len(message),
+        })
+
+def _call_with_keys(backend, func, message, pormet, api_key, mod_id):
+    """从密钥池取密钥调用模型"""
+    # 从密钥池取密钥，不再修改环境变量，多个工作线程可以并发使用不同的密钥
+    pool = key_pool.get_pool(backend.name, api_key)
+    if not len(pool):
+        return func(message, pormet, mod_id=mod_id)
+    
+    # 被限流则换下一个密钥，无效则移出密钥池；每个密钥都被限流过之后，
+    # 再次限流的重试消耗重试预算，acquire 会等到最早的冷却结束
+    keys = len(pool)
+    rate_limited = 0
+    while True:
+        try:
+            key = pool.acquire()
+        except NoKeyAvailable as e:
+            log.warning("no key available: %s", e, extra={"provider": backend.name})
+            return None
+        try:
+            result = func(message, pormet, mod_id=mod_id, api_key=key)
+        except KeyRejected as e:
+            state = pool.remove(key)
+            log.warning("API密钥已移除 (%s): %s", state.masked if state else '***', e,
+                        extra={"provider": backend.name})
+            continue
+        except RateLimited as e:
+            pool.release(key, rate_limited=True)
+            live_stats.rate_limited(backend.name)
+            backend.slots.congested()
+            rate_limited += 1
+            if rate_limited >= keys and (rate_limited - keys >= retry_policy.MAX_ATTEMPTS
+                                         or not retry_policy.retry_budget.try_withdraw()):
+                log.warning("rate limited %d times, giving up: %s", rate_limited, e,
+                            extra={"provider": backend.name})
+                return None
+            continue
+        except Exception:
+            pool.release(key)
+            raise
+        pool.release(key)
+        return result
 
 if __name__ == "__main__":
     print(qwen_flash("你好","你好"))
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+长连接与连接预热
+功能：同一后端地址的所有请求共用一个 HTTP 连接池（OpenAI SDK 和 gpt 后端的直接请求都使用它），
+运行一开始就在后台线程中解析域名、建立 TCP/TLS 连接，并用每个密钥请求一次 /models，
+与扫描模组目录并行进行，第一个模型请求不再承担连接建立的延迟；
+运行期间定时对空闲的后端发送轻量请求，保持连接不被服务端关闭，结束时报告省下的冷启动时间
+"""
+
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+from openai import OpenAI
+
+from key_pool import KeyState, load_keys
+
+
+# 空闲连接在连接池中保留的秒数（需长于保活间隔）
+KEEPALIVE_EXPIRY = 120.0
+
+# 后端空闲超过此秒数时发送一次保活请求
+KEEPALIVE_INTERVAL = 45.0
+
+# 每个后端预先建立的连接数上限（实际为 min(此值, 后端并发上限)）
+WARM_CONNECTIONS = 4
+
+# 预热请求的超时（秒）
+WARM_TIMEOUT = 10.0
+
+_clients: Dict[str, httpx.Client] = {}
+_openai_clients: Dict[Tuple[str, str], OpenAI] = {}
+_last_used: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def origin(url: str) -> str:
+    """协议 + 主机 + 端口，同一 origin 的请求共用连接"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def client(url: str) -> httpx.Client:
+    """获取（必要时创建）该地址的共享 HTTP 客户端"""
+    key = origin(url)
+    with _lock:
+        _last_used[key] = time.monotonic()
+        http = _clients.get(key)
+        if http is None:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=64,
+                                  keepalive_expiry=KEEPALIVE_EXPIRY)
+            http = _clients[key] = httpx.Client(limits=limits, timeout=WARM_TIMEOUT)
+        return http
+
+
+def openai_client(base_url: str, api_key: str) -> OpenAI:
+    """每个 (地址, 密钥) 一个 OpenAI 客户端，共用该地址的连接池"""
+    http = client(base_url)
+    with _lock:
+        sdk = _openai_clients.get((base_url, api_key))
+        if sdk is None:
+            # 关闭 SDK 自带的重试，避免与统一重试层叠加；超时在每次请求时传入
+            sdk = _openai_clients[(base_url, api_key)] = OpenAI(
+                api_key=api_key, base_url=base_url, http_client=http, max_retries=0)
+        return sdk
+
+
+def _ping(url: str, key: str) -> Tuple[float, Optional[int]]:
+    """发送一次 GET /models，返回 (耗时, 状态码)，网络错误时状态码为 None"""
+    headers = {"Authorization": f"Bearer {key}"} if key else {}
+    started = time.monotonic()
+    try:
+        status = client(url).get(url.rstrip('/') + '/models', headers=headers, timeout=WARM_TIMEOUT).status_code
+    except httpx.HTTPError:
+        status = None
+    return time.monotonic() - started, status
+
+
+def warm(base_url: str, keys: List[str], connections: int = WARM_CONNECTIONS) -> dict:
+    """
+    预热一个后端：解析域名，建立一个新连接并测量它和复用连接的耗时，再并发建立其余连接
+    每个密钥至少请求一次，返回被拒绝（401/403）的密钥
+    """
+    parts = urlsplit(base_url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    result = {"dns": 0.0, "cold": 0.0, "warm": 0.0, "connections": 0, "rejected": [], "error": ""}
+    started = time.monotonic()
+    try:
+        socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        result["error"] = f"域名解析失败: {e}"
+        return result
+    result["dns"] = time.monotonic() - started
+
+    keys = keys or [""]
+    result["cold"], status = _ping(base_url, keys[0])
+    if status is None:
+        result["error"] = "无法连接"
+        return result
+    statuses = [(keys[0], status)]
+    result["warm"], _ = _ping(base_url, keys[0])
+
+    # 同时发出的请求各占一个连接，请求结束后连接留在池中
+    targets = [keys[i % len(keys)] for i in range(max(connections, len(keys)))]
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        pings = list(executor.map(lambda key: _ping(base_url, key), targets))
+    statuses += [(key, ping[1]) for key, ping in zip(targets, pings)]
+    result["connections"] = max(1, sum(1 for _, status in pings if status is not None))
+    rejected = {key for key, status in statuses if status in (401, 403)}
+    result["rejected"] = [KeyState(key).masked for key in keys if key and key in rejected]
+    return result
+
+
+def backend_target(backend, api_key: str = "") -> tuple:
+    """后端的预热参数：(名称, 地址, 密钥列表, 连接数)"""
+    connections = max(1, min(WARM_CONNECTIONS, backend.max_concurrency))
+    return backend.name, backend.base_url, load_keys(backend.name, api_key), connections
+
+
+class Warmer:
+    """一次运行的连接预热和保活（后台线程）"""
+
+    def __init__(self, log=print):
+        self.log = log
+        self.results: Dict[str, dict] = {}
+        self._targets: List[tuple] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, targets: List[tuple]):
+        """
+        开始预热并保活，立即返回
+        Args:
+            targets: [(后端名称, 地址, 密钥列表, 连接数)]
+        """
+        self._targets = [target for target in targets if target[1].startswith(("http://", "https://"))]
+        if not self._targets:
+            return
+        self._thread = threading.Thread(target=self._run, name="connection-warmer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for name, base_url, keys, connections in self._targets:
+            if self._stop.is_set():
+                return
+            result = self.results[name] = warm(base_url, keys, connections)
+            if result["error"]:
+                self.log(f"⚠️ 预热 {name} 失败：{result['error']}")
+                continue
+            self.log(
+                f"🔥 预热 {name}：DNS {result['dns'] * 1000:.0f} 毫秒，新建连接 {result['cold'] * 1000:.0f} 毫秒，"
+                f"复用连接 {result['warm'] * 1000:.0f} 毫秒，已建立 {result['connections']} 个连接"
+            )
+            for masked in result["rejected"]:
+                self.log(f"⚠️ 密钥 {masked} 的预热请求被 {name} 拒绝，运行中会被移出密钥池")
+        while not self._stop.wait(KEEPALIVE_INTERVAL / 3):
+            now = time.monotonic()
+            for name, base_url, keys, connections in self._targets:
+                if name in self.results and now - _last_used.get(origin(base_url), now) >= KEEPALIVE_INTERVAL:
+                    with ThreadPoolExecutor(max_workers=connections) as executor:
+                        list(executor.map(lambda key: _ping(base_url, key), [keys[0] if keys else ""] * connections))
+
+    def saved(self) -> float:
+        """预热省下的冷启动时间（秒）：每个预先建立的连接节省 新建 - 复用 的耗时"""
+        return sum(
+            max(0.0, result["cold"] - result["warm"]) * result["connections"] + result["dns"]
+            for result in self.results.values() if not result["error"]
+        )
+
+    def stop(self):
+        self._stop.set()
+
+    def summary(self) -> str:
+        if not any(not result["error"] for result in self.results.values()):
+            return ""
+        return f"🔥 连接预热省下约 {self.saved():.1f} 秒冷启动时间（DNS、TCP、TLS 握手）"
@@ -0,0 +1,463 @@
+"""
+共享任务队列（多进程 / 多台机器分工翻译）
+功能：界面把需要调用模型的模组作为任务放入队列（SQLite 文件，或用 serve 启动的小型 HTTP 服务），
+任意多个 work 进程（同一台或多台机器，各自使用自己的密钥和模型）领取任务、调用模型、检查结果后提交，
+界面轮询已完成的任务，把译名写回模组文件夹并合并到同一个模组目录。
+领取任务时加租约：进程退出后租约过期的任务会被重新领取；提交时校验租约，
+同一个任务只会被接受一次。InMemoryJobService 可在测试时替代真实服务
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import run_log
+from mod_scanner import text_hash
+
+
+# 任务状态
+PENDING = "pending"    # 等待领取
+LEASED = "leased"      # 已被某个进程领取
+DONE = "done"          # 已完成
+FAILED = "failed"      # 多次尝试后仍失败
+
+# 默认租约时长（秒），超时未提交的任务会被其他进程重新领取
+LEASE_SECONDS = 300
+
+# 每个任务最多尝试的次数
+MAX_ATTEMPTS = 3
+
+# 界面轮询结果的间隔（秒）
+POLL_INTERVAL = 2.0
+
+
+def job_key(message: str, languages: List[str]) -> str:
+    """任务键：相同的消息和目标语言只翻译一次"""
+    return text_hash("|".join(languages) + "\n" + message)
+
+
+def settings_id(settings: dict) -> str:
+    data = json.dumps(settings, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
+
+
+class JobStore:
+    """任务存储（SQLite）；多个进程可以同时打开同一个文件，领取时用写事务保证互斥"""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT UNIQUE NOT NULL, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL, lease TEXT, worker TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, "
+            "result TEXT, error TEXT, version INTEGER DEFAULT 0)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_version ON jobs(version)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS settings (id TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def _next_version(self) -> int:
+        row = self._db.execute("SELECT COALESCE(MAX(version), 0) FROM jobs").fetchone()
+        return row[0] + 1
+
+    def enqueue(self, jobs: List[dict], settings: dict) -> int:
+        """
+        加入任务（已完成的键直接复用结果，之前失败的键重新放回队列）
+        Args:
+            jobs: [{"key", "message", "mod_id"}, ...]，按优先级排列
+            settings: 提示词、示例和目标语言，所有任务共享
+        Returns:
+            新加入的任务数
+        """
+        sid = settings_id(settings)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute("INSERT OR IGNORE INTO settings (id, value) VALUES (?, ?)",
+                                 (sid, json.dumps(settings, ensure_ascii=False)))
+                before = self._db.total_changes
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO jobs (key, payload, status) VALUES (?, ?, ?)",
+                    [(job["key"], json.dumps(dict(job, s=sid), ensure_ascii=False), PENDING) for job in jobs]
+                )
+                added = self._db.total_changes - before
+                self._db.executemany(
+                    "UPDATE jobs SET status=?, attempts=0, error=NULL WHERE key=? AND status=?",
+                    [(PENDING, job["key"], FAILED) for job in jobs]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return added
+
+    def settings(self, sid: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM settings WHERE id=?", (sid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, worker: str, count: int = 1, lease_seconds: float = LEASE_SECONDS) -> List[dict]:
+        """
+        领取最多 count 个等待中或租约已过期的任务
+        租约已过期且尝试次数用完的任务（领取它的进程多次中途退出）标记为失败，不再领取
+        """
+        now = time.time()
+        claimed = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET status=?, lease=NULL, error=?, version=? "
+                    "WHERE status=? AND lease_until < ? AND attempts >= ?",
+                    (FAILED, "租约多次过期", self._next_version(), LEASED, now, MAX_ATTEMPTS)
+                )
+                rows = self._db.execute(
+                    "SELECT id, payload FROM jobs WHERE status=? OR (status=? AND lease_until < ? AND attempts < ?) "
+                    "ORDER BY id LIMIT ?", (PENDING, LEASED, now, MAX_ATTEMPTS, int(count))
+                ).fetchall()
+                for job_id, payload in rows:
+                    lease = uuid.uuid4().hex
+                    self._db.execute(
+                        "UPDATE jobs SET status=?, lease=?, worker=?, lease_until=?, attempts=attempts+1 WHERE id=?",
+                        (LEASED, lease, worker, now + lease_seconds, job_id)
+                    )
+                    claimed.append(dict(json.loads(payload), id=job_id, lease=lease))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _finish(self, job_id: int, lease: str, status: str, result: Optional[dict], error: str) -> bool:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status=?, result=?, error=?, lease=NULL, version=? "
+                    "WHERE id=? AND lease=? AND status=?",
+                    (status, json.dumps(result, ensure_ascii=False) if result else None, error,
+                     self._next_version(), job_id, lease, LEASED)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, lease: str, result: dict) -> bool:
+        """提交结果；租约已失效（任务被别人重新领取）时返回 False，结果丢弃"""
+        return self._finish(job_id, lease, DONE, result, "")
+
+    def fail(self, job_id: int, lease: str, error: str = "") -> bool:
+        """本次失败；尝试次数未用完时放回队列"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status=?, lease=NULL, error=? WHERE id=? AND lease=? AND status=? AND attempts < ?",
+                    (PENDING, error, job_id, lease, LEASED, MAX_ATTEMPTS)
+                )
+                if cursor.rowcount == 0:
+                    cursor = self._db.execute(
+                        "UPDATE jobs SET status=?, error=?, lease=NULL, version=? WHERE id=? AND lease=? AND status=?",
+                        (FAILED, error, self._next_version(), job_id, lease, LEASED)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def results(self, since: int = 0, keys: Optional[List[str]] = None) -> tuple:
+        """
+        返回 (当前版本, [版本号大于 since 的已完成/失败任务])
+        传入 keys 时只返回这些键的任务，用于第一次轮询时取回之前已完成的结果而不读出全部历史；
+        返回的版本总是队列当前的最高版本，下次轮询从这里继续
+        """
+        query = "SELECT key, status, result, error FROM jobs WHERE version > ? AND version <= ? AND status IN (?, ?)"
+        with self._lock:
+            version = self._db.execute("SELECT COALESCE(MAX(version), 0) FROM jobs").fetchone()[0]
+            if keys is None:
+                rows = self._db.execute(query + " ORDER BY version", (since, version, DONE, FAILED)).fetchall()
+            else:
+                rows = []
+                # 分批查询，避免超出 SQLite 的参数个数上限
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows += self._db.execute(
+                        query + f" AND key IN ({','.join('?' * len(chunk))}) ORDER BY version",
+                        [since, version, DONE, FAILED] + chunk
+                    ).fetchall()
+        return max(version, since), [
+            {"key": key, "status": status, "result": json.loads(result) if result else None, "error": error}
+            for key, status, result, error in rows
+        ]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+class InMemoryJobService:
+    """不经过网络的本地访问端，接口与 HTTP 服务一致；传入文件路径时多个进程可共享同一个 SQLite 队列"""
+
+    def __init__(self, store: Optional[JobStore] = None):
+        self.store = store or JobStore()
+
+    def enqueue(self, jobs: List[dict], settings: dict) -> int:
+        return self.store.enqueue(jobs, settings)
+
+    def settings(self, sid: str) -> Optional[dict]:
+        return self.store.settings(sid)
+
+    def claim(self, worker: str, count: int = 1, lease_seconds: float = LEASE_SECONDS) -> List[dict]:
+        return self.store.claim(worker, count, lease_seconds)
+
+    def complete(self, job_id: int, lease: str, result: dict) -> bool:
+        return self.store.complete(job_id, lease, result)
+
+    def fail(self, job_id: int, lease: str, error: str = "") -> bool:
+        return self.store.fail(job_id, lease, error)
+
+    def results(self, since: int = 0, keys: Optional[List[str]] = None) -> tuple:
+        return self.store.results(since, keys)
+
+    def stats(self) -> Dict[str, int]:
+        return self.store.stats()
+
+
+class HttpJobService:
+    """HTTP 队列服务的访问端，使用 requests.Session 保持长连接"""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        import requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _post(self, path: str, data: dict) -> dict:
+        response = self.session.post(f"{self.url}{path}", json=data, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def enqueue(self, jobs: List[dict], settings: dict) -> int:
+        return self._post("/enqueue", {"jobs": jobs, "settings": settings})["added"]
+
+    def settings(self, sid: str) -> Optional[dict]:
+        return self._post("/settings", {"id": sid}).get("settings")
+
+    def claim(self, worker: str, count: int = 1, lease_seconds: float = LEASE_SECONDS) -> List[dict]:
+        return self._post("/claim", {"worker": worker, "count": count, "lease": lease_seconds})["jobs"]
+
+    def complete(self, job_id: int, lease: str, result: dict) -> bool:
+        return self._post("/complete", {"id": job_id, "lease": lease, "result": result})["accepted"]
+
+    def fail(self, job_id: int, lease: str, error: str = "") -> bool:
+        return self._post("/fail", {"id": job_id, "lease": lease, "error": error})["accepted"]
+
+    def results(self, since: int = 0, keys: Optional[List[str]] = None) -> tuple:
+        data = self._post("/results", {"since": since, "keys": keys})
+        return data["version"], data["results"]
+
+    def stats(self) -> Dict[str, int]:
+        return self._post("/stats", {})
+
+
+def open_queue(target: str):
+    """http(s):// 开头为队列服务地址，否则为 SQLite 文件路径"""
+    if target.startswith(("http://", "https://")):
+        return HttpJobService(target)
+    return InMemoryJobService(JobStore(target))
+
+
+def make_handler(store: JobStore):
+    """创建绑定到指定存储的请求处理类"""
+
+    class JobHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持长连接
+
+        def _send_json(self, data, status=200):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_POST(self):
+            data = self._read_json()
+            if self.path == "/enqueue":
+                self._send_json({"added": store.enqueue(data.get("jobs", []), data.get("settings", {}))})
+            elif self.path == "/settings":
+                self._send_json({"settings": store.settings(data.get("id", ""))})
+            elif self.path == "/claim":
+                jobs = store.claim(data.get("worker", ""), data.get("count", 1), data.get("lease", LEASE_SECONDS))
+                self._send_json({"jobs": jobs})
+            elif self.path == "/complete":
+                self._send_json({"accepted": store.complete(data["id"], data["lease"], data["result"])})
+            elif self.path == "/fail":
+                self._send_json({"accepted": store.fail(data["id"], data["lease"], data.get("error", ""))})
+            elif self.path == "/results":
+                version, results = store.results(data.get("since", 0), data.get("keys"))
+                self._send_json({"version": version, "results": results})
+            elif self.path == "/stats":
+                self._send_json(store.stats())
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return JobHandler
+
+
+def serve(host: str = "0.0.0.0", port: int = 8766, db_path: str = "job_queue.sqlite3"):
+    """启动任务队列服务"""
+    server = ThreadingHTTPServer((host, port), make_handler(JobStore(db_path)))
+    print(f"任务队列服务已启动: http://{host}:{port} （数据库: {db_path}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class QueueWorker:
+    """work 进程：领取任务、调用模型、检查结果并提交"""
+
+    def __init__(self, service, model_name: str, api_key: str = "", base_url: str = "",
+                 threads: int = 4, lease_seconds: float = LEASE_SECONDS, log=print):
+        self.service = service
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.threads = threads
+        self.lease_seconds = lease_seconds
+        self.log = log
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self._settings: Dict[str, dict] = {}
+        self.completed = 0
+        self.failed = 0
+        self.lost = 0  # 租约失效被丢弃的结果
+
+    def _settings_for(self, sid: str) -> dict:
+        if sid not in self._settings:
+            self._settings[sid] = self.service.settings(sid) or {}
+        return self._settings[sid]
+
+    def process(self, job: dict):
+        import backends
+        import chat2gpt4o
+        import multi_lang
+        import output_check
+        settings = self._settings_for(job["s"])
+        languages = settings.get("languages") or [multi_lang.DEFAULT_LANGUAGE]
+        error = ""
+        try:
+            reply = chat2gpt4o.call_model(
+                model_name=self.model_name,
+                message=job["message"],
+                pormet=settings.get("prompt", ""),
+                api_key=self.api_key,
+                base_url=self.base_url,
+                mod_id=job.get("mod_id", ""),
+                few_shots=[tuple(shot) for shot in settings.get("few_shots", [])]
+            )
+            if not reply:
+                error = "模型没有返回结果"
+            elif multi_lang.is_default(languages):
+                summary, error = output_check.check(reply, languages[0])
+                names = {languages[0]: summary}
+            else:
+                names, error = output_check.check_names(multi_lang.parse_response(reply, languages))
+        except Exception as e:
+            error = str(e)
+        if error:
+            self.failed += 1
+            self.service.fail(job["id"], job["lease"], error)
+            self.log(f"❌ {job.get('mod_id', job['key'])}: {error}")
+            return
+        result = {"name": names[languages[0]], "names": names,
+                  "model": backends.resolve(self.model_name, self.base_url).name}
+        if self.service.complete(job["id"], job["lease"], result):
+            self.completed += 1
+            self.log(f"✅ {job.get('mod_id', job['key'])} → {result['name']}")
+        else:
+            self.lost += 1
+
+    def run(self, exit_when_empty: bool = False, idle_seconds: float = 5.0):
+        """持续领取任务；exit_when_empty 时队列中没有等待和进行中的任务就退出"""
+        import backends
+        import connections
+        self.log(f"🛠️ 工作进程 {self.name} 开始领取任务（{self.threads} 个线程）")
+        # 等待第一批任务时预热模型连接，空闲期间保持连接
+        warmer = connections.Warmer(self.log)
+        warmer.start([connections.backend_target(backends.resolve(self.model_name, self.base_url), self.api_key)])
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while True:
+                jobs = self.service.claim(self.name, self.threads, self.lease_seconds)
+                if not jobs:
+                    stats = self.service.stats()
+                    if exit_when_empty and not stats.get(PENDING) and not stats.get(LEASED):
+                        break
+                    time.sleep(idle_seconds)
+                    continue
+                list(executor.map(self.process, jobs))
+        warmer.stop()
+        if warmer.summary():
+            self.log(warmer.summary())
+        self.log(f"📊 完成 {self.completed} 个，失败 {self.failed} 个，租约失效丢弃 {self.lost} 个")
+
+
+def main():
+    run_log.setup()  # 后台线程写 JSON 运行日志
+    parser = argparse.ArgumentParser(description="共享任务队列")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="启动队列服务")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8766)
+    serve_parser.add_argument("--db", default="job_queue.sqlite3")
+    work_parser = sub.add_parser("work", help="领取并处理任务")
+    work_parser.add_argument("queue", help="队列服务地址或 SQLite 文件路径")
+    work_parser.add_argument("--model", default="glm")
+    work_parser.add_argument("--api-key", default="", help="多个密钥用逗号分隔，默认读取环境变量")
+    work_parser.add_argument("--base-url", default="")
+    work_parser.add_argument("--threads", type=int, default=4)
+    work_parser.add_argument("--lease", type=float, default=LEASE_SECONDS)
+    work_parser.add_argument("--exit-when-empty", action="store_true")
+    stats_parser = sub.add_parser("stats", help="查看队列状态")
+    stats_parser.add_argument("queue")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.db)
+    elif args.command == "work":
+        worker = QueueWorker(open_queue(args.queue), args.model, args.api_key, args.base_url,
+                             args.threads, args.lease)
+        try:
+            worker.run(args.exit_when_empty)
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(open_queue(args.queue).stats())
+
+
+if __name__ == "__main__":
+    main()
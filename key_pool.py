@@ -0,0 +1,180 @@
+"""
+API 密钥池
+功能：每个模型可配置多个密钥，按轮询或最少占用调度请求，
+记录每个密钥的限流状态，自动移除返回 401 或额度用尽的密钥
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+# 调度策略：round_robin（轮询）或 least_loaded（最少占用）
+DEFAULT_STRATEGY = os.getenv("KEY_POOL_STRATEGY", "least_loaded")
+
+# 环境变量前缀别名：gpt 使用的是 aliyy 中转服务的密钥
+ENV_ALIASES = {"gpt": ["GPT", "ALIYY"]}
+
+# 被限流后的初始冷却时间和最大冷却时间（秒）
+RATE_LIMIT_COOLDOWN = 2.0
+MAX_COOLDOWN = 60.0
+
+
+class KeyRejected(Exception):
+    """密钥无效或额度已用完（401/403/402 等），应从密钥池中移除"""
+
+
+class RateLimited(Exception):
+    """密钥被限流（429），应暂时冷却后再使用"""
+
+
+class NoKeyAvailable(Exception):
+    """密钥池中没有可用的密钥"""
+
+
+def split_keys(text: str) -> List[str]:
+    """把逗号、分号或换行分隔的密钥字符串拆分成列表"""
+    for sep in (';', '\n'):
+        text = text.replace(sep, ',')
+    return [k.strip() for k in text.split(',') if k.strip()]
+
+
+def load_keys(provider: str, extra: str = "") -> List[str]:
+    """
+    收集某个模型的所有密钥（去重，保持顺序）
+    来源：界面/配置中填写的密钥、环境变量 {PROVIDER}_API_KEYS 和 {PROVIDER}_API_KEY
+    """
+    keys = split_keys(extra)
+    for prefix in ENV_ALIASES.get(provider.lower(), [provider.upper()]):
+        keys += split_keys(os.getenv(f"{prefix}_API_KEYS", ""))
+        keys += split_keys(os.getenv(f"{prefix}_API_KEY", ""))
+    return list(dict.fromkeys(keys))
+
+
+class KeyState:
+    """单个密钥的运行状态"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.in_flight = 0
+        self.requests = 0
+        self.rate_limited = 0
+        self.cooldown = 0.0
+        self.cooldown_until = 0.0
+
+    @property
+    def masked(self) -> str:
+        """日志中显示的脱敏密钥"""
+        return f"{self.key[:6]}...{self.key[-4:]}" if len(self.key) > 12 else "***"
+
+
+class KeyPool:
+    """线程安全的密钥池"""
+
+    def __init__(self, keys: List[str], strategy: str = DEFAULT_STRATEGY):
+        self.strategy = strategy
+        self._states = [KeyState(k) for k in keys]
+        self._removed: List[KeyState] = []
+        self._next = 0
+        self._cond = threading.Condition()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._states)
+
+    def set_keys(self, keys: List[str]):
+        """更新密钥列表，保留已有密钥的状态，不恢复已被移除的密钥"""
+        with self._cond:
+            removed = {s.key for s in self._removed}
+            existing = {s.key: s for s in self._states}
+            self._states = [existing.get(k) or KeyState(k) for k in keys if k not in removed]
+            self._cond.notify_all()
+
+    def acquire(self, timeout: float = MAX_COOLDOWN) -> str:
+        """取出一个可用密钥，全部处于冷却时等待；密钥池为空时抛出 NoKeyAvailable"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if not self._states:
+                    raise NoKeyAvailable("没有可用的API密钥")
+                now = time.monotonic()
+                ready = [s for s in self._states if s.cooldown_until <= now]
+                if ready:
+                    state = self._pick(ready)
+                    state.in_flight += 1
+                    state.requests += 1
+                    return state.key
+                wait = min(s.cooldown_until for s in self._states) - now
+                if now + wait > deadline:
+                    raise NoKeyAvailable("所有API密钥都处于限流冷却中")
+                self._cond.wait(wait)
+
+    def _pick(self, ready: List[KeyState]) -> KeyState:
+        """按调度策略选择密钥"""
+        if self.strategy == "round_robin":
+            state = ready[self._next % len(ready)]
+            self._next += 1
+            return state
+        # least_loaded：占用最少的优先，相同时按轮询打散
+        self._next += 1
+        offset = self._next % len(ready)
+        rotated = ready[offset:] + ready[:offset]
+        return min(rotated, key=lambda s: s.in_flight)
+
+    def release(self, key: str, rate_limited: bool = False):
+        """归还密钥；rate_limited 为 True 时按指数退避进入冷却"""
+        with self._cond:
+            state = self._find(key)
+            if state is None:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            if rate_limited:
+                state.rate_limited += 1
+                state.cooldown = min(MAX_COOLDOWN, state.cooldown * 2 or RATE_LIMIT_COOLDOWN)
+                state.cooldown_until = time.monotonic() + state.cooldown
+            else:
+                state.cooldown = 0.0
+            self._cond.notify_all()
+
+    def remove(self, key: str) -> Optional[KeyState]:
+        """移除无效或额度用尽的密钥"""
+        with self._cond:
+            state = self._find(key)
+            if state is not None:
+                self._states.remove(state)
+                self._removed.append(state)
+            self._cond.notify_all()
+            return state
+
+    def _find(self, key: str) -> Optional[KeyState]:
+        for state in self._states:
+            if state.key == key:
+                return state
+        return None
+
+    def stats(self) -> List[dict]:
+        """各密钥的统计信息（密钥已脱敏）"""
+        with self._cond:
+            return [
+                {"key": s.masked, "requests": s.requests, "in_flight": s.in_flight,
+                 "rate_limited": s.rate_limited, "removed": s in self._removed}
+                for s in self._states + self._removed
+            ]
+
+
+_pools: Dict[str, KeyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(provider: str, extra: str = "") -> KeyPool:
+    """获取（必要时创建）某个模型的密钥池，并合并最新的密钥配置"""
+    provider = provider.lower()
+    keys = load_keys(provider, extra)
+    with _pools_lock:
+        pool = _pools.get(provider)
+        if pool is None:
+            pool = _pools[provider] = KeyPool(keys)
+        else:
+            pool.set_keys(keys)
+        return pool
@@ -0,0 +1,388 @@
+"""
+模组游戏文本翻译
+功能：从每个模组的 Defs 和 Languages/English/Keyed 中流式提取需要翻译的文本，
+按 token 预算打包成批次交给 chat2gpt4o 翻译，
+写入 Languages/ChineseSimplified 下的 Keyed 和 DefInjected 文件，吞吐量以 条/秒 统计
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.sax.saxutils import escape
+
+import chat2gpt4o
+import key_pool
+import backends
+import run_log
+from usage_tracker import BudgetExceeded, estimate_tokens
+
+
+TARGET_LANGUAGE = 'ChineseSimplified'
+
+# Def 中需要翻译的顶层字段
+TRANSLATABLE_FIELDS = (
+    'label', 'labelShort', 'labelNoun', 'labelPlural', 'description',
+    'jobString', 'reportString', 'verb', 'gerund', 'pawnLabel', 'pawnsPlural',
+)
+
+# 每个批次的输入 token 上限
+DEFAULT_BATCH_TOKENS = 1500
+
+# 译文 token 数约为原文的倍数（英文译为中文，留有余量），每条另加 JSON 键和引号的开销
+OUTPUT_TOKEN_RATIO = 2.0
+OUTPUT_TOKENS_PER_ITEM = 8
+
+# 占位符和标签：{0}、{PAWN_nameDef}、[PAWN_pronoun]、<color=...>、\n
+PLACEHOLDER_PATTERN = re.compile(r'\{[^}]*\}|\[[A-Za-z_]+\]|</?[a-zA-Z][^>]*>|\\n')
+
+BATCH_PROMPT = (
+    '你是游戏《RIMWORLD》的模组汉化助手。我会给出一个 JSON 对象，键是编号，值是游戏中的文本。'
+    '请把每个值翻译成简体中文，用词符合游戏内已有的汉化习惯，'
+    '必须原样保留 {0}、{PAWN_nameDef}、[PAWN_pronoun]、<color=...> 等占位符和标签以及 \\n 换行符。'
+    '请按相同的键只返回 JSON 对象，不要输出任何其他内容。'
+)
+
+BATCH_FEW_SHOTS = [
+    (
+        '{"0": "wooden wall", "1": "{PAWN_nameDef} has finished building the {1}.", '
+        '"2": "A simple wall.\\nCan be built from any material."}',
+        '{"0": "木墙", "1": "{PAWN_nameDef}已经建好了{1}。", '
+        '"2": "一面简单的墙。\\n可以使用任何材料建造。"}'
+    ),
+]
+
+
+TranslatableString = namedtuple('TranslatableString', [
+    'mod',          # 模组文件夹
+    'kind',         # 'Keyed' 或 'DefInjected'
+    'target_file',  # 写入的目标文件（完整路径）
+    'key',          # Keyed 的键，或 defName.字段
+    'text',         # 原文
+])
+
+
+def _safe_listdir(path: str) -> List[str]:
+    try:
+        return sorted(os.listdir(path))
+    except OSError:
+        return []
+
+
+def _content_bases(mod_folder: str) -> List[str]:
+    """模组根目录及其版本目录（1.5、Common 等），Defs 和 Languages 都可能位于其中"""
+    bases = [mod_folder]
+    for name in _safe_listdir(mod_folder):
+        path = os.path.join(mod_folder, name)
+        if (name[:1].isdigit() or name == 'Common') and os.path.isdir(path):
+            bases.append(path)
+    return bases
+
+
+def _iter_xml_files(folder: str) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(folder):
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.xml'):
+                yield os.path.join(dirpath, filename)
+
+
+def _parse(path: str) -> Optional[ET.Element]:
+    try:
+        return ET.parse(path).getroot()
+    except (ET.ParseError, OSError):
+        return None
+
+
+def _existing_keys(language_dir: str) -> set:
+    """已有译文的键：Keyed 为键名，DefInjected 为 Def类型/defName.字段"""
+    keys = set()
+    for path in _iter_xml_files(os.path.join(language_dir, 'Keyed')):
+        root = _parse(path)
+        if root is not None:
+            keys.update(child.tag for child in root)
+    def_injected = os.path.join(language_dir, 'DefInjected')
+    for def_type in _safe_listdir(def_injected):
+        for path in _iter_xml_files(os.path.join(def_injected, def_type)):
+            root = _parse(path)
+            if root is not None:
+                keys.update(f'{def_type}/{child.tag}' for child in root)
+    return keys
+
+
+def iter_strings(mod_folder: str, target_language: str = TARGET_LANGUAGE) -> Iterator[TranslatableString]:
+    """流式产出一个模组中尚未翻译的文本"""
+    for base in _content_bases(mod_folder):
+        target_dir = os.path.join(base, 'Languages', target_language)
+        existing = _existing_keys(target_dir)
+
+        # Keyed 文本
+        keyed_dir = os.path.join(base, 'Languages', 'English', 'Keyed')
+        for path in _iter_xml_files(keyed_dir):
+            root = _parse(path)
+            if root is None:
+                continue
+            target_file = os.path.join(target_dir, 'Keyed', os.path.relpath(path, keyed_dir))
+            for child in root:
+                if isinstance(child.tag, str) and child.text and child.text.strip() and child.tag not in existing:
+                    yield TranslatableString(mod_folder, 'Keyed', target_file, child.tag, child.text)
+
+        # Defs 中的 label、description 等字段
+        defs_dir = os.path.join(base, 'Defs')
+        for path in _iter_xml_files(defs_dir):
+            root = _parse(path)
+            if root is None:
+                continue
+            for def_elem in root:
+                def_name = def_elem.findtext('defName')
+                if not def_name or def_elem.get('Abstract', '').lower() == 'true':
+                    continue
+                def_type = def_elem.tag.split('.')[-1]
+                target_file = os.path.join(target_dir, 'DefInjected', def_type, os.path.basename(path))
+                for field in TRANSLATABLE_FIELDS:
+                    text = def_elem.findtext(field)
+                    key = f'{def_name}.{field}'
+                    if text and text.strip() and f'{def_type}/{key}' not in existing:
+                        yield TranslatableString(mod_folder, 'DefInjected', target_file, key, text)
+
+
+def make_batches(strings: Iterator[TranslatableString],
+                 max_tokens: int = DEFAULT_BATCH_TOKENS) -> Iterator[List[TranslatableString]]:
+    """按输入 token 上限把文本流打包成批次"""
+    batch, tokens = [], 0
+    for item in strings:
+        cost = estimate_tokens(item.text) + 4
+        if batch and tokens + cost > max_tokens:
+            yield batch
+            batch, tokens = [], 0
+        batch.append(item)
+        tokens += cost
+    if batch:
+        yield batch
+
+
+def expected_output_tokens(texts: List[str]) -> int:
+    """一个批次的 JSON 回答预计需要的输出 token 数，用于设置请求的 max_tokens"""
+    return int(sum(estimate_tokens(text) * OUTPUT_TOKEN_RATIO + OUTPUT_TOKENS_PER_ITEM for text in texts)) + 16
+
+
+def placeholders_match(source: str, translated: str) -> bool:
+    """译文是否保留了原文中的全部占位符"""
+    return sorted(PLACEHOLDER_PATTERN.findall(source)) == sorted(PLACEHOLDER_PATTERN.findall(translated))
+
+
+def parse_batch_response(text: str) -> Dict[str, str]:
+    """解析模型返回的 JSON 对象，容忍 ```json 代码块包裹"""
+    if not text:
+        return {}
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.strip('`')
+        text = text[text.find('{'):]
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < 0:
+        return {}
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    return {str(k): v for k, v in data.items() if isinstance(v, str)} if isinstance(data, dict) else {}
+
+
+def write_language_file(path: str, entries: Dict[str, str]):
+    """写入（或合并到已有的）LanguageData 文件，已有的键保持不变"""
+    merged = {}
+    root = _parse(path) if os.path.exists(path) else None
+    if root is not None:
+        merged.update((child.tag, child.text or '') for child in root if isinstance(child.tag, str))
+    for key, value in entries.items():
+        merged.setdefault(key, value)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines = ['<?xml version="1.0" encoding="utf-8"?>', '<LanguageData>']
+    lines += [f'  <{key}>{escape(value)}</{key}>' for key, value in merged.items()]
+    lines.append('</LanguageData>')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+class LanguagesPipeline:
+    """模组游戏文本批量翻译流水线"""
+
+    def __init__(self, model_name: str = "glm", api_key: str = "", base_url: str = "",
+                 batch_tokens: int = DEFAULT_BATCH_TOKENS, workers: int = 0,
+                 target_rate: float = 0.0, log: Callable[[str], None] = print,
+                 progress: Optional[Callable[[int, int], None]] = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.batch_tokens = batch_tokens
+        self.target_rate = target_rate  # 目标吞吐量（条/秒），0 表示不检查
+        self.log = log
+        self.progress = progress  # 进度回调 (已提取的模组数, 模组总数)
+        self.is_running = True
+        backend = backends.resolve(model_name, base_url)
+        if not workers:
+            # 线程数取并发上界，实际同时进行的请求数由后端的 AIMD 控制器决定
+            keys = len(key_pool.get_pool(backend.name, api_key))
+            workers = max(backend.max_concurrency, keys)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._memo: Dict[str, str] = {}  # 本轮运行中相同原文只翻译一次
+        self._results: Dict[str, Dict[str, Dict[str, str]]] = {}  # 模组 -> 目标文件 -> 键 -> 译文
+        self._pending: Dict[str, int] = {}  # 模组 -> 未完成的文本数
+        self.stats = {"strings": 0, "translated": 0, "rejected": 0, "files": 0, "mods": 0}
+
+    def stop(self):
+        self.is_running = False
+
+    def translate_batch(self, batch: List[TranslatableString]) -> Dict[int, str]:
+        """翻译一个批次，返回 批次内序号 -> 译文"""
+        translations = {}
+        request = {}
+        with self._lock:
+            for i, item in enumerate(batch):
+                if item.text in self._memo:
+                    translations[i] = self._memo[item.text]
+                else:
+                    request[str(i)] = item.text
+        if request:
+            response = chat2gpt4o.call_model(
+                model_name=self.model_name,
+                message=json.dumps(request, ensure_ascii=False),
+                pormet=BATCH_PROMPT,
+                api_key=self.api_key,
+                base_url=self.base_url,
+                mod_id=os.path.basename(batch[0].mod),
+                few_shots=BATCH_FEW_SHOTS,
+                # 后端默认的 max_tokens（如 gpt 的 400）装不下整批译文时 JSON 会被截断
+                max_tokens=expected_output_tokens(list(request.values()))
+            )
+            for key, value in parse_batch_response(response).items():
+                if key in request and value.strip() and placeholders_match(request[key], value):
+                    translations[int(key)] = value
+            with self._lock:
+                for i, value in translations.items():
+                    self._memo.setdefault(batch[i].text, value)
+        return translations
+
+    def _finish_batch(self, batch: List[TranslatableString], translations: Dict[int, str]):
+        """记录批次结果"""
+        with self._lock:
+            self.stats["translated"] += len(translations)
+            self.stats["rejected"] += len(batch) - len(translations)
+            for i, item in enumerate(batch):
+                if i in translations:
+                    files = self._results.setdefault(item.mod, {})
+                    files.setdefault(item.target_file, {})[item.key] = translations[i]
+        for item in batch:
+            self._release(item.mod)
+
+    def _release(self, mod: str):
+        """模组的一条文本处理完毕，全部完成（且已提取完）时写入文件"""
+        with self._lock:
+            self._pending[mod] -= 1
+            done = self._pending[mod] == 0
+        if done:
+            self._write_mod(mod)
+
+    def _write_mod(self, mod: str):
+        with self._lock:
+            files = self._results.pop(mod, {})
+            self._pending.pop(mod, None)
+        for path, entries in files.items():
+            write_language_file(path, entries)
+        with self._lock:
+            self.stats["files"] += len(files)
+            self.stats["mods"] += 1 if files else 0
+
+    def _iter_tracked(self, mod_folders: List[str]) -> Iterator[TranslatableString]:
+        """提取文本并登记每个模组尚未完成的文本数"""
+        for index, mod in enumerate(mod_folders):
+            if not self.is_running:
+                return
+            with self._lock:
+                self._pending[mod] = 1  # 提取完成前占位，避免提前写入
+            for item in iter_strings(mod):
+                with self._lock:
+                    self._pending[mod] += 1
+                    self.stats["strings"] += 1
+                yield item
+            self._release(mod)
+            if self.progress:
+                self.progress(index + 1, len(mod_folders))
+
+    def run(self, mod_folders: List[str]) -> dict:
+        """翻译所有模组，返回统计信息"""
+        start_time = time.time()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for batch in make_batches(self._iter_tracked(mod_folders), self.batch_tokens):
+                # 控制在途批次数量，提取和翻译同时进行
+                while len(in_flight) >= self.workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    self._collect(done)
+                in_flight.add(executor.submit(self._run_batch, batch))
+            done, _ = wait(in_flight)
+            self._collect(done)
+
+        elapsed = max(time.time() - start_time, 1e-6)
+        self.stats["seconds"] = elapsed
+        self.stats["rate"] = self.stats["translated"] / elapsed
+        self.log(
+            f"📚 提取 {self.stats['strings']} 条，翻译 {self.stats['translated']} 条，"
+            f"未通过 {self.stats['rejected']} 条，写入 {self.stats['files']} 个文件，"
+            f"用时 {elapsed:.1f} 秒，{self.stats['rate']:.1f} 条/秒"
+        )
+        if self.target_rate and self.stats["rate"] < self.target_rate:
+            self.log(f"⚠️ 吞吐量低于目标 {self.target_rate:.1f} 条/秒，可增加密钥或提高批次大小")
+        return self.stats
+
+    def _run_batch(self, batch: List[TranslatableString]):
+        translations = {}
+        try:
+            if self.is_running:
+                translations = self.translate_batch(batch)
+        finally:
+            self._finish_batch(batch, translations)
+
+    def _collect(self, futures):
+        for future in futures:
+            try:
+                future.result()
+            except BudgetExceeded as e:
+                self.is_running = False
+                self.log(f"🛑 {str(e)}，停止处理")
+            except Exception as e:
+                self.log(f"❌ 批次翻译失败: {str(e)}")
+
+
+def main():
+    run_log.setup()  # 后台线程写 JSON 运行日志
+    parser = argparse.ArgumentParser(description="翻译模组 Defs 和 Keyed 文本到 Languages/ChineseSimplified")
+    parser.add_argument("directory", help="模组所在文件夹（如 workshop/content/294100）")
+    parser.add_argument("--model", default="glm")
+    parser.add_argument("--api-key", default="")
+    parser.add_argument("--base-url", default="")
+    parser.add_argument("--batch-tokens", type=int, default=DEFAULT_BATCH_TOKENS)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--target-rate", type=float, default=0.0, help="目标吞吐量（条/秒）")
+    args = parser.parse_args()
+
+    folders = [
+        os.path.join(args.directory, name) for name in _safe_listdir(args.directory)
+        if os.path.isdir(os.path.join(args.directory, name))
+    ]
+    pipeline = LanguagesPipeline(args.model, args.api_key, args.base_url,
+                                 args.batch_tokens, args.workers, args.target_rate)
+    pipeline.run(folders)
+    print(chat2gpt4o.usage_tracker.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+实时吞吐统计
+功能：在模型调用处累计每个后端的请求数、进行中数量、延迟、错误和限流次数，
+界面用定时器读取 snapshot()，不为每个请求发送信号；
+EtaEstimator 用最近一段时间的完成速度估算剩余时间
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+
+# 统计窗口（秒）：速率、延迟分位数和错误率都只看最近这段时间
+WINDOW_SECONDS = 60.0
+
+# 每个后端最多保留的样本数
+MAX_SAMPLES = 5000
+
+
+def percentile(values: List[float], q: float) -> float:
+    """已排序列表的分位数（最近秩），空列表返回 0"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+    return values[index]
+
+
+class LiveStats:
+    """线程安全的滑动窗口请求统计"""
+
+    def __init__(self, window: float = WINDOW_SECONDS):
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.in_flight: Dict[str, int] = defaultdict(int)
+            # 每个样本：(完成时间, 延迟秒数, 结果 'ok' / 'error')
+            self.samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+            self.rate_limits: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+
+    def begin(self, provider: str) -> float:
+        """请求开始，返回开始时间，传给 end()"""
+        with self._lock:
+            self.in_flight[provider] += 1
+        return time.monotonic()
+
+    def end(self, provider: str, started: float, ok: bool = True):
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight[provider] = max(0, self.in_flight[provider] - 1)
+            self.samples[provider].append((now, now - started, 'ok' if ok else 'error'))
+
+    def rate_limited(self, provider: str):
+        """记录一次 429"""
+        with self._lock:
+            self.rate_limits[provider].append(time.monotonic())
+
+    def snapshot(self) -> dict:
+        """
+        汇总最近窗口内的统计
+        Returns:
+            {"rps", "in_flight", "providers": {name: {"requests", "p50", "p95", "error_rate", "rate_limit_rate"}}}
+        """
+        now = time.monotonic()
+        since = now - self.window
+        span = min(self.window, max(now - self.started, 1.0))
+        with self._lock:
+            samples = {p: [s for s in d if s[0] >= since] for p, d in self.samples.items()}
+            limits = {p: sum(1 for t in d if t >= since) for p, d in self.rate_limits.items()}
+            in_flight = sum(self.in_flight.values())
+
+        providers = {}
+        total = 0
+        for provider in set(samples) | set(limits):
+            entries = samples.get(provider, [])
+            latencies = sorted(s[1] for s in entries)
+            errors = sum(1 for s in entries if s[2] != 'ok')
+            limited = limits.get(provider, 0)
+            attempts = len(entries) + limited
+            total += len(entries)
+            providers[provider] = {
+                "requests": len(entries),
+                "p50": percentile(latencies, 0.50),
+                "p95": percentile(latencies, 0.95),
+                "error_rate": errors / len(entries) if entries else 0.0,
+                "rate_limit_rate": limited / attempts if attempts else 0.0,
+            }
+        return {"rps": total / span, "in_flight": in_flight, "providers": providers}
+
+
+class EtaEstimator:
+    """根据 (时间, 已完成数量) 采样的滑动平均速度估算剩余时间"""
+
+    def __init__(self, window: float = WINDOW_SECONDS):
+        self.window = window
+        self.points: deque = deque()
+
+    def reset(self):
+        self.points.clear()
+
+    def update(self, done: int, total: int) -> Optional[float]:
+        """记录一次采样，返回预计剩余秒数；速度未知时返回 None"""
+        now = time.monotonic()
+        self.points.append((now, done))
+        while len(self.points) > 2 and self.points[0][0] < now - self.window:
+            self.points.popleft()
+        first_time, first_done = self.points[0]
+        if done >= total:
+            return 0.0
+        if now - first_time <= 0 or done <= first_done:
+            return None
+        rate = (done - first_done) / (now - first_time)
+        return (total - done) / rate
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """把秒数格式化为 "3分12秒" 这样的文本"""
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}小时{seconds % 3600 // 60}分"
+    if seconds >= 60:
+        return f"{seconds // 60}分{seconds % 60}秒"
+    return f"{seconds}秒"
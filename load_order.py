@@ -0,0 +1,129 @@
+"""
+按加载顺序排定翻译优先级
+功能：读取 RimWorld 的 ModsConfig.xml 中已启用的模组列表，
+以及 Steam 的 appworkshop_294100.acf 中的更新时间（可选），
+把已启用的模组排在最前面（按加载顺序），其次是近期更新的模组，最后是其余模组。
+限时或中途停止的运行会先覆盖真正在玩的模组
+"""
+
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
+
+from mod_scanner import ModRecord
+
+
+# RimWorld 的 Steam AppID，创意工坊目录和 acf 文件名都用到它
+RIMWORLD_APP_ID = "294100"
+
+# 多少天内更新过的模组算作"近期更新"
+RECENT_DAYS = 30
+
+# 本地模组和创意工坊模组同时存在时，RimWorld 会给创意工坊副本加上这个后缀
+STEAM_SUFFIX = "_steam"
+
+
+def default_config_path() -> str:
+    """ModsConfig.xml 的默认位置；可用环境变量 RIMWORLD_MODS_CONFIG 覆盖"""
+    override = os.getenv("RIMWORLD_MODS_CONFIG")
+    if override:
+        return override
+    home = os.path.expanduser("~")
+    if sys.platform.startswith("win"):
+        base = os.path.join(home, "AppData", "LocalLow", "Ludeon Studios", "RimWorld by Ludeon Studios")
+    elif sys.platform == "darwin":
+        base = os.path.join(home, "Library", "Application Support", "RimWorld")
+    else:
+        base = os.path.join(home, ".config", "unity3d", "Ludeon Studios", "RimWorld by Ludeon Studios")
+    return os.path.join(base, "Config", "ModsConfig.xml")
+
+
+def read_active_mods(path: str = "") -> List[str]:
+    """读取已启用模组的 packageId（小写），按加载顺序排列；文件不存在时返回空列表"""
+    path = path or default_config_path()
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError):
+        return []
+    active = []
+    for li in root.findall('activeMods/li'):
+        package_id = (li.text or '').strip().lower()
+        if package_id.endswith(STEAM_SUFFIX):
+            package_id = package_id[:-len(STEAM_SUFFIX)]
+        if package_id and package_id not in active:
+            active.append(package_id)
+    return active
+
+
+def workshop_acf_path(workshop_dir: str) -> str:
+    """由 .../workshop/content/294100 推出 .../workshop/appworkshop_294100.acf"""
+    content_dir = os.path.dirname(os.path.abspath(workshop_dir))
+    return os.path.join(os.path.dirname(content_dir), f"appworkshop_{RIMWORLD_APP_ID}.acf")
+
+
+def read_workshop_times(workshop_dir: str) -> Dict[str, int]:
+    """
+    从 Steam 的 acf 文件读取每个创意工坊物品的更新时间
+    Returns:
+        创意工坊 ID（即文件夹名）→ timeupdated（Unix 时间）；文件不存在时为空
+    """
+    try:
+        with open(workshop_acf_path(workshop_dir), 'r', encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+    except OSError:
+        return {}
+    # 只取 "WorkshopItemsInstalled" 段，避免和 "WorkshopItemDetails" 中的同名条目混在一起
+    start = text.find('"WorkshopItemsInstalled"')
+    if start >= 0:
+        text = text[start:]
+    times = {}
+    for item_id, body in re.findall(r'"(\d+)"\s*\{([^{}]*)\}', text):
+        match = re.search(r'"timeupdated"\s*"(\d+)"', body)
+        if match and item_id not in times:
+            times[item_id] = int(match.group(1))
+    return times
+
+
+def updated_time(record: ModRecord, workshop_times: Dict[str, int]) -> float:
+    """模组的最后更新时间：优先用 Steam 记录，否则用 About.xml 的修改时间"""
+    folder_name = os.path.basename(record.folder)
+    if folder_name in workshop_times:
+        return workshop_times[folder_name]
+    try:
+        return os.path.getmtime(os.path.join(record.folder, 'About', 'About.xml'))
+    except OSError:
+        return 0.0
+
+
+def prioritize(records: List[ModRecord], active_ids: Optional[List[str]] = None,
+               workshop_times: Optional[Dict[str, int]] = None,
+               recent_days: int = RECENT_DAYS) -> tuple:
+    """
+    排定处理顺序：已启用（按加载顺序）→ 近期更新（新的在前）→ 其余（新的在前）
+    Returns:
+        (排序后的记录, 已启用数量, 近期更新数量)
+    """
+    order = {package_id: index for index, package_id in enumerate(active_ids or [])}
+    workshop_times = workshop_times or {}
+    recent_after = time.time() - recent_days * 86400
+
+    active, recent, rest = [], [], []
+    for record in records:
+        if record.package_id in order:
+            active.append((order[record.package_id], record))
+            continue
+        updated = updated_time(record, workshop_times)
+        (recent if updated >= recent_after else rest).append((-updated, record))
+
+    ordered = [r for _, r in sorted(active, key=lambda item: item[0])]
+    ordered += [r for _, r in sorted(recent, key=lambda item: item[0])]
+    ordered += [r for _, r in sorted(rest, key=lambda item: item[0])]
+    return ordered, len(active), len(recent)
+
+
+def schedule(records: List[ModRecord], workshop_dir: str, config_path: str = "") -> tuple:
+    """读取 ModsConfig.xml 和 Steam 更新时间后排序，返回值同 prioritize"""
+    return prioritize(records, read_active_mods(config_path), read_workshop_times(workshop_dir))
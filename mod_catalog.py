@@ -0,0 +1,229 @@
+"""
+模组目录（持久化）
+功能：把所有模组的 packageId、文件夹、原名、译名、描述哈希、支持版本、翻译状态、
+使用的模型和时间保存在 SQLite 中，按 About.xml 的修改时间增量更新，
+并建立全文索引（FTS5 trigram，中英文都支持子串搜索），
+界面启动时直接读取目录，运行可以只针对筛选出的模组
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List
+
+import mod_scanner
+import translation_pack
+from mod_scanner import ModRecord
+
+
+# 目录数据库文件，默认位于程序目录
+CATALOG_FILE = os.getenv("MOD_CATALOG", "mod_catalog.sqlite3")
+
+# 翻译状态
+PENDING = "pending"          # 尚未翻译
+TRANSLATED = "translated"    # 已有中文名
+FAILED = "failed"            # 上次翻译失败
+
+STATUS_NAMES = {PENDING: "未翻译", TRANSLATED: "已翻译", FAILED: "失败"}
+
+
+def _about_mtime(folder: str) -> float:
+    try:
+        return os.path.getmtime(os.path.join(folder, 'About', 'About.xml'))
+    except OSError:
+        return 0.0
+
+
+class ModCatalog:
+    """线程安全的模组目录"""
+
+    def __init__(self, path: str = CATALOG_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")  # 界面读取时工作线程可以同时写入
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS mods ("
+            "folder TEXT PRIMARY KEY, package_id TEXT, original_name TEXT, translated_name TEXT, "
+            "description_hash TEXT, supported_versions TEXT, status TEXT NOT NULL, provider TEXT, "
+            "about_mtime REAL, scanned_at INTEGER, translated_at INTEGER)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_status ON mods(status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_package ON mods(package_id)")
+        self.fts = self._create_fts()
+        self._db.commit()
+
+    def _create_fts(self) -> bool:
+        """创建全文索引和同步触发器；SQLite 不支持 FTS5 时退回到 LIKE 搜索"""
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                self._db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS mods_fts USING fts5("
+                    "package_id, original_name, translated_name, "
+                    f"content='mods', content_rowid='rowid', tokenize='{tokenizer}')"
+                )
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            return False
+        self._db.executescript(
+            "CREATE TRIGGER IF NOT EXISTS mods_ai AFTER INSERT ON mods BEGIN "
+            "INSERT INTO mods_fts(rowid, package_id, original_name, translated_name) "
+            "VALUES (new.rowid, new.package_id, new.original_name, new.translated_name); END;"
+            "CREATE TRIGGER IF NOT EXISTS mods_ad AFTER DELETE ON mods BEGIN "
+            "INSERT INTO mods_fts(mods_fts, rowid, package_id, original_name, translated_name) "
+            "VALUES ('delete', old.rowid, old.package_id, old.original_name, old.translated_name); END;"
+            "CREATE TRIGGER IF NOT EXISTS mods_au AFTER UPDATE ON mods BEGIN "
+            "INSERT INTO mods_fts(mods_fts, rowid, package_id, original_name, translated_name) "
+            "VALUES ('delete', old.rowid, old.package_id, old.original_name, old.translated_name); "
+            "INSERT INTO mods_fts(rowid, package_id, original_name, translated_name) "
+            "VALUES (new.rowid, new.package_id, new.original_name, new.translated_name); END;"
+        )
+        return True
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ---- 写入 ----
+
+    @staticmethod
+    def _row_for(record: ModRecord) -> dict:
+        """由扫描结果推出目录行；已翻译的模组从 About_old.xml 读取原名"""
+        row = {
+            "folder": os.path.abspath(record.folder),
+            "package_id": record.package_id,
+            "original_name": record.name,
+            "translated_name": "",
+            "description_hash": record.description_hash,
+            "supported_versions": ",".join(record.supported_versions),
+            "status": PENDING,
+            "about_mtime": _about_mtime(record.folder),
+            "scanned_at": int(time.time()),
+        }
+        if mod_scanner.contains_chinese(record.name):
+            row["status"] = TRANSLATED
+            row["translated_name"] = record.name
+            entry = translation_pack.read_translation(record.folder) if record.has_backup else None
+            if entry:
+                row["original_name"] = entry["o"]
+        return row
+
+    def upsert_records(self, records: List[ModRecord]):
+        """写入扫描结果，保留已有的模型和翻译时间"""
+        rows = [self._row_for(record) for record in records]
+        with self._lock:
+            self._db.executemany(
+                "INSERT INTO mods (folder, package_id, original_name, translated_name, description_hash, "
+                "supported_versions, status, about_mtime, scanned_at) "
+                "VALUES (:folder, :package_id, :original_name, :translated_name, :description_hash, "
+                ":supported_versions, :status, :about_mtime, :scanned_at) "
+                "ON CONFLICT(folder) DO UPDATE SET package_id=excluded.package_id, "
+                "original_name=excluded.original_name, translated_name=excluded.translated_name, "
+                "description_hash=excluded.description_hash, supported_versions=excluded.supported_versions, "
+                "status=CASE WHEN excluded.status='pending' AND mods.status='failed' "
+                "THEN 'failed' ELSE excluded.status END, "
+                "about_mtime=excluded.about_mtime, scanned_at=excluded.scanned_at",
+                rows
+            )
+            self._db.commit()
+
+    def mark_translated(self, record: ModRecord, translated: str, provider: str = ""):
+        with self._lock:
+            self._db.execute(
+                "UPDATE mods SET original_name=?, translated_name=?, status=?, provider=?, "
+                "translated_at=?, about_mtime=? WHERE folder=?",
+                (record.name, translated, TRANSLATED, provider, int(time.time()),
+                 _about_mtime(record.folder), os.path.abspath(record.folder))
+            )
+
+    def mark_failed(self, record: ModRecord):
+        with self._lock:
+            self._db.execute("UPDATE mods SET status=? WHERE folder=?",
+                             (FAILED, os.path.abspath(record.folder)))
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def refresh(self, directory: str, log: Callable[[str], None] = print) -> Dict[str, int]:
+        """
+        增量更新：只重新解析新增或 About.xml 修改过的模组，并删除已不存在的文件夹
+        Returns:
+            {"scanned": 重新解析数, "removed": 删除数, "total": 目录内模组数}
+        """
+        start_time = time.time()
+        directory = os.path.abspath(directory)
+        folders = [
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if os.path.isdir(os.path.join(directory, name))
+        ]
+        with self._lock:
+            known = {
+                row["folder"]: row["about_mtime"] for row in self._db.execute(
+                    "SELECT folder, about_mtime FROM mods WHERE folder LIKE ?",
+                    (os.path.join(directory, '') + '%',))
+            }
+        changed = [f for f in folders if known.get(f) != _about_mtime(f)]
+        errors = []
+        self.upsert_records(list(mod_scanner.scan_mods(changed, errors=errors)))
+        for error in errors:
+            log(f"❌ 解析失败 [{os.path.basename(error.folder)}]: {error.error}")
+
+        removed = sorted(set(known) - set(folders))
+        with self._lock:
+            self._db.executemany("DELETE FROM mods WHERE folder=?", [(f,) for f in removed])
+            self._db.commit()
+            total = self._db.execute(
+                "SELECT COUNT(*) FROM mods WHERE folder LIKE ?", (os.path.join(directory, '') + '%',)
+            ).fetchone()[0]
+        log(f"📚 模组目录已更新：重新解析 {len(changed)} 个，删除 {len(removed)} 个，"
+            f"共 {total} 个，用时 {time.time() - start_time:.2f} 秒")
+        return {"scanned": len(changed), "removed": len(removed), "total": total}
+
+    # ---- 查询 ----
+
+    def _where(self, query: str = "", status: str = "", directory: str = "") -> tuple:
+        """search 和 counts 共用的筛选条件，返回 (WHERE 子句, 参数)"""
+        query = query.strip()
+        clauses, params = [], []
+        if query and self.fts and len(query) >= 3:
+            clauses.append("rowid IN (SELECT rowid FROM mods_fts WHERE mods_fts MATCH ?)")
+            params.append('"' + query.replace('"', '""') + '"')
+        elif query:
+            clauses.append("(package_id LIKE ? OR original_name LIKE ? OR translated_name LIKE ?)")
+            params += [f"%{query}%"] * 3
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if directory:
+            clauses.append("folder LIKE ?")
+            params.append(os.path.join(os.path.abspath(directory), '') + '%')
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def search(self, query: str = "", status: str = "", directory: str = "",
+               limit: int = 0) -> List[dict]:
+        """
+        按关键字（packageId、原名、译名）和状态筛选
+        Args:
+            query: 关键字，空表示不过滤
+            status: PENDING / TRANSLATED / FAILED，空表示全部
+            directory: 只返回该目录下的模组
+            limit: 最多返回的条数，0 表示不限制
+        """
+        where, params = self._where(query, status, directory)
+        sql = "SELECT * FROM mods" + where + " ORDER BY original_name COLLATE NOCASE"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    def counts(self, query: str = "", directory: str = "") -> Dict[str, int]:
+        """各状态的模组数，按与 search 相同的关键字和目录筛选"""
+        where, params = self._where(query, "", directory)
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM mods" + where + " GROUP BY status",
+                                         params).fetchall())
@@ -0,0 +1,249 @@
+"""
+模组元数据提取
+功能：把模组文件夹分片交给进程池并行解析 About.xml，
+返回体积小、可序列化的 ModRecord 给网络请求阶段使用，
+XML 解析不再和网络线程、Qt 界面线程争抢 GIL
+"""
+
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Optional
+
+
+ModRecord = namedtuple('ModRecord', [
+    'folder',              # 模组文件夹完整路径
+    'package_id',          # About.xml 中的 packageId（小写）
+    'name',                # 模组名称
+    'description',         # 模组描述
+    'description_hash',    # 描述的 sha1，用于缓存和变更检测
+    'supported_versions',  # 支持的游戏版本，如 ('1.4', '1.5')
+    'has_backup',          # 是否已存在 About_old.xml
+    'languages',           # Languages 目录下已有的语言文件夹
+])
+
+# 解析失败的模组文件夹（About.xml 格式错误或无法读取）
+ScanError = namedtuple('ScanError', ['folder', 'error'])
+
+# 文件夹数量少于此值时直接在当前进程解析，避免创建进程池的开销
+MIN_PARALLEL_FOLDERS = 200
+
+# 每个分片包含的文件夹数量
+SHARD_SIZE = 64
+
+# CJK 字符分类表：(起始码位, 结束码位, 类别)
+HAN = "han"              # 汉字（含扩展区和兼容汉字）
+KANA = "kana"            # 日文假名
+FULLWIDTH = "fullwidth"  # CJK 标点和全角字符
+CJK_TABLE = (
+    (0x2E80, 0x2FDF, HAN),        # 部首
+    (0x3000, 0x303F, FULLWIDTH),  # CJK 标点
+    (0x3040, 0x30FF, KANA),       # 平假名、片假名
+    (0x31F0, 0x31FF, KANA),       # 片假名语音扩展
+    (0x3400, 0x4DBF, HAN),        # 扩展 A
+    (0x4E00, 0x9FFF, HAN),        # 基本区
+    (0xF900, 0xFAFF, HAN),        # 兼容汉字
+    (0xFF00, 0xFFEF, FULLWIDTH),  # 全角 ASCII、半角片假名
+    (0x20000, 0x2FA1F, HAN),      # 扩展 B-F、兼容汉字补充
+    (0x30000, 0x323AF, HAN),      # 扩展 G-H
+)
+
+# 已有中文本地化的 Languages 文件夹（小写，RimWorld 的官方名称和常见写法）
+CHINESE_LANGUAGE_FOLDERS = ("chinesesimplified", "chinesetraditional", "chinese", "简体中文", "繁體中文")
+
+# 描述中汉字占字母类字符的比例达到此值时视为中文模组
+CHINESE_DESCRIPTION_RATIO = 0.5
+
+# 已自带中文本地化或中文描述的模组不再请求译名（设为 0 关闭，只按名称判断）
+SKIP_LOCALIZED = os.getenv("SKIP_LOCALIZED_MODS", "1") != "0"
+
+
+def _class_pattern(kind: str):
+    return re.compile('[' + ''.join(
+        f'{re.escape(chr(start))}-{re.escape(chr(end))}' for start, end, name in CJK_TABLE if name == kind
+    ) + ']')
+
+
+# 由分类表预先编译，整段文本一次扫描完成
+_HAN = _class_pattern(HAN)
+_KANA = _class_pattern(KANA)
+
+
+def text_hash(text: str) -> str:
+    """计算文本的 sha1"""
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+def contains_chinese(text: str) -> bool:
+    """检查文本是否包含汉字（含扩展区和兼容汉字）"""
+    return _HAN.search(text or '') is not None
+
+
+def is_han(char: str) -> bool:
+    return _HAN.match(char) is not None
+
+
+def is_kana(char: str) -> bool:
+    return _KANA.match(char) is not None
+
+
+def chinese_ratio(text: str) -> float:
+    """汉字在字母类字符中所占的比例"""
+    letters = sum(1 for char in text or '' if char.isalpha())
+    return len(_HAN.findall(text or '')) / letters if letters else 0.0
+
+
+def chinese_localization(record: ModRecord) -> str:
+    """
+    模组是否已自带中文：名称已是中文、带有中文语言文件夹或描述以中文为主
+    只使用扫描时已提取的元数据，不读取文件，可以在任何网络请求之前过滤；
+    已翻译过（有备份）的模组只按名称判断，模组更新后仍可重新翻译
+    Returns:
+        原因，没有中文时为空字符串
+    """
+    if contains_chinese(record.name):
+        return "已包含中文"
+    if not SKIP_LOCALIZED or record.has_backup:
+        return ""
+    for language in record.languages:
+        folder = language.lower()
+        if folder.startswith(CHINESE_LANGUAGE_FOLDERS) or contains_chinese(language):
+            return f"已有中文本地化（Languages/{language}）"
+    if chinese_ratio(record.description) >= CHINESE_DESCRIPTION_RATIO:
+        return "描述为中文"
+    return ""
+
+
+def content_hash(name: str, description: str) -> str:
+    """名称和描述的短哈希，模组更新名称或描述后会变化"""
+    return text_hash(name + '\n' + description)[:16]
+
+
+def _list_languages(folder: str) -> tuple:
+    """列出模组（含各版本子目录）Languages 下的语言文件夹"""
+    found = []
+    candidates = [folder] + [
+        os.path.join(folder, name) for name in _safe_listdir(folder)
+        if name[:1].isdigit() or name == 'Common'
+    ]
+    for base in candidates:
+        for name in _safe_listdir(os.path.join(base, 'Languages')):
+            if name not in found:
+                found.append(name)
+    return tuple(found)
+
+
+def _safe_listdir(path: str) -> List[str]:
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
+
+
+def extract_about(folder: str) -> Optional[ModRecord]:
+    """
+    解析单个模组的 About.xml，没有 About.xml 时返回 None
+    Raises:
+        ET.ParseError: About.xml 格式错误
+        OSError: 无法读取
+        ValueError: About.xml 中没有 name
+    """
+    about_dir = os.path.join(folder, 'About')
+    about_path = os.path.join(about_dir, 'About.xml')
+    if not os.path.exists(about_path):
+        return None
+    root = ET.parse(about_path).getroot()
+    if root.find('name') is None:
+        raise ValueError("About.xml 中没有 name")
+
+    name = root.findtext('name') or '未找到名称'
+    description = root.findtext('description') or '未找到描述'
+    versions = tuple(
+        (li.text or '').strip()
+        for li in root.findall('supportedVersions/li')
+        if (li.text or '').strip()
+    )
+    return ModRecord(
+        folder=folder,
+        package_id=(root.findtext('packageId') or '').strip().lower(),
+        name=name,
+        description=description,
+        description_hash=text_hash(description),
+        supported_versions=versions,
+        has_backup=os.path.exists(os.path.join(about_dir, 'About_old.xml')),
+        languages=_list_languages(folder),
+    )
+
+
+def write_translated_name(folder: str, translated: str, store=None):
+    """
+    备份 About.xml 并把 name 替换为译名
+    Args:
+        store: 集中备份库（backup_store.BackupStore），为 None 时备份为模组内的 About_old.xml
+    """
+    about_path = os.path.join(folder, 'About', 'About.xml')
+    backup_path = os.path.join(folder, 'About', 'About_old.xml')
+
+    tree = ET.parse(about_path)
+    name_elem = tree.getroot().find('name')
+
+    # 先备份原文件
+    if store is not None:
+        store.backup(folder, translated)
+    else:
+        tree.write(backup_path, encoding='utf-8', xml_declaration=True)
+
+    # 修改名称并保存
+    name_elem.text = translated
+    tree.write(about_path, encoding='utf-8', xml_declaration=True)
+
+
+def _extract_shard(folders: List[str]) -> list:
+    """进程池中执行：解析一个分片内的所有模组，单个模组出错时记为 ScanError"""
+    results = []
+    for folder in folders:
+        try:
+            record = extract_about(folder)
+        except (ET.ParseError, OSError, ValueError) as e:
+            results.append(ScanError(folder, str(e)))
+            continue
+        if record is not None:
+            results.append(record)
+    return results
+
+
+def _split(results: list, errors: Optional[List[ScanError]]) -> Iterator[ModRecord]:
+    for result in results:
+        if isinstance(result, ScanError):
+            if errors is not None:
+                errors.append(result)
+        else:
+            yield result
+
+
+def scan_mods(folders: List[str], workers: Optional[int] = None,
+              errors: Optional[List[ScanError]] = None) -> Iterator[ModRecord]:
+    """
+    并行提取模组元数据，按分片完成顺序逐个产出 ModRecord
+    Args:
+        folders: 模组文件夹列表
+        workers: 进程数，默认等于 CPU 核数
+        errors: 传入列表时收集解析失败的模组（ScanError），调用方负责报告
+    """
+    if len(folders) < MIN_PARALLEL_FOLDERS:
+        yield from _split(_extract_shard(folders), errors)
+        return
+
+    shards = [folders[i:i + SHARD_SIZE] for i in range(0, len(folders), SHARD_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_extract_shard, shard): shard for shard in shards}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception:
+                # 进程池出错（如子进程崩溃）时在当前进程重新解析该分片，不中断整个扫描
+                results = _extract_shard(futures[future])
+            yield from _split(results, errors)
@@ -0,0 +1,223 @@
+"""
+多语言译名
+功能：一次请求让模型以 JSON 同时返回多种目标语言的简短译名，
+各语言的译名保存在模组的 About/About_names.json 中（共享缓存中也保存全部语言），
+之后可以在不调用模型的情况下把整个模组库切换到任意一种已有的语言。
+API 请求数只与模组数量有关，与语言数量无关
+"""
+
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import mod_scanner
+import translation_pack
+
+
+# 支持的目标语言（代码 → 显示名称）
+LANGUAGES = OrderedDict([
+    ("zh-Hans", "简体中文"),
+    ("zh-Hant", "繁體中文"),
+    ("ja", "日本語"),
+])
+
+# 默认语言，与原来的单语言流程相同
+DEFAULT_LANGUAGE = "zh-Hans"
+
+# 每个模组保存各语言译名的文件
+NAMES_FILE = "About_names.json"
+
+# 切换语言的结果
+SWITCHED = "switched"      # 已切换
+UNCHANGED = "unchanged"    # 已经是该语言
+MISSING = "missing"        # 没有该语言的译名
+
+# 示例问答的多语言答案（以简体中文答案为键），与 ModProcessorWorker 的示例对应
+EXAMPLE_NAMES = {
+    '卫生需求与厕所淋浴管道系统': {
+        "zh-Hant": '衛生需求與廁所淋浴管道系統',
+        "ja": '衛生ニーズとトイレ・シャワー配管システム',
+    },
+    '殖民者详细信息面板显示': {
+        "zh-Hant": '殖民者詳細資訊面板顯示',
+        "ja": '入植者の詳細情報パネル表示',
+    },
+    '原版扩展系列前置框架': {
+        "zh-Hant": '原版擴充系列前置框架',
+        "ja": 'Vanilla Expandedシリーズ前提フレームワーク',
+    },
+}
+
+
+def parse_languages(text: str) -> List[str]:
+    """
+    解析逗号分隔的语言代码，如 "zh-Hans,ja"；空文本返回默认语言
+    Raises:
+        ValueError: 包含不支持的语言
+    """
+    codes = [code.strip() for code in re.split(r'[,，\s]+', text) if code.strip()]
+    unknown = [code for code in codes if code not in LANGUAGES]
+    if unknown:
+        raise ValueError(f"不支持的语言: {', '.join(unknown)}（可选: {', '.join(LANGUAGES)}）")
+    return list(dict.fromkeys(codes)) or [DEFAULT_LANGUAGE]
+
+
+def is_default(languages: List[str]) -> bool:
+    """是否为原来的单语言（简体中文）流程"""
+    return list(languages) == [DEFAULT_LANGUAGE]
+
+
+def build_prompt(languages: List[str]) -> str:
+    """要求模型按语言代码返回 JSON 的系统提示词"""
+    targets = "、".join(f"{code}（{LANGUAGES[code]}）" for code in languages)
+    return (
+        '我会给出游戏《RIMWORLD》的模组名称和模组的描述，'
+        '你需根据原来的名称和描述(不一定是英文，可能是任何语言)'
+        '用大约20个字（不能超过20）来简短总结这个mod是什么或者有什么功能，'
+        f'并分别用以下语言给出总结：{targets}。'
+        '只回答一个 JSON 对象，键为语言代码，值为该语言的总结，不要输出其他内容。'
+    )
+
+
+def build_few_shots(few_shots: List[tuple], languages: List[str]) -> List[tuple]:
+    """把单语言示例的答案换成多语言 JSON"""
+    result = []
+    for question, answer in few_shots:
+        names = dict(EXAMPLE_NAMES.get(answer, {}), **{DEFAULT_LANGUAGE: answer})
+        if all(code in names for code in languages):
+            result.append((question, json.dumps({code: names[code] for code in languages}, ensure_ascii=False)))
+    return result
+
+
+def parse_response(text: str, languages: List[str]) -> Dict[str, str]:
+    """
+    解析模型返回的 JSON（允许包在 ``` 代码块中）
+    Raises:
+        ValueError: 不是 JSON 对象或缺少某个语言
+    """
+    match = re.search(r'\{.*\}', text or '', re.S)
+    if not match:
+        raise ValueError(f"模型没有返回 JSON: {text!r}")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError(f"模型返回的不是 JSON 对象: {text!r}")
+    names = {code: str(data.get(code) or '').strip() for code in languages}
+    missing = [code for code, name in names.items() if not name]
+    if missing:
+        raise ValueError(f"模型结果缺少语言: {', '.join(missing)}")
+    return names
+
+
+def cached_names(value: Optional[dict], languages: List[str]) -> Optional[Dict[str, str]]:
+    """共享缓存条目中包含全部所需语言时返回各语言译名"""
+    if not value:
+        return None
+    names = dict(value.get("names") or {})
+    names.setdefault(DEFAULT_LANGUAGE, value.get("name") or '')
+    if all(names.get(code) for code in languages):
+        return {code: names[code] for code in languages}
+    return None
+
+
+def _names_path(folder: str) -> str:
+    return os.path.join(folder, 'About', NAMES_FILE)
+
+
+def read_names(folder: str) -> dict:
+    """读取 About_names.json：{"original": 原名, "names": {语言: 译名}}，不存在时返回空结构"""
+    try:
+        with open(_names_path(folder), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"original": "", "names": {}}
+    data.setdefault("original", "")
+    data.setdefault("names", {})
+    return data
+
+
+def has_languages(folder: str, languages: List[str]) -> bool:
+    names = read_names(folder)["names"]
+    return all(names.get(code) for code in languages)
+
+
+def source_record(record: mod_scanner.ModRecord, store=None) -> mod_scanner.ModRecord:
+    """
+    已翻译的模组换回原名，多语言请求和缓存键都基于原文
+    Args:
+        store: 集中备份库，模组内没有 About_old.xml 时从中读取原名
+    """
+    original = read_names(record.folder)["original"]
+    if (not original and mod_scanner.contains_chinese(record.name)
+            and (record.has_backup or store is not None)):
+        entry = translation_pack.read_translation(record.folder, store)
+        original = entry["o"] if entry else ""
+    return record._replace(name=original) if original else record
+
+
+def save_names(folder: str, original: str, names: Dict[str, str]):
+    """合并保存各语言译名（保留文件中已有的其他语言）"""
+    data = read_names(folder)
+    data["original"] = data["original"] or original
+    data["names"].update(names)
+    path = _names_path(folder)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def switch_language(folder: str, language: str, store=None) -> str:
+    """
+    把模组显示的名称切换为某种语言的译名
+    About.xml 仍是原名时先备份（与单语言翻译相同），已是某个译名时直接替换
+    Returns:
+        SWITCHED / UNCHANGED / MISSING
+    """
+    data = read_names(folder)
+    target = data["names"].get(language)
+    if not target:
+        return MISSING
+    about_path = os.path.join(folder, 'About', 'About.xml')
+    tree = ET.parse(about_path)
+    name_elem = tree.getroot().find('name')
+    current = (name_elem.text or '') if name_elem is not None else ''
+    if current == target:
+        return UNCHANGED
+    translated = current in data["names"].values() or (current != data["original"] and (
+        os.path.exists(os.path.join(folder, 'About', 'About_old.xml')) or mod_scanner.contains_chinese(current)))
+    if translated:
+        name_elem.text = target
+        tree.write(about_path, encoding='utf-8', xml_declaration=True)
+    else:
+        mod_scanner.write_translated_name(folder, target, store)
+    return SWITCHED
+
+
+def apply_names(folder: str, original: str, names: Dict[str, str], language: str, store=None) -> str:
+    """保存各语言译名并显示其中一种"""
+    save_names(folder, original, names)
+    return switch_language(folder, language, store)
+
+
+def switch_all(directory: str, language: str, store=None, log=print) -> Dict[str, int]:
+    """把目录下所有模组切换到某种语言"""
+    stats = {SWITCHED: 0, UNCHANGED: 0, MISSING: 0, "failed": 0}
+    for name in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, name)
+        if not os.path.isfile(os.path.join(folder, 'About', 'About.xml')):
+            continue
+        try:
+            stats[switch_language(folder, language, store)] += 1
+        except (OSError, ET.ParseError) as e:
+            stats["failed"] += 1
+            log(f"❌ 切换失败 [{name}]: {str(e)}")
+    if store is not None:
+        store.save()
+    log(
+        f"🌐 已切换到 {LANGUAGES.get(language, language)}：{stats[SWITCHED]} 个，"
+        f"已是该语言 {stats[UNCHANGED]} 个，没有该语言译名 {stats[MISSING]} 个，失败 {stats['failed']} 个"
+    )
+    return stats
@@ -0,0 +1,135 @@
+"""
+译名检查
+功能：写入 <name> 之前在本地检查模型的回答（长度、目标文字比例、引号、换行、解释性文字），
+可以自动修正的（首尾空白、成对引号、"总结："前缀、句末标点）直接修正，
+不合格的放入重试队列，结束前用更严格的提示词按批次重新请求，
+避免把错误结果写进模组后再全库重跑
+"""
+
+import json
+import re
+from typing import Dict, List, Optional
+
+from mod_scanner import is_han, is_kana
+from multi_lang import LANGUAGES
+
+
+# 各语言译名的最大长度（提示词要求 20 字，留少量余量）
+MAX_LENGTH = {"zh-Hans": 24, "zh-Hant": 24, "ja": 32}
+DEFAULT_MAX_LENGTH = 24
+
+# 字母类字符中目标文字所占的最低比例（保留少量英文专有名词，如 RimHUD）
+MIN_SCRIPT_RATIO = 0.3
+
+# 不应出现在译名中的引号
+QUOTES = '"\'“”‘’「」『』《》`'
+
+# 说明性回答的标志
+EXPLAIN_MARKERS = ("总结", "總結", "要約", "这个模组", "這個模組", "该模组", "該模組")
+
+# 每批重新请求的模组数
+RETRY_BATCH_SIZE = 8
+
+# 批量回答中每个译名（语言键、引号和最多 32 个汉字/假名）和每个编号预计占用的输出 token 数
+OUTPUT_TOKENS_PER_NAME = 48
+OUTPUT_TOKENS_PER_ITEM = 8
+
+_PREFIX = re.compile(r'^(?:总结|總結|要約|译名|譯名|名称|名稱)\s*[:：]\s*')
+_PAIRS = {'"': '"', "'": "'", '“': '”', '‘': '’', '「': '」', '『': '』', '《': '》', '`': '`'}
+
+
+def clean(text: str) -> str:
+    """修正常见的小问题：首尾空白、"总结："前缀、包住整句的引号、句末标点"""
+    text = (text or '').strip()
+    text = _PREFIX.sub('', text)
+    while len(text) >= 2 and _PAIRS.get(text[0]) == text[-1]:
+        text = text[1:-1].strip()
+    return text.rstrip('。.！!')
+
+
+def validate(text: str, language: str = "zh-Hans") -> Optional[str]:
+    """检查一个译名，合格返回 None，否则返回原因"""
+    if not text:
+        return "结果为空"
+    if '\n' in text or '\r' in text:
+        return "包含换行"
+    limit = MAX_LENGTH.get(language, DEFAULT_MAX_LENGTH)
+    if len(text) > limit:
+        return f"过长（{len(text)} 字，上限 {limit}）"
+    if any(char in QUOTES for char in text):
+        return "包含引号"
+    if any(marker in text for marker in EXPLAIN_MARKERS):
+        return "包含说明性文字"
+    letters = [char for char in text if char.isalpha()]
+    if language == "ja":
+        script = sum(1 for char in letters if is_han(char) or is_kana(char))
+    else:
+        script = sum(1 for char in letters if is_han(char))
+    if not letters or script / len(letters) < MIN_SCRIPT_RATIO:
+        return "目标语言文字比例过低"
+    return None
+
+
+def check(text: str, language: str = "zh-Hans") -> tuple:
+    """修正并检查，返回 (修正后的文本, 不合格原因或 None)"""
+    text = clean(text)
+    return text, validate(text, language)
+
+
+def check_names(names: Dict[str, str]) -> tuple:
+    """多语言结果逐个修正并检查，返回 (修正后的结果, 第一个不合格原因或 None)"""
+    cleaned, reason = {}, None
+    for language, text in names.items():
+        cleaned[language], problem = check(text, language)
+        if problem and reason is None:
+            reason = f"{language} {problem}"
+    return cleaned, reason
+
+
+def retry_prompt(languages: List[str]) -> str:
+    """重新请求时使用的更严格的系统提示词：一次请求多个模组，按编号返回 JSON"""
+    targets = "、".join(LANGUAGES.get(code, code) for code in languages)
+    if len(languages) == 1:
+        shape = '值为总结文本'
+    else:
+        shape = f'值为以语言代码（{", ".join(languages)}）为键的 JSON 对象'
+    return (
+        '我会给出游戏《RIMWORLD》的多个模组的名称和描述，每行一个，以编号开头。'
+        f'请为每个模组用一个不超过20个字的{targets}短语总结它是什么或者有什么功能，'
+        '不要引号、解释、换行或句末标点，不要照抄英文名称。'
+        f'只回答一个 JSON 对象，键为编号，{shape}。'
+    )
+
+
+def batch_message(messages: List[str]) -> str:
+    """多个模组的用户消息，每行一个"""
+    return '\n'.join(f'{index}. {message}' for index, message in enumerate(messages, 1))
+
+
+def batch_max_tokens(count: int, languages: List[str]) -> int:
+    """一批 count 个模组的 JSON 回答预计需要的输出 token 数，用于设置请求的 max_tokens"""
+    return count * (len(languages) * OUTPUT_TOKENS_PER_NAME + OUTPUT_TOKENS_PER_ITEM) + 16
+
+
+def parse_batch(text: str, count: int, languages: List[str]) -> List[Optional[Dict[str, str]]]:
+    """
+    解析批量结果，每个编号返回 {语言: 译名}，缺失或格式不对的为 None
+    Raises:
+        ValueError: 整体不是 JSON 对象
+    """
+    match = re.search(r'\{.*\}', text or '', re.S)
+    if not match:
+        raise ValueError(f"模型没有返回 JSON: {text!r}")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError(f"模型返回的不是 JSON 对象: {text!r}")
+    results = []
+    for index in range(1, count + 1):
+        value = data.get(str(index))
+        if isinstance(value, str) and len(languages) == 1:
+            value = {languages[0]: value}
+        if isinstance(value, dict) and all(isinstance(value.get(code), str) for code in languages):
+            results.append({code: value[code] for code in languages})
+        else:
+            results.append(None)
+    return results
@@ -0,0 +1,198 @@
+"""
+采样性能分析
+功能：后台线程按固定间隔（默认 10 毫秒）用 sys._current_frames() 采样所有线程的调用栈，
+不插桩、不修改被分析的代码，开销与线程数和栈深度成正比。
+结束后写出三个文件：
+  *.collapsed.txt     折叠栈（flamegraph.pl、inferno、speedscope 均可读取）
+  *.speedscope.json   speedscope 格式，每个线程一个时间线，可直接拖到 https://www.speedscope.app
+  *.summary.txt       按函数汇总的自身/累计采样数和占比
+采样的是墙钟时间：等待网络、锁和队列的时间也会出现在栈中，便于找出界面卡顿和吞吐下降的位置
+"""
+
+import argparse
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# 默认采样间隔（秒）
+DEFAULT_INTERVAL = 0.01
+
+# 输出目录，可用环境变量设置
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# 汇总中列出的函数数
+SUMMARY_TOP = 40
+
+# 栈帧：(函数名, 文件, 函数首行)
+Frame = Tuple[str, str, int]
+
+
+class SamplingProfiler:
+    """对所有线程采样的性能分析器"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()  # (线程名, 栈帧元组，从根到叶) → 采样数
+        self.sample_count = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._frames: Dict[object, Frame] = {}  # code 对象 → 栈帧，避免重复格式化
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._stop.clear()
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.monotonic() - self.started
+
+    def _frame(self, code) -> Frame:
+        frame = self._frames.get(code)
+        if frame is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            frame = self._frames[code] = (name, code.co_filename, code.co_firstlineno)
+        return frame
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, top in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                frame = top
+                while frame is not None:
+                    stack.append(self._frame(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(names.get(ident, str(ident)), tuple(stack))] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _label(frame: Frame) -> str:
+        name, path, line = frame
+        return f"{name} ({os.path.basename(path)}:{line})"
+
+    def collapsed(self) -> List[str]:
+        """折叠栈：线程;根;...;叶 采样数"""
+        return [
+            ";".join([thread] + [self._label(frame).replace(";", ",") for frame in stack]) + f" {count}"
+            for (thread, stack), count in self.samples.most_common()
+        ]
+
+    def speedscope(self, name: str = "profile") -> dict:
+        """speedscope 的 sampled 格式，每个线程一个 profile，权重为秒"""
+        index: Dict[Frame, int] = {}
+        frames = []
+        profiles: Dict[str, dict] = {}
+        for (thread, stack), count in self.samples.items():
+            ids = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                ids.append(index[frame])
+            profile = profiles.setdefault(thread, {
+                "type": "sampled", "name": thread, "unit": "seconds",
+                "startValue": 0, "endValue": 0, "samples": [], "weights": [],
+            })
+            profile["samples"].append(ids)
+            profile["weights"].append(count * self.interval)
+            profile["endValue"] += count * self.interval
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": sorted(profiles.values(), key=lambda p: -p["endValue"]),
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "profiler.py",
+        }
+
+    def function_stats(self) -> List[tuple]:
+        """按函数汇总：[(栈帧, 自身采样数, 累计采样数)]，按累计采样数降序"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for (_, stack), count in self.samples.items():
+            if stack:
+                own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        return sorted(((frame, own[frame], total[frame]) for frame in total), key=lambda row: -row[2])
+
+    def summary(self, top: int = SUMMARY_TOP) -> List[str]:
+        all_samples = sum(self.samples.values()) or 1
+        threads = Counter()
+        for (thread, _), count in self.samples.items():
+            threads[thread] += count
+        lines = [
+            f"采样 {self.sample_count} 次，间隔 {self.interval * 1000:.0f} 毫秒，用时 {self.elapsed:.1f} 秒，"
+            f"{len(threads)} 个线程",
+            "线程: " + "，".join(f"{thread} {count}" for thread, count in threads.most_common()),
+            f"{'自身':>8} {'累计':>8} {'累计%':>7}  函数",
+        ]
+        for frame, own, total in self.function_stats()[:top]:
+            lines.append(f"{own:>8} {total:>8} {total / all_samples:>7.1%}  {self._label(frame)}")
+        return lines
+
+    def save(self, directory: str = PROFILE_DIR, name: str = "") -> Dict[str, str]:
+        """写出折叠栈、speedscope 和汇总文件，返回 {类型: 路径}"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name or datetime.now().strftime("profile-%Y%m%d-%H%M%S"))
+        paths = {
+            "collapsed": base + ".collapsed.txt",
+            "speedscope": base + ".speedscope.json",
+            "summary": base + ".summary.txt",
+        }
+        with open(paths["collapsed"], "w", encoding="utf-8") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        with open(paths["speedscope"], "w", encoding="utf-8") as f:
+            json.dump(self.speedscope(os.path.basename(base)), f, ensure_ascii=False)
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write("\n".join(self.summary()) + "\n")
+        return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在采样分析下运行一个脚本，如 python profiler.py job_queue.py work ...")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, help="采样间隔（秒）")
+    parser.add_argument("--output", default=PROFILE_DIR, help="输出目录")
+    parser.add_argument("script")
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    sys.argv = [args.script] + args.args
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    profiler = SamplingProfiler(args.interval)
+    profiler.start()
+    try:
+        runpy.run_path(args.script, run_name="__main__")
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        profiler.stop()
+        paths = profiler.save(args.output)
+        print("\n".join(profiler.summary(20)))
+        for path in paths.values():
+            print(f"已写入 {path}")
+
+
+if __name__ == "__main__":
+    main()
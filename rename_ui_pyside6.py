@@ -5,9 +5,12 @@ RimWorld Mod 名称翻译工具 - PySide6版本
 """
 
 import os
+import sys
+import multiprocessing
 import xml.etree.ElementTree as ET
 import time
 import json
+import threading
 from pathlib import Path
 from typing import Optional, List
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -15,9 +18,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLineEdit, QTextEdit, QLabel, QFileDialog,
-    QGroupBox, QProgressBar, QMessageBox, QTabWidget
+    QGroupBox, QProgressBar, QMessageBox, QTabWidget, QComboBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QCheckBox
 )
-from PySide6.QtCore import QThread, Signal, Slot, QObject
+from PySide6.QtCore import QThread, Signal, Slot, QObject, QTimer
 from PySide6.QtGui import QFont, QTextCursor
 
 # 尝试加载环境变量
@@ -28,11 +32,34 @@ except ImportError:
     print("提示：未安装 python-dotenv，请确保手动设置环境变量")
 
 import chat2gpt4o
+import key_pool
+import backends
+import mod_scanner
+from mod_scanner import ModRecord
+from languages_pipeline import LanguagesPipeline
+import shared_cache
+from shared_cache import cache_key, cache_value
+import translation_pack
+import watch_mode
+import load_order
+import retry_policy
+import run_plan
+import run_log
+import multi_lang
+import output_check
+import transport
+import job_queue
+import connections
+from profiler import SamplingProfiler
+from mod_catalog import ModCatalog, STATUS_NAMES
+from run_deadline import Deferred, RunDeadline, parse_deadline
+from backup_store import BackupStore
+from usage_tracker import BudgetExceeded, PRICE_TABLE, cheapest_provider
+from live_stats import EtaEstimator, format_duration
 
 
 class RenameSwapWorkerSignals(QObject):
-    """重命名和交换操作的信号定义"""
-    log = Signal(str)  # 日志信号
+    """重命名和交换操作的信号定义（日志通过 run_log 的 rename 通道输出）"""
     progress = Signal(int, int)  # 进度信号 (当前, 总数)
     finished = Signal()  # 完成信号
     error = Signal(str)  # 错误信号
@@ -41,21 +68,49 @@ class RenameSwapWorkerSignals(QObject):
 class RenameSwapWorker(QThread):
     """重命名和交换操作工作线程"""
     
-    def __init__(self, directory_path: str, operation: str):
+    def __init__(self, directory_path: str, operation: str, pack_path: str = "", backup_dir: str = "",
+                 language: str = ""):
         super().__init__()
         self.directory_path = directory_path
-        self.operation = operation  # 'rename' or 'swap'
+        # 'rename', 'swap', 'export', 'apply', 'store_restore', 'store_reapply' or 'language'
+        self.operation = operation
+        self.pack_path = pack_path  # 翻译包路径（导出/应用时使用）
+        self.backup_dir = backup_dir  # 集中备份目录（集中还原/重新应用时使用，切换语言时可选）
+        self.language = language  # 切换到的语言代码
         self.signals = RenameSwapWorkerSignals()
+        self.log = run_log.Channel("rename")
         self.is_running = True
 
     def stop(self):
         """停止处理"""
         self.is_running = False
-        self.signals.log.emit("⚠️ 正在停止处理...")
+        self.log("⚠️ 正在停止处理...")
 
     def run(self):
         """执行重命名/交换任务"""
         try:
+            # 翻译包导出/应用是整体的批量操作
+            if self.operation == 'export':
+                store = BackupStore(self.backup_dir) if self.backup_dir else None
+                translation_pack.export_pack(self.directory_path, self.pack_path, log=self.log, store=store)
+                return
+            if self.operation == 'apply':
+                store = BackupStore(self.backup_dir) if self.backup_dir else None
+                translation_pack.apply_pack(self.directory_path, self.pack_path, log=self.log, store=store)
+                return
+            if self.operation in ('store_restore', 'store_reapply'):
+                store = BackupStore(self.backup_dir)
+                self.log(store.summary())
+                if self.operation == 'store_restore':
+                    store.restore_all(self.directory_path, log=self.log)
+                else:
+                    store.reapply_all(self.directory_path, log=self.log)
+                return
+            if self.operation == 'language':
+                store = BackupStore(self.backup_dir) if self.backup_dir else None
+                multi_lang.switch_all(self.directory_path, self.language, store, log=self.log)
+                return
+            
             # 获取所有子目录
             folder_paths = self._get_directory_names(self.directory_path)
             
@@ -64,8 +119,8 @@ class RenameSwapWorker(QThread):
                 return
             
             total = len(folder_paths)
-            self.signals.log.emit(f"📁 找到 {total} 个模组文件夹")
-            self.signals.log.emit("=" * 60)
+            self.log(f"📁 找到 {total} 个模组文件夹")
+            self.log("=" * 60)
             
             processed = 0
             skipped = 0
@@ -73,7 +128,7 @@ class RenameSwapWorker(QThread):
             
             for i, folder_path in enumerate(folder_paths):
                 if not self.is_running:
-                    self.signals.log.emit("❌ 处理已被用户停止")
+                    self.log("❌ 处理已被用户停止")
                     break
 
                 about_directory = os.path.join(folder_path, 'About')
@@ -86,24 +141,24 @@ class RenameSwapWorker(QThread):
                     if success:
                         processed += 1
                         folder_name = os.path.basename(folder_path)
-                        self.signals.log.emit(f"✅ [{processed}/{total}] {folder_name}")
+                        self.log(f"✅ [{processed}/{total}] {folder_name}")
                     else:
                         skipped += 1
                         folder_name = os.path.basename(folder_path)
-                        self.signals.log.emit(f"⏭️  [{skipped}/{total}] 跳过: {folder_name}")
+                        self.log(f"⏭️  [{skipped}/{total}] 跳过: {folder_name}")
                     
                     self.signals.progress.emit(i + 1, total)
                     
                 except Exception as e:
                     failed += 1
                     folder_name = os.path.basename(folder_path)
-                    self.signals.log.emit(f"❌ 处理失败 [{folder_name}]: {str(e)}")
+                    self.log(f"❌ 处理失败 [{folder_name}]: {str(e)}")
                     self.signals.progress.emit(i + 1, total)
             
             # 输出统计信息
             if self.is_running:
-                self.signals.log.emit("=" * 60)
-                self.signals.log.emit(
+                self.log("=" * 60)
+                self.log(
                     f"📊 处理完成！成功: {processed}, 跳过: {skipped}, 失败: {failed}"
                 )
             
@@ -135,14 +190,14 @@ class RenameSwapWorker(QThread):
                 root = tree.getroot()
                 name_element = root.find('name')
 
-                if name_element is not None and not any('\u4e00' <= char <= '\u9fff' for char in name_element.text or ''):
+                if name_element is not None and not mod_scanner.contains_chinese(name_element.text):
                     os.rename(about_path, os.path.join(base_directory, 'About_temp.xml'))
                     os.rename(about_old_path, about_path)
                     os.rename(os.path.join(base_directory, 'About_temp.xml'), about_old_path)
                     return True
             return False
         except Exception as e:
-            self.signals.log.emit(f"❌ 重命名错误: {str(e)}")
+            self.log(f"❌ 重命名错误: {str(e)}")
             return False
 
     def _swap_about_files(self, base_directory: str) -> bool:
@@ -156,7 +211,7 @@ class RenameSwapWorker(QThread):
                 root = tree.getroot()
                 name_element = root.find('name')
 
-                if name_element is not None and any('\u4e00' <= char <= '\u9fff' for char in name_element.text or ''):
+                if name_element is not None and mod_scanner.contains_chinese(name_element.text):
                     if os.path.exists(about):
                         os.rename(about, os.path.join(base_directory, 'About_temp.xml'))
                     os.rename(about_old, about)
@@ -164,13 +219,12 @@ class RenameSwapWorker(QThread):
                     return True
             return False
         except Exception as e:
-            self.signals.log.emit(f"❌ 交换错误: {str(e)}")
+            self.log(f"❌ 交换错误: {str(e)}")
             return False
 
 
 class WorkerSignals(QObject):
-    """工作线程的信号定义"""
-    log = Signal(str)  # 日志信号
+    """工作线程的信号定义（日志通过 run_log 的 translate 通道输出）"""
     progress = Signal(int, int)  # 进度信号 (当前, 总数)
     finished = Signal()  # 完成信号
     error = Signal(str)  # 错误信号
@@ -179,98 +233,432 @@ class WorkerSignals(QObject):
 class ModProcessorWorker(QThread):
     """模组处理工作线程"""
     
-    def __init__(self, directory_path: str, model_name: str = "glm", api_key: str = "", base_url: str = ""):
+    def __init__(self, directory_path: str, model_name: str = "glm", api_key: str = "", base_url: str = "",
+                 max_tokens: int = 0, max_cost: float = 0.0, cache_url: str = "",
+                 folders: Optional[List[str]] = None, retranslate: bool = False, backup_dir: str = "",
+                 plan_only: bool = False, languages: Optional[List[str]] = None,
+                 deadline: Optional[float] = None, max_calls: int = 0, queue_target: str = ""):
         super().__init__()
         self.directory_path = directory_path
+        self.folders = folders  # 只处理指定的模组文件夹（监视模式），默认处理整个目录
+        self.retranslate = retranslate  # 已有备份但名称被还原为英文时重新翻译（模组更新后）
         self.model_name = model_name
         self.api_key = api_key
         self.base_url = base_url
+        self.max_tokens = max_tokens  # token 预算，0 表示不限制
+        self.max_cost = max_cost  # 费用预算（元），0 表示不限制
+        self.cache = shared_cache.get_client(cache_url) if cache_url else None  # 团队共享缓存，可选
+        self.backup_store = BackupStore(backup_dir) if backup_dir else None  # 集中备份，可选
+        self.plan_only = plan_only  # 只生成运行计划，不调用模型、不写文件
+        self.languages = languages or [multi_lang.DEFAULT_LANGUAGE]  # 目标语言，第一个写入 About.xml
+        self.multi = not multi_lang.is_default(self.languages)  # 一次请求返回多种语言
+        self.deadline = RunDeadline(deadline, max_calls)  # 截止时间 / 调用次数上限，可选
+        self.queue = job_queue.open_queue(queue_target) if queue_target else None  # 共享任务队列，可选
+        self.catalog = None  # 模组目录，在工作线程中打开
         self.signals = WorkerSignals()
+        self.log = run_log.Channel("translate")
+        self.warmer = connections.Warmer(self.log)
         self.is_running = True
+        self.backend = backends.resolve(model_name, base_url)
         self.prompt = (
             '我会给出游戏《RIMWORLD》的模组名称和模组的描述，'
             '你需根据原来的英文名称和描述(不一定是英文，可能是任何语言)'
             '用大约20个字（不能超过20）来简短总结这个mod是什么或者有什么功能，'
             '请直接回答你对这个mod的总结即可，总结必须为中文。'
         )
+        # 示例问答，与提示词一起作为所有请求共享的固定前缀（便于命中服务端前缀缓存）
+        self.few_shots = [
+            (
+                '名称：Dubs Bad Hygiene，描述：Adds bathrooms, plumbing, water and sewage systems, '
+                'and a hygiene need for colonists.',
+                '卫生需求与厕所淋浴管道系统'
+            ),
+            (
+                '名称：RimHUD，描述：Displays a detailed and customizable info box '
+                'for the selected pawn.',
+                '殖民者详细信息面板显示'
+            ),
+            (
+                '名称：Vanilla Expanded Framework，描述：A library mod required by '
+                'the Vanilla Expanded series of mods.',
+                '原版扩展系列前置框架'
+            ),
+        ]
+        if self.multi:
+            self.prompt = multi_lang.build_prompt(self.languages)
+            self.few_shots = multi_lang.build_few_shots(self.few_shots, self.languages)
+        self._names = {}  # 消息 → 各语言译名（多语言模式）
+        self._prefix_chars = len(self.prompt) + sum(len(q) + len(a) for q, a in self.few_shots)
     
     def stop(self):
         """停止处理"""
         self.is_running = False
-        self.signals.log.emit("⚠️ 正在停止处理...")
+        self.log("⚠️ 正在停止处理...")
     
     def run(self):
         """执行处理任务"""
         try:
+            # 与扫描目录并行预热模型后端的连接（试运行、分发模式和离线回放不需要）
+            if not self.plan_only and not self.queue and not transport.offline():
+                self.warmer.start([connections.backend_target(self.backend, self.api_key)])
+            
             # 获取所有子目录
-            folder_paths = self._get_directory_names(self.directory_path)
+            folder_paths = self.folders or self._get_directory_names(self.directory_path)
             
             if not folder_paths:
                 self.signals.error.emit("未找到任何子文件夹")
                 return
             
-            total = len(folder_paths)
-            self.signals.log.emit(f"📁 找到 {total} 个模组文件夹")
-            self.signals.log.emit("=" * 60)
+            self.log(f"📁 找到 {len(folder_paths)} 个模组文件夹")
             
-            # 使用线程池处理
-            processed = 0
-            skipped = 0
-            failed = 0
+            # 在进程池中并行解析 About.xml，网络阶段只接收精简的 ModRecord
+            start_time = time.time()
+            scan_errors = []
+            records = list(mod_scanner.scan_mods(folder_paths, errors=scan_errors))
+            total = len(records)
+            self.log(
+                f"🔍 解析 {total} 个 About.xml 用时 {time.time() - start_time:.2f} 秒"
+                f"（{len(folder_paths) - total - len(scan_errors)} 个文件夹没有 About.xml，"
+                f"{len(scan_errors)} 个解析失败）"
+            )
+            for error in scan_errors:
+                self.log(f"❌ 解析失败 [{os.path.basename(error.folder)}]: {error.error}")
             
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                futures = {
-                    executor.submit(self._process_folder, folder): folder 
-                    for folder in folder_paths
-                }
-                
-                for future in as_completed(futures):
-                    if not self.is_running:
-                        # 取消所有未完成的任务
-                        for f in futures:
-                            f.cancel()
-                        self.signals.log.emit("❌ 处理已被用户停止")
-                        break
-                    
-                    folder = futures[future]
-                    try:
-                        result = future.result()
-                        if result:
-                            status, name, summary = result
-                            if status == "success":
-                                processed += 1
-                                self.signals.log.emit(
-                                    f"✅ [{processed}/{total}] {name}\n"
-                                    f"   AI总结: {summary}"
-                                )
-                            elif status == "skipped":
-                                skipped += 1
-                                self.signals.log.emit(
-                                    f"⏭️  [{processed + skipped}/{total}] 跳过: {name}"
-                                )
-                        else:
-                            failed += 1
-                            
-                        self.signals.progress.emit(processed + skipped + failed, total)
-                        
-                    except Exception as e:
-                        failed += 1
-                        folder_name = os.path.basename(folder)
-                        self.signals.log.emit(f"❌ 处理失败 [{folder_name}]: {str(e)}")
-                        self.signals.progress.emit(processed + skipped + failed, total)
+            # 扫描结果同步到模组目录
+            self.catalog = ModCatalog()
+            self.catalog.upsert_records(records)
+            
+            # 多语言模式按原名请求，已翻译的模组也可以补充其他语言
+            if self.multi:
+                records = [multi_lang.source_record(record, self.backup_store) for record in records]
+                self.log(f"🌐 目标语言: {', '.join(multi_lang.LANGUAGES[code] for code in self.languages)}（每个模组一次请求）")
+            
+            # 已启用的模组优先，其次是近期更新的模组，限时运行或中途停止时先覆盖常用模组
+            records, active, recent = load_order.schedule(records, self.directory_path)
+            if active or recent:
+                self.log(f"🎯 优先处理：已启用 {active} 个，近期更新 {recent} 个")
+            localized = sum(1 for r in records if self._chinese_reason(r) and not mod_scanner.contains_chinese(r.name))
+            if localized:
+                self.log(f"🈶 {localized} 个模组已自带中文本地化或中文描述，不调用模型")
+            self.log("=" * 60)
+            
+            # 重置用量统计并设置预算
+            chat2gpt4o.usage_tracker.reset()
+            chat2gpt4o.live_stats.reset()
+            retry_policy.retry_budget.reset()
+            chat2gpt4o.usage_tracker.set_budget(self.max_tokens, self.max_cost)
+            
+            # 调用模型前一次性批量查询共享缓存
+            if self.cache:
+                keys = [cache_key(r) for r in records if self._needs_translation(r)]
+                self.cache.reset_stats()
+                start_time = time.time()
+                found = self.cache.prefetch(keys)
+                self.log(
+                    f"🗄️ 共享缓存命中 {found}/{len(keys)}，查询用时 {(time.time() - start_time) * 1000:.0f} 毫秒"
+                )
+            
+            # 归类并预估；试运行到此为止
+            plan = self._log_plan(records)
+            if self.deadline.enabled:
+                self._log_capacity(plan[run_plan.API])
+            if self.plan_only:
+                return
+            
+            self._summaries = {}
+            self._names = {}
+            if self.queue:
+                processed, skipped, failed, deferred = self._run_distributed(plan, total)
+            else:
+                processed, skipped, failed, deferred = self._run_local(records, total)
+            pool = key_pool.get_pool(self.backend.name, self.api_key)
             
             # 输出统计信息
             if self.is_running:
-                self.signals.log.emit("=" * 60)
-                self.signals.log.emit(
+                self.log("=" * 60)
+                self.log(
                     f"📊 处理完成！成功: {processed}, 跳过: {skipped}, 失败: {failed}"
+                    + (f", 延后: {deferred}" if deferred else "")
+                )
+            if deferred and self.deadline.reason:
+                self.log(
+                    f"⏰ {self.deadline.reason}，{deferred} 个模组留到下次运行；"
+                    f"它们在模组目录中仍为\"未翻译\"，再次运行会跳过已完成的模组并按优先级继续"
+                )
+            self.catalog.commit()
+            if self.cache:
+                self.cache.flush()
+                self.log(self.cache.summary())
+            if self.backup_store:
+                self.log(self.backup_store.summary())
+            self.log(chat2gpt4o.usage_tracker.summary())
+            self.log(retry_policy.summary())
+            if transport.MODE != transport.LIVE:
+                self.log(transport.summary())
+            if self.warmer.summary():
+                self.log(self.warmer.summary())
+            if not transport.offline():
+                retry_policy.save_history()  # 回放的延迟不写入历史
+            limiter = self.backend.slots.stats()
+            self.log(
+                f"🎚️ 并发上限最终为 {limiter['limit']}，共下调 {limiter['decreases']} 次，"
+                f"基线延迟 {limiter['baseline']:.2f} 秒"
+            )
+            for entry in pool.stats():
+                status = "已移除" if entry["removed"] else "正常"
+                self.log(
+                    f"   🔑 {entry['key']}: {entry['requests']} 次请求，"
+                    f"限流 {entry['rate_limited']} 次，{status}"
                 )
             
         except Exception as e:
             self.signals.error.emit(f"处理过程出错: {str(e)}")
         finally:
+            self.warmer.stop()
+            # 出错或中途停止也要写入备份索引（每条备份已先写入日志文件）
+            if self.backup_store:
+                try:
+                    self.backup_store.save()
+                except OSError as e:
+                    self.log(f"❌ 保存集中备份索引失败: {str(e)}")
             self.signals.finished.emit()
     
+    def _run_local(self, records: List[ModRecord], total: int) -> tuple:
+        """
+        在本进程的线程池中调用模型
+        Returns:
+            (成功数, 跳过数, 失败数, 延后数)
+        """
+        # 名称和描述完全相同的模组只调用一次模型，结束后复用结果
+        records, duplicates = run_plan.split_duplicates(records, self._build_message)
+        
+        # 线程数取后端并发上界（至少每个密钥一个），实际同时进行的请求数由 AIMD 控制器自动调整
+        pool = key_pool.get_pool(self.backend.name, self.api_key)
+        max_workers = max(self.backend.max_concurrency, len(pool))
+        self.log(f"🌐 后端: {self.backend.name} ({self.backend.model} @ {self.backend.base_url})")
+        self.log(
+            f"🔑 可用API密钥 {len(pool)} 个，工作线程 {max_workers} 个，"
+            f"当前并发上限 {self.backend.slots.current}"
+            f"{'（自适应）' if self.backend.adaptive else ''}"
+        )
+        
+        # 使用线程池处理
+        processed = 0
+        skipped = 0
+        failed = 0
+        deferred = 0
+        rejected = []  # 结果不合格、等待批量重试的模组
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._process_folder, record): record
+                for record in records
+            }
+        
+            for future in as_completed(futures):
+                if not self.is_running:
+                    # 取消所有未完成的任务
+                    for f in futures:
+                        f.cancel()
+                    self.log("❌ 处理已被用户停止")
+                    break
+        
+                record = futures[future]
+                folder = record.folder
+                try:
+                    result = future.result()
+                except BudgetExceeded as e:
+                    self.is_running = False
+                    for f in futures:
+                        f.cancel()
+                    self.log(f"🛑 {str(e)}，停止处理")
+                    break
+                except Exception as e:
+                    failed += 1
+                    self.catalog.mark_failed(record)
+                    folder_name = os.path.basename(folder)
+                    self.log(f"❌ 处理失败 [{folder_name}]: {str(e)}")
+                    self.signals.progress.emit(processed + skipped + failed, total)
+                    continue
+        
+                if result:
+                    status, name, summary = result
+                    if status in ("success", "cached"):
+                        self._summaries[self._build_message(record)] = summary
+                        self.catalog.mark_translated(record, summary, self.backend.name)
+                    if status == "success":
+                        processed += 1
+                        self.log(
+                            f"✅ [{processed}/{total}] {name}\n"
+                            f"   AI总结: {summary}"
+                        )
+                    elif status == "cached":
+                        processed += 1
+                        self.log(
+                            f"🗄️ [{processed}/{total}] {name}\n"
+                            f"   缓存结果: {summary}"
+                        )
+                    elif status == "skipped":
+                        skipped += 1
+                        self.log(
+                            f"⏭️  [{processed + skipped}/{total}] 跳过: {name}"
+                        )
+                    elif status == "deferred":
+                        deferred += 1
+                    elif status == "rejected":
+                        rejected.append(record)
+                        self.log(f"🔂 {name} 结果不合格（{summary}），稍后重试")
+                        continue
+                else:
+                    failed += 1
+                    self.catalog.mark_failed(record)
+        
+                self.signals.progress.emit(processed + skipped + failed + deferred, total)
+        
+        # 不合格的结果用更严格的提示词按批次重新请求
+        if rejected and self.is_running:
+            ok, bad, later = self._retry_rejected(rejected, processed + skipped + failed + deferred, total)
+            processed += ok
+            failed += bad
+            deferred += later
+        elif rejected:
+            failed += len(rejected)
+        
+        # 重复的模组直接写入同一个译名
+        for record, message in duplicates:
+            if not self.is_running:
+                break
+            summary = self._summaries.get(message)
+            if summary is None:
+                if self.deadline.reason:
+                    deferred += 1
+                else:
+                    failed += 1
+                continue
+            try:
+                self._write_result(record, summary, self._names.get(message))
+                self.catalog.mark_translated(record, summary, self.backend.name)
+                processed += 1
+                self.log(f"🔁 [{processed}/{total}] {record.name}\n   复用结果: {summary}")
+            except (OSError, ET.ParseError) as e:
+                failed += 1
+                self.log(f"❌ 处理失败 [{os.path.basename(record.folder)}]: {str(e)}")
+            self.signals.progress.emit(processed + skipped + failed + deferred, total)
+        return processed, skipped, failed, deferred
+    
+    def _run_distributed(self, plan: dict, total: int) -> tuple:
+        """
+        分发模式：需要调用模型的模组放入共享任务队列，由各处的 job_queue work 进程处理，
+        本进程只处理缓存命中的模组，并把完成的结果写回模组文件夹和模组目录
+        Returns:
+            (成功数, 跳过数, 失败数, 仍在队列中的数量)
+        """
+        processed = failed = 0
+        skipped = len(plan[run_plan.SKIP])
+        for record in plan[run_plan.CACHED]:
+            try:
+                result = self._process_folder(record)
+            except Exception as e:
+                result = None
+                self.log(f"❌ 处理失败 [{os.path.basename(record.folder)}]: {str(e)}")
+            if result and result[0] == "cached":
+                processed += 1
+                self.catalog.mark_translated(record, result[2], self.backend.name)
+                self.log(f"🗄️ [{processed}/{total}] {record.name}\n   缓存结果: {result[2]}")
+            else:
+                failed += 1
+        
+        # 同一消息只放入一个任务，完成后写回所有对应的模组
+        waiting = {}
+        jobs = []
+        for record in plan[run_plan.API] + plan[run_plan.DEDUP]:
+            message = self._build_message(record)
+            key = job_queue.job_key(message, self.languages)
+            if key not in waiting:
+                jobs.append({"key": key, "message": message, "mod_id": os.path.basename(record.folder)})
+            waiting.setdefault(key, []).append(record)
+        settings = {"prompt": self.prompt, "few_shots": self.few_shots, "languages": self.languages}
+        added = self.queue.enqueue(jobs, settings)
+        self.log(f"🛰️ 任务队列新增 {added} 个任务（本次共 {len(jobs)} 个），等待工作进程处理...")
+        
+        # 第一次只取本次任务的结果（包括之前已完成的），之后只取新版本，不反复读出队列的全部历史
+        version, finished = self.queue.results(0, list(waiting))
+        while waiting and self.is_running:
+            for item in finished:
+                for record in waiting.pop(item["key"], []):
+                    result = item["result"] if item["status"] == job_queue.DONE else None
+                    if result is None:
+                        failed += 1
+                        self.catalog.mark_failed(record)
+                        self.log(f"❌ 处理失败 [{os.path.basename(record.folder)}]: {item['error']}")
+                        continue
+                    names = result.get("names") if self.multi else None
+                    try:
+                        self._write_result(record, result["name"], names)
+                    except (OSError, ET.ParseError) as e:
+                        failed += 1
+                        self.log(f"❌ 处理失败 [{os.path.basename(record.folder)}]: {str(e)}")
+                        continue
+                    if self.cache:
+                        self.cache.put(cache_key(record), cache_value(result["name"], result.get("model", ""), names))
+                    self.catalog.mark_translated(record, result["name"], result.get("model", ""))
+                    processed += 1
+                    self.log(f"✅ [{processed}/{total}] {record.name}\n   AI总结: {result['name']}（{result.get('model', '')}）")
+            self.signals.progress.emit(processed + skipped + failed, total)
+            if not waiting:
+                break
+            if self.deadline.deadline is not None and not self.deadline.remaining():
+                break
+            time.sleep(job_queue.POLL_INTERVAL)
+            version, finished = self.queue.results(version)
+        
+        remaining = sum(len(records) for records in waiting.values())
+        if remaining:
+            self.log(f"⏸️ {remaining} 个模组的任务仍在队列中，工作进程会继续处理，下次运行直接取回结果")
+        return processed, skipped, failed, remaining
+    
+    def _cached_translation(self, record: ModRecord) -> Optional[str]:
+        """集中备份或共享缓存中已有的译名（不计入缓存命中统计）"""
+        if self.backup_store:
+            restored = self.backup_store.translated_for(record.folder)
+            if restored:
+                return restored
+        if self.cache:
+            cached = self.cache.peek(cache_key(record))
+            if self.multi:
+                names = multi_lang.cached_names(cached, self.languages)
+                return names[self.languages[0]] if names else None
+            if cached:
+                return cached["name"]
+        return None
+    
+    def _log_plan(self, records: List[ModRecord]) -> dict:
+        """归类每个模组并预估各模型的 token 数、费用和耗时"""
+        start_time = time.time()
+        plan = run_plan.classify(records, self._needs_translation, self._build_message,
+                                 self._cached_translation)
+        messages = [self._build_message(record) for record in plan[run_plan.API]]
+        prefix = self.prompt + ''.join(q + a for q, a in self.few_shots)
+        providers = list(dict.fromkeys(list(PRICE_TABLE) + [self.backend.name]))
+        estimates = run_plan.project(messages, prefix, providers, len(self.languages))
+        for line in run_plan.format_plan(plan, estimates, self.backend.name):
+            self.log(line)
+        if messages:
+            self.log(f"   最便宜的模型: {cheapest_provider(estimates)}")
+        self.log(f"   计划用时 {time.time() - start_time:.2f} 秒")
+        return plan
+    
+    def _log_capacity(self, pending: List[ModRecord]):
+        """按测得的吞吐估计截止前能完成多少个需要调用模型的模组"""
+        chars = self._prefix_chars + (
+            sum(len(self._build_message(r)) for r in pending) // len(pending) if pending else 0
+        )
+        capacity = self.deadline.capacity(self.backend.name, chars)
+        line = f"⏰ {self.deadline.describe()}，预计可完成约 {capacity} 次调用"
+        if capacity is not None and capacity < len(pending):
+            line += f"，优先级最低的约 {len(pending) - capacity} 个模组将留到下次运行"
+        self.log(line)
+    
     def _get_directory_names(self, path: str) -> List[str]:
         """获取目录下的所有子目录"""
         try:
@@ -283,41 +671,52 @@ class ModProcessorWorker(QThread):
             self.signals.error.emit(f"读取目录失败: {str(e)}")
             return []
     
-    def _process_folder(self, folder_path: str) -> Optional[tuple]:
-        """处理单个模组文件夹"""
-        about_path = os.path.join(folder_path, 'About', 'About.xml')
-        backup_path = os.path.join(folder_path, 'About', 'About_old.xml')
-        
+    @staticmethod
+    def _build_message(record: ModRecord) -> str:
+        """构造发送给模型的用户消息"""
+        return f'名称：{record.name}，描述：{record.description}'
+    
+    def _process_folder(self, record: ModRecord) -> Optional[tuple]:
+        """处理单个模组（元数据已由 mod_scanner 提取）"""
+        folder_path = record.folder
+        name = record.name
+        
+        # 多语言模式：已有全部目标语言的译名则跳过
+        if self.multi:
+            if not self.retranslate and multi_lang.has_languages(folder_path, self.languages):
+                return ("skipped", name, "已有全部语言")
         # 检查备份文件是否存在，如果存在则跳过
-        if os.path.exists(backup_path):
+        elif record.has_backup and not self.retranslate:
             folder_name = os.path.basename(folder_path)
             return ("skipped", folder_name, "已处理过")
         
-        # 检查About.xml是否存在
-        if not os.path.exists(about_path):
-            return None
+        # 检查名称是否已包含中文、模组是否已自带中文本地化
+        reason = self._chinese_reason(record)
+        if reason:
+            return ("skipped", name, reason)
         
         try:
-            # 解析XML文件
-            tree = ET.parse(about_path)
-            root = tree.getroot()
+            # 集中备份中有同一原文的译名（例如被 Steam 还原），直接写回
+            restored = self.backup_store.translated_for(record.folder) if self.backup_store and not self.multi else None
+            if restored:
+                mod_scanner.write_translated_name(record.folder, restored, self.backup_store)
+                return ("cached", name, restored)
             
-            # 获取名称和描述
-            name_elem = root.find('name')
-            desc_elem = root.find('description')
-            
-            if name_elem is None:
-                return None
-            
-            name = name_elem.text if name_elem.text else '未找到名称'
-            description = desc_elem.text if desc_elem is not None and desc_elem.text else '未找到描述'
-            
-            # 检查名称是否已包含中文
-            if self._contains_chinese(name):
-                return ("skipped", name, "已包含中文")
+            # 再查共享缓存，命中则不调用模型
+            cached = self.cache.get(cache_key(record)) if self.cache else None
+            if self.multi:
+                names = multi_lang.cached_names(cached, self.languages)
+                if names:
+                    self._names[self._build_message(record)] = names
+                    self._write_result(record, names[self.languages[0]], names)
+                    return ("cached", name, names[self.languages[0]])
+            elif cached:
+                mod_scanner.write_translated_name(record.folder, cached["name"], self.backup_store)
+                return ("cached", name, cached["name"])
             
             # 调用AI生成中文总结
-            message = f'名称：{name}，描述：{description}'
+            message = self._build_message(record)
+            
             try:
                 import chat2gpt4o
                 # 使用自定义模型配置
@@ -326,39 +725,305 @@ class ModProcessorWorker(QThread):
                     message=message,
                     pormet=self.prompt,
                     api_key=self.api_key,
-                    base_url=self.base_url
+                    base_url=self.base_url,
+                    mod_id=os.path.basename(folder_path),
+                    few_shots=self.few_shots,
+                    # 限时运行：剩余时间或调用次数不足时不再发出新请求，留到下次
+                    deadline=self.deadline
                 )
+            except Deferred:
+                return ("deferred", name, self.deadline.reason)
             except ImportError:
                 # 如果chat2gpt4o不可用，使用简单的模拟
                 summary = f"中文总结: {name[:10]}模组"
+            except BudgetExceeded:
+                raise
             except Exception as e:
-                self.signals.log.emit(f"❌ AI调用失败: {str(e)}")
+                self.log(f"❌ AI调用失败: {str(e)}")
                 return None
             
             if not summary:
                 return None
             
-            # 先备份原文件
-            tree.write(backup_path, encoding='utf-8', xml_declaration=True)
+            names = None
+            if self.multi:
+                try:
+                    names = multi_lang.parse_response(summary, self.languages)
+                except ValueError as e:
+                    # 格式错误与不合格的结果一样，稍后用批量重试再请求一次
+                    return ("rejected", name, f"多语言结果格式错误: {str(e)}")
+                names, reason = output_check.check_names(names)
+                summary = names[self.languages[0]]
+            else:
+                summary, reason = output_check.check(summary, self.languages[0])
+            if reason:
+                return ("rejected", name, reason)
+            if names:
+                self._names[message] = names
             
-            # 修改名称并保存
-            name_elem.text = summary
-            tree.write(about_path, encoding='utf-8', xml_declaration=True)
+            self._write_result(record, summary, names)
+            if self.cache and not transport.borrowing():
+                self.cache.put(cache_key(record), cache_value(summary, self.backend.name, names))
             
-            # 添加延迟避免API限流
-            time.sleep(1)
+            # 添加延迟避免API限流（本地服务可配置为 0）
+            time.sleep(self.backend.request_interval)
             
             return ("success", name, summary)
             
+        except BudgetExceeded:
+            raise
         except ET.ParseError as e:
             raise Exception(f"XML解析错误: {str(e)}")
         except Exception as e:
             raise Exception(f"处理错误: {str(e)}")
     
-    @staticmethod
-    def _contains_chinese(text: str) -> bool:
-        """检查文本是否包含中文字符"""
-        return any('\u4e00' <= char <= '\u9fff' for char in text)
+    def _retry_rejected(self, rejected: List[ModRecord], done: int, total: int) -> tuple:
+        """
+        用更严格的提示词把不合格的模组按批次重新请求（每批一次调用）
+        Returns:
+            (成功数, 仍失败数, 因限时运行延后的数量)
+        """
+        prompt = output_check.retry_prompt(self.languages)
+        batch_size = output_check.RETRY_BATCH_SIZE
+        self.log(f"🔂 重新请求 {len(rejected)} 个不合格的结果，每批 {batch_size} 个")
+        ok = bad = later = 0
+        for start in range(0, len(rejected), batch_size):
+            batch = rejected[start:start + batch_size]
+            if not self.is_running:
+                bad += len(batch)
+                continue
+            messages = [self._build_message(record) for record in batch]
+            user_message = output_check.batch_message(messages)
+            try:
+                reply = chat2gpt4o.call_model(
+                    model_name=self.model_name,
+                    message=user_message,
+                    pormet=prompt,
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    mod_id="retry-batch",
+                    max_tokens=output_check.batch_max_tokens(len(batch), self.languages),
+                    deadline=self.deadline
+                )
+                results = output_check.parse_batch(reply, len(batch), self.languages) if reply else [None] * len(batch)
+            except Deferred:
+                later += len(batch)
+                continue
+            except BudgetExceeded as e:
+                self.log(f"🛑 {str(e)}，停止重试")
+                self.is_running = False
+                bad += len(batch)
+                continue
+            except Exception as e:
+                self.log(f"❌ 批量重试失败: {str(e)}")
+                results = [None] * len(batch)
+            
+            for record, message, result in zip(batch, messages, results):
+                names, reason = output_check.check_names(result) if result else (None, "没有结果")
+                if reason:
+                    bad += 1
+                    self.catalog.mark_failed(record)
+                    self.log(f"❌ 重试后仍不合格 [{record.name}]: {reason}")
+                    continue
+                summary = names[self.languages[0]]
+                if not self.multi:
+                    names = None
+                try:
+                    self._write_result(record, summary, names)
+                except (OSError, ET.ParseError) as e:
+                    bad += 1
+                    self.log(f"❌ 处理失败 [{os.path.basename(record.folder)}]: {str(e)}")
+                    continue
+                if self.cache and not transport.borrowing():
+                    self.cache.put(cache_key(record), cache_value(summary, self.backend.name, names))
+                self._summaries[message] = summary
+                if names:
+                    self._names[message] = names
+                self.catalog.mark_translated(record, summary, self.backend.name)
+                ok += 1
+                self.log(f"✅ {record.name}\n   重试结果: {summary}")
+            self.signals.progress.emit(done + ok + bad + later, total)
+        return ok, bad, later
+    
+    def _write_result(self, record: ModRecord, summary: str, names: Optional[dict] = None):
+        """写入译名；多语言模式同时保存各语言译名，About.xml 显示第一个目标语言"""
+        if transport.borrowing():
+            return  # 借用的回答与该模组无关
+        if names:
+            multi_lang.apply_names(record.folder, record.name, names, self.languages[0], self.backup_store)
+        else:
+            mod_scanner.write_translated_name(record.folder, summary, self.backup_store)
+    
+    def _needs_translation(self, record: ModRecord) -> bool:
+        """是否需要调用模型（用于预估和缓存预查询）"""
+        if self.multi:
+            return ((self.retranslate or not multi_lang.has_languages(record.folder, self.languages))
+                    and not self._chinese_reason(record))
+        return (self.retranslate or not record.has_backup) and not self._chinese_reason(record)
+    
+    def _chinese_reason(self, record: ModRecord) -> str:
+        """名称已是中文；目标语言都是中文时，模组自带中文本地化也不再请求"""
+        if all(code.startswith("zh") for code in self.languages):
+            return mod_scanner.chinese_localization(record)
+        return "已包含中文" if mod_scanner.contains_chinese(record.name) else ""
+
+
+class LanguagesWorker(QThread):
+    """模组游戏文本（Defs/Keyed）翻译工作线程"""
+    
+    def __init__(self, directory_path: str, model_name: str = "glm", api_key: str = "", base_url: str = "",
+                 max_tokens: int = 0, max_cost: float = 0.0):
+        super().__init__()
+        self.directory_path = directory_path
+        self.signals = WorkerSignals()
+        self.log = run_log.Channel("translate")
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.pipeline = LanguagesPipeline(
+            model_name=model_name,
+            api_key=api_key,
+            base_url=base_url,
+            log=self.log,
+            progress=self.signals.progress.emit
+        )
+    
+    def stop(self):
+        """停止处理"""
+        self.pipeline.stop()
+        self.log("⚠️ 正在停止处理，等待进行中的批次完成...")
+    
+    def run(self):
+        """执行翻译任务"""
+        try:
+            folder_paths = [
+                os.path.join(self.directory_path, name)
+                for name in os.listdir(self.directory_path)
+                if os.path.isdir(os.path.join(self.directory_path, name))
+            ]
+            if not folder_paths:
+                self.signals.error.emit("未找到任何子文件夹")
+                return
+            
+            self.log(f"📁 找到 {len(folder_paths)} 个模组文件夹，开始提取 Defs 和 Keyed 文本")
+            self.log(f"🔑 并发线程 {self.pipeline.workers} 个")
+            self.log("=" * 60)
+            
+            chat2gpt4o.usage_tracker.reset()
+            chat2gpt4o.live_stats.reset()
+            retry_policy.retry_budget.reset()
+            chat2gpt4o.usage_tracker.set_budget(self.max_tokens, self.max_cost)
+            self.pipeline.run(folder_paths)
+            self.log(chat2gpt4o.usage_tracker.summary())
+        except Exception as e:
+            self.signals.error.emit(f"处理过程出错: {str(e)}")
+        finally:
+            self.signals.finished.emit()
+
+
+class WatchWorker(QThread):
+    """监视模式工作线程：新订阅或更新的模组出现时自动处理"""
+    
+    def __init__(self, directory_path: str, model_name: str = "glm", api_key: str = "", base_url: str = "",
+                 cache_url: str = "", backup_dir: str = ""):
+        super().__init__()
+        self.directory_path = directory_path
+        self.model_name = model_name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache_url = cache_url
+        self.backup_dir = backup_dir
+        self.signals = WorkerSignals()
+        self.log = run_log.Channel("translate")
+        self.memory = watch_mode.NameMemory()
+        self.watcher = watch_mode.ModWatcher(
+            directory_path, on_changes=self._handle_changes, log=self.log
+        )
+        self._active = None  # 正在处理一批变化的翻译流程
+        self._active_lock = threading.Lock()
+    
+    def stop(self):
+        """停止监视，并停止正在进行的翻译"""
+        self.watcher.stop()
+        with self._active_lock:
+            worker = self._active
+        if worker is not None:
+            worker.stop()
+        self.log("⚠️ 正在停止监视...")
+    
+    def run(self):
+        """执行监视任务"""
+        try:
+            folders = [
+                os.path.join(self.directory_path, name)
+                for name in os.listdir(self.directory_path)
+                if os.path.isdir(os.path.join(self.directory_path, name))
+            ]
+            count = self.memory.update_from(folders)
+            self.memory.save()
+            self.log(f"🧠 已记录 {count} 个模组的译名，开始监视 {self.directory_path}")
+            self.watcher.run()
+        except Exception as e:
+            self.signals.error.emit(f"监视过程出错: {str(e)}")
+        finally:
+            self.signals.finished.emit()
+    
+    def _handle_changes(self, folders: List[str]):
+        """处理一批变化的模组（已防抖）"""
+        reapply, translate = watch_mode.classify_changes(folders, self.memory)
+        self.log(
+            f"🔔 检测到 {len(folders)} 个模组变化：写回译名 {len(reapply)} 个，需要翻译 {len(translate)} 个"
+        )
+        store = BackupStore(self.backup_dir) if self.backup_dir else None
+        for folder, translated in reapply:
+            try:
+                mod_scanner.write_translated_name(folder, translated, store)
+                self.log(f"♻️ {os.path.basename(folder)} → {translated}")
+            except (OSError, ET.ParseError) as e:
+                self.log(f"❌ 写回失败 [{os.path.basename(folder)}]: {str(e)}")
+        if store:
+            store.save()
+        
+        if translate:
+            # 复用完整的翻译流程，只处理这几个文件夹，在当前线程同步执行
+            worker = ModProcessorWorker(
+                self.directory_path, self.model_name, self.api_key, self.base_url,
+                cache_url=self.cache_url, folders=translate, retranslate=True,
+                backup_dir=self.backup_dir
+            )
+            worker.signals.error.connect(self.log)
+            worker.signals.progress.connect(self.signals.progress.emit)
+            with self._active_lock:
+                if not self.watcher.is_running:
+                    return
+                self._active = worker
+            try:
+                worker.run()
+            finally:
+                with self._active_lock:
+                    self._active = None
+        
+        self.memory.update_from(folders)
+        self.memory.save()
+
+
+class CatalogRefreshWorker(QThread):
+    """增量更新模组目录的工作线程"""
+    
+    def __init__(self, directory_path: str):
+        super().__init__()
+        self.directory_path = directory_path
+        self.signals = WorkerSignals()
+        self.log = run_log.Channel("catalog")
+    
+    def run(self):
+        try:
+            catalog = ModCatalog()
+            catalog.refresh(self.directory_path, log=self.log)
+            catalog.close()
+        except Exception as e:
+            self.signals.error.emit(f"更新模组目录失败: {str(e)}")
+        finally:
+            self.signals.finished.emit()
 
 
 class ModProcessorGUI(QMainWindow):
@@ -368,7 +1033,19 @@ class ModProcessorGUI(QMainWindow):
         super().__init__()
         self.worker = None
         self.rename_swap_worker = None
+        self.backend_config = {}  # 配置文件中声明的额外后端
+        self.catalog = ModCatalog()  # 模组目录，界面线程只读
+        self.catalog_worker = None
+        self.profiler = None  # 本次运行的性能采样，可选
+        run_log.setup()  # 后台线程写 JSON 运行日志
+        self.ui_log = run_log.get_logger("ui")  # 界面自己输出的消息只写入日志文件
         self.init_ui()
+        
+        # 工作线程的日志由定时器批量取出显示，不逐条发送信号
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(200)
+        self.log_timer.timeout.connect(self.drain_logs)
+        self.log_timer.start()
     
     def init_ui(self):
         """初始化UI"""
@@ -406,7 +1083,7 @@ class ModProcessorGUI(QMainWindow):
         self.model_name_input.setText("glm")
         self.model_name_input.setFont(QFont("Microsoft YaHei", 9))
         self.model_name_input.setMinimumHeight(35)
-        self.model_name_input.setPlaceholderText("例如: glm, deepseek, qwen, gpt")
+        self.model_name_input.setPlaceholderText("例如: glm, deepseek, qwen, gpt，或 backends.json 中的后端名")
         model_name_layout.addWidget(model_name_label)
         model_name_layout.addWidget(self.model_name_input)
         model_layout.addLayout(model_name_layout)
@@ -419,7 +1096,7 @@ class ModProcessorGUI(QMainWindow):
         self.api_key_input = QLineEdit()
         self.api_key_input.setFont(QFont("Microsoft YaHei", 9))
         self.api_key_input.setMinimumHeight(35)
-        self.api_key_input.setPlaceholderText("请输入API密钥")
+        self.api_key_input.setPlaceholderText("请输入API密钥，多个密钥用逗号分隔")
         self.api_key_input.setEchoMode(QLineEdit.Password)
         api_key_layout.addWidget(api_key_label)
         api_key_layout.addWidget(self.api_key_input)
@@ -438,6 +1115,96 @@ class ModProcessorGUI(QMainWindow):
         base_url_layout.addWidget(self.base_url_input)
         model_layout.addLayout(base_url_layout)
         
+        # 预算输入
+        budget_layout = QHBoxLayout()
+        budget_label = QLabel("预算上限:")
+        budget_label.setFont(QFont("Microsoft YaHei", 9))
+        budget_label.setMinimumWidth(80)
+        self.token_budget_input = QLineEdit()
+        self.token_budget_input.setFont(QFont("Microsoft YaHei", 9))
+        self.token_budget_input.setMinimumHeight(35)
+        self.token_budget_input.setPlaceholderText("最大 tokens，可选")
+        self.cost_budget_input = QLineEdit()
+        self.cost_budget_input.setFont(QFont("Microsoft YaHei", 9))
+        self.cost_budget_input.setMinimumHeight(35)
+        self.cost_budget_input.setPlaceholderText("最大费用（元），可选")
+        budget_layout.addWidget(budget_label)
+        budget_layout.addWidget(self.token_budget_input)
+        budget_layout.addWidget(self.cost_budget_input)
+        model_layout.addLayout(budget_layout)
+        
+        # 运行期限输入（限时运行）
+        deadline_layout = QHBoxLayout()
+        deadline_label = QLabel("运行期限:")
+        deadline_label.setFont(QFont("Microsoft YaHei", 9))
+        deadline_label.setMinimumWidth(80)
+        self.deadline_input = QLineEdit()
+        self.deadline_input.setFont(QFont("Microsoft YaHei", 9))
+        self.deadline_input.setMinimumHeight(35)
+        self.deadline_input.setPlaceholderText("截止时刻如 06:30，或分钟数如 90，可选")
+        self.max_calls_input = QLineEdit()
+        self.max_calls_input.setFont(QFont("Microsoft YaHei", 9))
+        self.max_calls_input.setMinimumHeight(35)
+        self.max_calls_input.setPlaceholderText("最多调用模型次数，可选")
+        deadline_layout.addWidget(deadline_label)
+        deadline_layout.addWidget(self.deadline_input)
+        deadline_layout.addWidget(self.max_calls_input)
+        model_layout.addLayout(deadline_layout)
+        
+        # 共享任务队列输入（分发模式）
+        queue_layout = QHBoxLayout()
+        queue_label = QLabel("任务队列:")
+        queue_label.setFont(QFont("Microsoft YaHei", 9))
+        queue_label.setMinimumWidth(80)
+        self.queue_input = QLineEdit()
+        self.queue_input.setFont(QFont("Microsoft YaHei", 9))
+        self.queue_input.setMinimumHeight(35)
+        self.queue_input.setPlaceholderText("SQLite 文件路径或 http://host:8766，可选（填写后由 job_queue work 进程调用模型）")
+        queue_layout.addWidget(queue_label)
+        queue_layout.addWidget(self.queue_input)
+        model_layout.addLayout(queue_layout)
+        
+        # 共享缓存地址输入
+        cache_url_layout = QHBoxLayout()
+        cache_url_label = QLabel("共享缓存:")
+        cache_url_label.setFont(QFont("Microsoft YaHei", 9))
+        cache_url_label.setMinimumWidth(80)
+        self.cache_url_input = QLineEdit()
+        self.cache_url_input.setFont(QFont("Microsoft YaHei", 9))
+        self.cache_url_input.setMinimumHeight(35)
+        self.cache_url_input.setPlaceholderText("可选，例如 http://192.168.1.10:8765")
+        cache_url_layout.addWidget(cache_url_label)
+        cache_url_layout.addWidget(self.cache_url_input)
+        model_layout.addLayout(cache_url_layout)
+        
+        # 集中备份目录（可选）
+        backup_dir_layout = QHBoxLayout()
+        backup_dir_label = QLabel("集中备份:")
+        backup_dir_label.setFont(QFont("Microsoft YaHei", 9))
+        backup_dir_label.setMinimumWidth(80)
+        self.backup_dir_input = QLineEdit()
+        self.backup_dir_input.setFont(QFont("Microsoft YaHei", 9))
+        self.backup_dir_input.setMinimumHeight(35)
+        self.backup_dir_input.setPlaceholderText("可选，例如 D:\\rimworld_backups；留空则在每个模组内写 About_old.xml")
+        backup_dir_layout.addWidget(backup_dir_label)
+        backup_dir_layout.addWidget(self.backup_dir_input)
+        model_layout.addLayout(backup_dir_layout)
+        
+        # 目标语言（可选，多种语言一次请求）
+        languages_layout = QHBoxLayout()
+        languages_label = QLabel("目标语言:")
+        languages_label.setFont(QFont("Microsoft YaHei", 9))
+        languages_label.setMinimumWidth(80)
+        self.languages_input = QLineEdit()
+        self.languages_input.setFont(QFont("Microsoft YaHei", 9))
+        self.languages_input.setMinimumHeight(35)
+        self.languages_input.setPlaceholderText(
+            f"留空为简体中文；多种语言用逗号分隔，第一个写入 About.xml，可选: {', '.join(multi_lang.LANGUAGES)}"
+        )
+        languages_layout.addWidget(languages_label)
+        languages_layout.addWidget(self.languages_input)
+        model_layout.addLayout(languages_layout)
+        
         # 配置保存/加载按钮
         config_button_layout = QHBoxLayout()
         self.save_config_btn = QPushButton("💾 保存配置")
@@ -485,6 +1252,17 @@ class ModProcessorGUI(QMainWindow):
         self.progress_bar.setFormat("%v / %m (%p%)")
         ai_layout.addWidget(self.progress_bar)
         
+        # 实时吞吐面板：定时器每秒读取一次汇总统计，不为每个请求发信号
+        self.dashboard_label = QLabel("")
+        self.dashboard_label.setFont(QFont("Consolas", 9))
+        self.dashboard_label.setStyleSheet("color: #9cdcfe;")
+        self.dashboard_label.setVisible(False)
+        ai_layout.addWidget(self.dashboard_label)
+        self.eta_estimator = EtaEstimator()
+        self.dashboard_timer = QTimer(self)
+        self.dashboard_timer.setInterval(1000)
+        self.dashboard_timer.timeout.connect(self.update_dashboard)
+        
         # 日志输出区域
         log_group = QGroupBox("📋 处理日志")
         log_group.setFont(QFont("Microsoft YaHei", 10))
@@ -492,6 +1270,7 @@ class ModProcessorGUI(QMainWindow):
         
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.document().setMaximumBlockCount(5000)  # 完整日志在运行日志文件中
         self.log_text.setFont(QFont("Consolas", 9))
         self.log_text.setStyleSheet("""
             QTextEdit {
@@ -532,7 +1311,61 @@ class ModProcessorGUI(QMainWindow):
                 color: #888888;
             }
         """)
-        self.start_btn.clicked.connect(self.start_processing)
+        self.start_btn.clicked.connect(lambda: self.start_processing('about'))
+        
+        self.languages_btn = QPushButton("📚 翻译游戏文本")
+        self.languages_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.languages_btn.setMinimumSize(150, 45)
+        self.languages_btn.setToolTip("翻译模组 Defs 和 Keyed 文本，写入 Languages/ChineseSimplified")
+        self.languages_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #0e639c;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #1177bb;
+            }
+            QPushButton:pressed {
+                background-color: #0d5689;
+            }
+            QPushButton:disabled {
+                background-color: #555555;
+                color: #888888;
+            }
+        """)
+        self.languages_btn.clicked.connect(lambda: self.start_processing('languages'))
+        
+        self.watch_btn = QPushButton("👁️ 监视模式")
+        self.watch_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.watch_btn.setMinimumSize(150, 45)
+        self.watch_btn.setToolTip("持续监视模组文件夹，新订阅或更新的模组自动翻译，点击停止结束")
+        self.watch_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #0e639c;
+                color: white;
+                border-radius: 5px;
+                padding: 10px;
+            }
+            QPushButton:hover {
+                background-color: #1177bb;
+            }
+            QPushButton:pressed {
+                background-color: #0d5689;
+            }
+            QPushButton:disabled {
+                background-color: #555555;
+                color: #888888;
+            }
+        """)
+        self.watch_btn.clicked.connect(lambda: self.start_processing('watch'))
+        
+        self.plan_btn = QPushButton("🧮 预估")
+        self.plan_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.plan_btn.setMinimumSize(120, 45)
+        self.plan_btn.setToolTip("只扫描和归类模组，预估调用次数、费用和耗时，不调用模型")
+        self.plan_btn.clicked.connect(lambda: self.start_processing('plan'))
         
         self.stop_btn = QPushButton("⏹️ 停止")
         self.stop_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
@@ -558,8 +1391,16 @@ class ModProcessorGUI(QMainWindow):
         """)
         self.stop_btn.clicked.connect(self.stop_processing)
         
+        self.profile_check = QCheckBox("📈 性能采样")
+        self.profile_check.setFont(QFont("Microsoft YaHei", 9))
+        self.profile_check.setToolTip("运行期间对所有线程采样，结束后在 profiles 目录写出火焰图（折叠栈、speedscope）和按函数汇总")
+        
         button_layout.addWidget(self.start_btn)
+        button_layout.addWidget(self.languages_btn)
+        button_layout.addWidget(self.watch_btn)
+        button_layout.addWidget(self.plan_btn)
         button_layout.addWidget(self.stop_btn)
+        button_layout.addWidget(self.profile_check)
         button_layout.addStretch()
         
         ai_layout.addLayout(button_layout)
@@ -602,6 +1443,7 @@ class ModProcessorGUI(QMainWindow):
         
         self.rs_log_text = QTextEdit()
         self.rs_log_text.setReadOnly(True)
+        self.rs_log_text.document().setMaximumBlockCount(5000)
         self.rs_log_text.setFont(QFont("Consolas", 9))
         self.rs_log_text.setStyleSheet("""
             QTextEdit {
@@ -667,6 +1509,39 @@ class ModProcessorGUI(QMainWindow):
         """)
         self.swap_btn.clicked.connect(lambda: self.start_rename_swap('swap'))
         
+        self.export_pack_btn = QPushButton("📦 导出翻译包")
+        self.export_pack_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.export_pack_btn.setMinimumSize(150, 45)
+        self.export_pack_btn.clicked.connect(lambda: self.start_rename_swap('export'))
+        
+        self.apply_pack_btn = QPushButton("📥 应用翻译包")
+        self.apply_pack_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.apply_pack_btn.setMinimumSize(150, 45)
+        self.apply_pack_btn.clicked.connect(lambda: self.start_rename_swap('apply'))
+        
+        self.store_restore_btn = QPushButton("🗃️ 集中还原")
+        self.store_restore_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.store_restore_btn.setMinimumSize(150, 45)
+        self.store_restore_btn.setToolTip("从集中备份批量还原原始 About.xml")
+        self.store_restore_btn.clicked.connect(lambda: self.start_rename_swap('store_restore'))
+        
+        self.store_reapply_btn = QPushButton("🗃️ 重新应用译名")
+        self.store_reapply_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.store_reapply_btn.setMinimumSize(150, 45)
+        self.store_reapply_btn.setToolTip("按集中备份的索引批量写回译名")
+        self.store_reapply_btn.clicked.connect(lambda: self.start_rename_swap('store_reapply'))
+        
+        self.rs_language_combo = QComboBox()
+        self.rs_language_combo.setFont(QFont("Microsoft YaHei", 9))
+        self.rs_language_combo.setMinimumHeight(45)
+        for code, title in multi_lang.LANGUAGES.items():
+            self.rs_language_combo.addItem(title, code)
+        self.switch_language_btn = QPushButton("🌐 切换语言")
+        self.switch_language_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.switch_language_btn.setMinimumSize(150, 45)
+        self.switch_language_btn.setToolTip("把所有模组的名称切换为多语言翻译时保存的所选语言译名，不调用模型")
+        self.switch_language_btn.clicked.connect(lambda: self.start_rename_swap('language'))
+        
         self.rs_stop_btn = QPushButton("⏹️ 停止")
         self.rs_stop_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
         self.rs_stop_btn.setMinimumSize(150, 45)
@@ -693,14 +1568,78 @@ class ModProcessorGUI(QMainWindow):
         
         rs_button_layout.addWidget(self.rename_btn)
         rs_button_layout.addWidget(self.swap_btn)
+        rs_button_layout.addWidget(self.export_pack_btn)
+        rs_button_layout.addWidget(self.apply_pack_btn)
+        rs_button_layout.addWidget(self.store_restore_btn)
+        rs_button_layout.addWidget(self.store_reapply_btn)
+        rs_button_layout.addWidget(self.rs_language_combo)
+        rs_button_layout.addWidget(self.switch_language_btn)
         rs_button_layout.addWidget(self.rs_stop_btn)
         rs_button_layout.addStretch()
         
         rs_layout.addLayout(rs_button_layout)
         
+        # 第三个选项卡：模组目录（持久化，启动时直接显示）
+        catalog_tab = QWidget()
+        catalog_layout = QVBoxLayout(catalog_tab)
+        
+        search_layout = QHBoxLayout()
+        self.catalog_search_input = QLineEdit()
+        self.catalog_search_input.setFont(QFont("Microsoft YaHei", 9))
+        self.catalog_search_input.setMinimumHeight(35)
+        self.catalog_search_input.setPlaceholderText("搜索 packageId、原名或译名")
+        self.catalog_search_input.textChanged.connect(self.refresh_catalog_view)
+        self.catalog_status_combo = QComboBox()
+        self.catalog_status_combo.setFont(QFont("Microsoft YaHei", 9))
+        self.catalog_status_combo.setMinimumHeight(35)
+        self.catalog_status_combo.addItem("全部状态", "")
+        for status, title in STATUS_NAMES.items():
+            self.catalog_status_combo.addItem(title, status)
+        self.catalog_status_combo.currentIndexChanged.connect(self.refresh_catalog_view)
+        search_layout.addWidget(self.catalog_search_input)
+        search_layout.addWidget(self.catalog_status_combo)
+        catalog_layout.addLayout(search_layout)
+        
+        self.catalog_table = QTableWidget(0, 5)
+        self.catalog_table.setHorizontalHeaderLabels(["packageId", "原名", "译名", "状态", "模型"])
+        self.catalog_table.setFont(QFont("Microsoft YaHei", 9))
+        self.catalog_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.catalog_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.catalog_table.verticalHeader().setVisible(False)
+        self.catalog_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.catalog_table.horizontalHeader().setStretchLastSection(True)
+        catalog_layout.addWidget(self.catalog_table)
+        
+        catalog_button_layout = QHBoxLayout()
+        self.catalog_count_label = QLabel("")
+        self.catalog_count_label.setFont(QFont("Microsoft YaHei", 9))
+        self.catalog_refresh_btn = QPushButton("🔄 更新目录")
+        self.catalog_refresh_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.catalog_refresh_btn.setMinimumSize(130, 40)
+        self.catalog_refresh_btn.setToolTip("增量扫描 AI翻译 选项卡中的模组文件夹，只重新解析有变化的模组")
+        self.catalog_refresh_btn.clicked.connect(self.refresh_catalog)
+        self.catalog_run_btn = QPushButton("▶️ 翻译筛选结果")
+        self.catalog_run_btn.setFont(QFont("Microsoft YaHei", 10, QFont.Bold))
+        self.catalog_run_btn.setMinimumSize(150, 40)
+        self.catalog_run_btn.setToolTip("只翻译当前列表中的模组")
+        self.catalog_run_btn.clicked.connect(self.translate_catalog_selection)
+        catalog_button_layout.addWidget(self.catalog_count_label)
+        catalog_button_layout.addStretch()
+        catalog_button_layout.addWidget(self.catalog_refresh_btn)
+        catalog_button_layout.addWidget(self.catalog_run_btn)
+        catalog_layout.addLayout(catalog_button_layout)
+        
         # 添加选项卡到控件
         tab_widget.addTab(ai_translation_tab, "🤖 AI翻译")
         tab_widget.addTab(rename_swap_tab, "🔄 重命名/交换")
+        tab_widget.addTab(catalog_tab, "📚 模组目录")
+        self.tab_widget = tab_widget
+        self.ai_translation_tab = ai_translation_tab
+        
+        # 目录中已有数据时直接打开列表
+        self.refresh_catalog_view()
+        if self.catalog_table.rowCount():
+            tab_widget.setCurrentWidget(catalog_tab)
         
         # 将选项卡控件添加到主布局
         main_layout.addWidget(tab_widget)
@@ -737,8 +1676,62 @@ class ModProcessorGUI(QMainWindow):
             self.log_message(f"📁 已选择路径: {folder}")
     
     @Slot()
-    def start_processing(self):
-        """开始处理"""
+    def refresh_catalog_view(self):
+        """按搜索框和状态筛选刷新目录列表"""
+        query = self.catalog_search_input.text()
+        directory = self.path_input.text().strip() if os.path.isdir(self.path_input.text().strip()) else ""
+        rows = self.catalog.search(query, self.catalog_status_combo.currentData() or "", directory)
+        self.catalog_rows = rows
+        self.catalog_table.setUpdatesEnabled(False)
+        self.catalog_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            values = [row["package_id"], row["original_name"], row["translated_name"],
+                      STATUS_NAMES.get(row["status"], row["status"]), row["provider"] or ""]
+            for j, value in enumerate(values):
+                self.catalog_table.setItem(i, j, QTableWidgetItem(value or ""))
+        self.catalog_table.setUpdatesEnabled(True)
+        counts = self.catalog.counts(query, directory)
+        self.catalog_count_label.setText(
+            f"显示 {len(rows)} 个 | " + "，".join(
+                f"{title} {counts.get(status, 0)}" for status, title in STATUS_NAMES.items())
+        )
+    
+    @Slot()
+    def refresh_catalog(self):
+        """在后台增量更新模组目录"""
+        directory_path = self.path_input.text().strip()
+        if not os.path.isdir(directory_path):
+            QMessageBox.warning(self, "警告", "请先在 AI翻译 选项卡中选择有效的模组文件夹！")
+            return
+        self.catalog_refresh_btn.setEnabled(False)
+        self.catalog_worker = CatalogRefreshWorker(directory_path)
+        self.catalog_worker.signals.error.connect(self.on_error)
+        self.catalog_worker.signals.finished.connect(self.on_catalog_refreshed)
+        self.catalog_worker.start()
+    
+    @Slot()
+    def on_catalog_refreshed(self):
+        run_log.flush()
+        self.drain_logs()
+        self.catalog_refresh_btn.setEnabled(True)
+        self.refresh_catalog_view()
+    
+    @Slot()
+    def translate_catalog_selection(self):
+        """只翻译目录列表中当前筛选出的模组"""
+        folders = [row["folder"] for row in getattr(self, "catalog_rows", [])]
+        if not folders:
+            QMessageBox.information(self, "提示", "当前列表为空")
+            return
+        self.tab_widget.setCurrentWidget(self.ai_translation_tab)
+        self.start_processing('about', folders)
+    
+    @Slot()
+    def start_processing(self, mode: str = 'about', folders: Optional[List[str]] = None):
+        """
+        开始处理：'about' 翻译模组名称，'languages' 翻译游戏文本，'watch' 监视模式，'plan' 只预估
+        folders 不为空时只处理这些模组文件夹
+        """
         directory_path = self.path_input.text().strip()
         
         if not directory_path:
@@ -756,6 +1749,9 @@ class ModProcessorGUI(QMainWindow):
         
         # 禁用开始按钮，启用停止按钮
         self.start_btn.setEnabled(False)
+        self.languages_btn.setEnabled(False)
+        self.watch_btn.setEnabled(False)
+        self.plan_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.browse_btn.setEnabled(False)
         self.path_input.setEnabled(False)
@@ -773,23 +1769,82 @@ class ModProcessorGUI(QMainWindow):
             self.on_processing_finished()
             return
             
-        if not api_key:
+        backend = backends.resolve(model_name, base_url)
+        queue_target = self.queue_input.text().strip() if mode == 'about' else ""
+        # 试运行、离线回放和分发模式（由工作进程调用模型）不需要密钥
+        if (mode != 'plan' and not transport.offline() and not queue_target and backend.api_key_required
+                and not key_pool.load_keys(backend.name, api_key)):
             QMessageBox.warning(self, "警告", "请填写API密钥！")
             self.on_processing_finished()
             return
         
+        try:
+            max_tokens = int(self.token_budget_input.text().strip() or 0)
+            max_cost = float(self.cost_budget_input.text().strip() or 0)
+        except ValueError:
+            QMessageBox.warning(self, "警告", "预算上限必须是数字！")
+            self.on_processing_finished()
+            return
+        
+        try:
+            languages = multi_lang.parse_languages(self.languages_input.text())
+            deadline = parse_deadline(self.deadline_input.text())
+            max_calls = int(self.max_calls_input.text().strip() or 0)
+        except ValueError as e:
+            QMessageBox.warning(self, "警告", str(e))
+            self.on_processing_finished()
+            return
+        
+        # 性能采样从扫描开始覆盖整个运行
+        if self.profile_check.isChecked():
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+        
         # 创建并启动工作线程
-        self.worker = ModProcessorWorker(
-            directory_path=directory_path,
-            model_name=model_name,
-            api_key=api_key,
-            base_url=base_url
-        )
-        self.worker.signals.log.connect(self.log_message)
+        if mode == 'languages':
+            self.worker = LanguagesWorker(
+                directory_path=directory_path,
+                model_name=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                max_tokens=max_tokens,
+                max_cost=max_cost
+            )
+        elif mode == 'watch':
+            self.worker = WatchWorker(
+                directory_path=directory_path,
+                model_name=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                cache_url=self.cache_url_input.text().strip(),
+                backup_dir=self.backup_dir_input.text().strip()
+            )
+        else:
+            self.worker = ModProcessorWorker(
+                directory_path=directory_path,
+                model_name=model_name,
+                api_key=api_key,
+                base_url=base_url,
+                max_tokens=max_tokens,
+                max_cost=max_cost,
+                cache_url=self.cache_url_input.text().strip(),
+                backup_dir=self.backup_dir_input.text().strip(),
+                folders=folders,
+                plan_only=(mode == 'plan'),
+                languages=languages,
+                deadline=deadline,
+                max_calls=max_calls,
+                queue_target=queue_target
+            )
         self.worker.signals.progress.connect(self.update_progress)
         self.worker.signals.finished.connect(self.on_processing_finished)
         self.worker.signals.error.connect(self.on_error)
         self.worker.start()
+        
+        self.eta_estimator.reset()
+        self.dashboard_label.setText("⚡ 等待第一个请求完成...")
+        self.dashboard_label.setVisible(True)
+        self.dashboard_timer.start()
     
     @Slot()
     def stop_processing(self):
@@ -801,13 +1856,38 @@ class ModProcessorGUI(QMainWindow):
     @Slot()
     def on_processing_finished(self):
         """处理完成"""
+        run_log.flush()
+        self.drain_logs()
         self.start_btn.setEnabled(True)
+        self.languages_btn.setEnabled(True)
+        self.watch_btn.setEnabled(True)
+        self.plan_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.browse_btn.setEnabled(True)
         self.path_input.setEnabled(True)
+        if self.dashboard_timer.isActive():
+            self.dashboard_timer.stop()
+            self.update_dashboard()
+        self.refresh_catalog_view()
+        if self.profiler is not None:
+            self.save_profile()
         self.statusBar().showMessage("处理完成")
         self.log_message("\n✨ 所有任务已完成！")
     
+    def save_profile(self):
+        """停止性能采样，写出文件并显示耗时最多的函数"""
+        profiler, self.profiler = self.profiler, None
+        profiler.stop()
+        try:
+            paths = profiler.save()
+        except OSError as e:
+            self.log_message(f"❌ 保存性能采样失败: {str(e)}")
+            return
+        self.log_message("📈 性能采样（累计占比最高的函数）：")
+        for line in profiler.summary(15):
+            self.log_message(f"   {line}")
+        self.log_message(f"📈 火焰图: {paths['speedscope']}（拖到 speedscope.app 打开），折叠栈: {paths['collapsed']}")
+    
     @Slot(str)
     def on_error(self, error_msg: str):
         """处理错误"""
@@ -815,14 +1895,33 @@ class ModProcessorGUI(QMainWindow):
         QMessageBox.critical(self, "错误", error_msg)
         self.on_processing_finished()
     
+    @Slot()
+    def drain_logs(self):
+        """把工作线程新产生的日志批量显示到界面（每个日志框一次 append）"""
+        lines = run_log.feed.drain("translate")
+        if lines:
+            self._append_log(self.log_text, "\n".join(lines))
+        lines = run_log.feed.drain("rename")
+        if lines:
+            self._append_log(self.rs_log_text, "\n".join(lines))
+        lines = run_log.feed.drain("catalog")
+        if lines:
+            self.statusBar().showMessage(lines[-1])
+    
+    @staticmethod
+    def _append_log(text_edit: QTextEdit, text: str):
+        text_edit.append(text)
+        # 自动滚动到底部
+        cursor = text_edit.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        text_edit.setTextCursor(cursor)
+    
     @Slot(str)
     def log_message(self, message: str):
         """添加日志消息"""
-        self.log_text.append(message)
-        # 自动滚动到底部
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_text.setTextCursor(cursor)
+        self.ui_log.info(message)
+        self.drain_logs()  # 先显示工作线程已产生的日志，保持先后顺序
+        self._append_log(self.log_text, message)
     
     @Slot(int, int)
     def update_progress(self, current: int, total: int):
@@ -830,6 +1929,30 @@ class ModProcessorGUI(QMainWindow):
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(current)
         self.statusBar().showMessage(f"处理中... ({current}/{total})")
+    
+    @Slot()
+    def update_dashboard(self):
+        """定时刷新实时吞吐面板"""
+        snapshot = chat2gpt4o.live_stats.snapshot()
+        done, total = self.progress_bar.value(), self.progress_bar.maximum()
+        eta = self.eta_estimator.update(done, total) if total > 0 else None
+        
+        lines = [
+            f"⚡ {snapshot['rps']:.2f} 请求/秒 | 进行中 {snapshot['in_flight']} | "
+            f"剩余约 {format_duration(eta)} | 前缀缓存 {chat2gpt4o.usage_tracker.cache_hit_rate:.0%}"
+        ]
+        cache = getattr(self.worker, 'cache', None)
+        if cache:
+            lines[0] += f" | 共享缓存 {cache.hits}/{cache.hits + cache.misses}"
+        for provider, entry in sorted(snapshot["providers"].items()):
+            backend = backends.get_backend(provider)
+            limit = f"并发 {backend.slots.in_flight}/{backend.slots.current}  " if backend else ""
+            lines.append(
+                f"   {provider}: {limit}p50 {entry['p50']:.2f}s  p95 {entry['p95']:.2f}s  "
+                f"错误 {entry['error_rate']:.1%}  429 {entry['rate_limit_rate']:.1%}  "
+                f"（最近 {entry['requests']} 次）"
+            )
+        self.dashboard_label.setText("\n".join(lines))
 
     @Slot()
     def rs_browse_folder(self):
@@ -857,6 +1980,24 @@ class ModProcessorGUI(QMainWindow):
             QMessageBox.warning(self, "警告", "选择的路径不是有效的文件夹！")
             return
         
+        # 翻译包路径
+        pack_path = ""
+        if operation == 'export':
+            pack_path, _ = QFileDialog.getSaveFileName(
+                self, "导出翻译包", "translations.jsonl.gz", "翻译包 (*.jsonl.gz)"
+            )
+        elif operation == 'apply':
+            pack_path, _ = QFileDialog.getOpenFileName(
+                self, "应用翻译包", "", "翻译包 (*.jsonl.gz)"
+            )
+        if operation in ('export', 'apply') and not pack_path:
+            return
+        
+        backup_dir = self.backup_dir_input.text().strip()
+        if operation in ('store_restore', 'store_reapply') and not backup_dir:
+            QMessageBox.warning(self, "警告", "请先在 AI 翻译选项卡中填写集中备份目录！")
+            return
+        
         # 清空日志和进度条
         self.rs_log_text.clear()
         self.rs_progress_bar.setValue(0)
@@ -865,17 +2006,27 @@ class ModProcessorGUI(QMainWindow):
         # 禁用开始按钮，启用停止按钮
         self.rename_btn.setEnabled(False)
         self.swap_btn.setEnabled(False)
+        self.export_pack_btn.setEnabled(False)
+        self.apply_pack_btn.setEnabled(False)
+        self.store_restore_btn.setEnabled(False)
+        self.store_reapply_btn.setEnabled(False)
+        self.switch_language_btn.setEnabled(False)
         self.rs_stop_btn.setEnabled(True)
         self.rs_browse_btn.setEnabled(False)
         self.rs_path_input.setEnabled(False)
         
-        operation_name = "替换" if operation == 'rename' else "还原"
+        operation_name = {
+            'rename': "替换", 'swap': "还原", 'export': "导出翻译包", 'apply': "应用翻译包",
+            'store_restore': "集中还原", 'store_reapply': "重新应用译名",
+            'language': f"切换到{self.rs_language_combo.currentText()}"
+        }[operation]
         self.rs_log_message(f"🚀 开始{operation_name}操作...")
         self.statusBar().showMessage(f"{operation_name}操作中...")
 
         # 创建并启动工作线程
-        self.rename_swap_worker = RenameSwapWorker(directory_path, operation)
-        self.rename_swap_worker.signals.log.connect(self.rs_log_message)
+        self.rename_swap_worker = RenameSwapWorker(
+            directory_path, operation, pack_path, backup_dir, language=self.rs_language_combo.currentData()
+        )
         self.rename_swap_worker.signals.progress.connect(self.rs_update_progress)
         self.rename_swap_worker.signals.finished.connect(self.on_rs_processing_finished)
         self.rename_swap_worker.signals.error.connect(self.on_rs_error)
@@ -891,8 +2042,15 @@ class ModProcessorGUI(QMainWindow):
     @Slot()
     def on_rs_processing_finished(self):
         """重命名/交换处理完成"""
+        run_log.flush()
+        self.drain_logs()
         self.rename_btn.setEnabled(True)
         self.swap_btn.setEnabled(True)
+        self.export_pack_btn.setEnabled(True)
+        self.apply_pack_btn.setEnabled(True)
+        self.store_restore_btn.setEnabled(True)
+        self.store_reapply_btn.setEnabled(True)
+        self.switch_language_btn.setEnabled(True)
         self.rs_stop_btn.setEnabled(False)
         self.rs_browse_btn.setEnabled(True)
         self.rs_path_input.setEnabled(True)
@@ -909,11 +2067,9 @@ class ModProcessorGUI(QMainWindow):
     @Slot(str)
     def rs_log_message(self, message: str):
         """添加重命名/交换日志消息"""
-        self.rs_log_text.append(message)
-        # 自动滚动到底部
-        cursor = self.rs_log_text.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.rs_log_text.setTextCursor(cursor)
+        self.ui_log.info(message)
+        self.drain_logs()
+        self._append_log(self.rs_log_text, message)
 
     @Slot(int, int)
     def rs_update_progress(self, current: int, total: int):
@@ -929,8 +2085,18 @@ class ModProcessorGUI(QMainWindow):
         config = {
             "model_name": self.model_name_input.text().strip(),
             "api_key": self.api_key_input.text().strip(),
-            "base_url": self.base_url_input.text().strip()
+            "base_url": self.base_url_input.text().strip(),
+            "max_tokens": self.token_budget_input.text().strip(),
+            "max_cost": self.cost_budget_input.text().strip(),
+            "cache_url": self.cache_url_input.text().strip(),
+            "backup_dir": self.backup_dir_input.text().strip(),
+            "languages": self.languages_input.text().strip(),
+            "deadline": self.deadline_input.text().strip(),
+            "max_calls": self.max_calls_input.text().strip(),
+            "queue": self.queue_input.text().strip()
         }
+        if self.backend_config:
+            config["backends"] = self.backend_config
         
         file_path, _ = QFileDialog.getSaveFileName(
             self,
@@ -965,6 +2131,16 @@ class ModProcessorGUI(QMainWindow):
                 self.model_name_input.setText(config.get("model_name", ""))
                 self.api_key_input.setText(config.get("api_key", ""))
                 self.base_url_input.setText(config.get("base_url", ""))
+                self.token_budget_input.setText(str(config.get("max_tokens", "")))
+                self.cost_budget_input.setText(str(config.get("max_cost", "")))
+                self.cache_url_input.setText(config.get("cache_url", ""))
+                self.backup_dir_input.setText(config.get("backup_dir", ""))
+                self.languages_input.setText(config.get("languages", ""))
+                self.deadline_input.setText(config.get("deadline", ""))
+                self.max_calls_input.setText(str(config.get("max_calls", "")))
+                self.queue_input.setText(config.get("queue", ""))
+                self.backend_config = config.get("backends", {})
+                backends.load_backends(self.backend_config)
                 
                 self.log_message(f"✅ 模型配置已从文件加载: {file_path}")
             except Exception as e:
@@ -972,17 +2148,29 @@ class ModProcessorGUI(QMainWindow):
 
 def main():
     """主函数"""
+    # 打包为 exe 后进程池需要此调用
+    multiprocessing.freeze_support()
     app = QApplication([])
     
     # 设置应用样式
     app.setStyle("Fusion")
     
+    # --profile：整个会话（包括空闲的界面线程）都采样，退出时写出
+    session_profiler = SamplingProfiler() if "--profile" in sys.argv else None
+    if session_profiler:
+        session_profiler.start()
+    
     # 创建并显示主窗口
     window = ModProcessorGUI()
     window.show()
     
     # 运行应用
     app.exec()
+    if session_profiler:
+        session_profiler.stop()
+        paths = session_profiler.save()
+        print("\n".join(session_profiler.summary(20)))
+        print(f"性能采样已写入 {paths['speedscope']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+"""
+统一的重试层
+功能：替代各模型函数中复制粘贴的"固定 10 秒超时、重试 3 次、等待 1/2/4 秒"，
+按每个后端最近成功请求的延迟分布（p99）决定超时时间，
+重试前按全抖动（full jitter）指数退避等待，
+并用全局重试预算把重试次数限制在正常请求量的一定比例之内，避免故障时重试风暴
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional
+
+import run_log
+from key_pool import KeyRejected, RateLimited
+
+
+# 每次调用最多尝试的次数
+MAX_ATTEMPTS = 3
+
+# 延迟样本不足时使用的超时（秒），与原来的固定值相同
+DEFAULT_TIMEOUT = 10.0
+
+# 超时 = p99 × 系数，再限制在上下限之间
+TIMEOUT_FACTOR = 1.5
+MIN_TIMEOUT = 3.0
+MAX_TIMEOUT = 60.0
+
+# 至少有这么多个成功样本后才按 p99 计算超时
+MIN_SAMPLES = 20
+
+# 每个后端保留的最近延迟样本数
+HISTORY_SIZE = 500
+
+# 延迟样本的持久化文件，下次启动时作为超时和运行预估的初始数据
+HISTORY_FILE = "latency_history.json"
+
+# 按请求长度分档统计延迟，短的名称请求和长的批量翻译请求分开计算超时（字符数上限）
+SIZE_CLASSES = (2000, 8000)
+
+# 全抖动退避：第 n 次重试前等待 uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**n)) 秒
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 8.0
+
+# 重试预算：每个请求存入 RETRY_RATIO 个令牌，每次重试消耗 1 个；RETRY_RESERVE 为令牌上限（也是初始值）
+RETRY_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_RESERVE = 10.0
+
+log = run_log.get_logger("api")
+
+
+class LatencyHistogram:
+    """一个后端最近成功请求的延迟"""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def samples(self) -> List[float]:
+        with self._lock:
+            return list(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            values = sorted(self._samples)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def timeout(self) -> float:
+        """按最近的 p99 计算本次请求的超时"""
+        p99 = self.quantile(0.99)
+        if p99 is None:
+            return DEFAULT_TIMEOUT
+        return max(MIN_TIMEOUT, min(MAX_TIMEOUT, p99 * TIMEOUT_FACTOR))
+
+
+class RetryBudget:
+    """令牌桶形式的全局重试预算"""
+
+    def __init__(self, ratio: float = RETRY_RATIO, reserve: float = RETRY_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.tokens = self.reserve
+            self.requests = 0
+            self.retries = 0
+            self.denied = 0
+
+    def deposit(self):
+        """每个新请求调用一次"""
+        with self._lock:
+            self.requests += 1
+            self.tokens = min(self.reserve, self.tokens + self.ratio)
+
+    def try_withdraw(self) -> bool:
+        """申请一次重试，预算不足时返回 False"""
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+
+_histograms: Dict[str, LatencyHistogram] = defaultdict(LatencyHistogram)
+_histograms_lock = threading.Lock()
+retry_budget = RetryBudget()
+
+# 每个线程最后一次尝试的耗时（不含退避等待和重试），供并发控制使用
+_attempt = threading.local()
+
+
+def histogram(provider: str) -> LatencyHistogram:
+    with _histograms_lock:
+        return _histograms[provider]
+
+
+def size_class(chars: int) -> str:
+    """请求长度所属的档位名"""
+    for index, limit in enumerate(SIZE_CLASSES):
+        if chars < limit:
+            return str(index)
+    return str(len(SIZE_CLASSES))
+
+
+def typical_latency(provider: str, request_chars: int = 0) -> Optional[float]:
+    """某后端在该请求长度下的延迟中位数，没有足够样本时返回 None"""
+    return histogram(f"{provider}#{size_class(request_chars)}").quantile(0.5)
+
+
+def request_timeout(provider: str, request_chars: int = 0) -> float:
+    """某后端在该请求长度下单次尝试的当前超时"""
+    return histogram(f"{provider}#{size_class(request_chars)}").timeout()
+
+
+def total_timeout(provider: str, request_chars: int = 0, max_attempts: int = MAX_ATTEMPTS) -> float:
+    """一次调用在最坏情况下的总耗时：每次尝试都超时（超时逐次加倍），重试前的退避取上限"""
+    timeout = request_timeout(provider, request_chars)
+    attempts = sum(min(MAX_TIMEOUT, timeout * (2 ** index)) for index in range(max_attempts))
+    backoff = sum(min(BACKOFF_CAP, BACKOFF_BASE * (2 ** index)) for index in range(max_attempts - 1))
+    return attempts + backoff
+
+
+def save_history(path: str = HISTORY_FILE):
+    """保存各后端最近的延迟样本"""
+    with _histograms_lock:
+        data = {name: h.samples() for name, h in _histograms.items()}
+    data = {name: [round(v, 3) for v in values] for name, values in data.items() if values}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+
+
+def load_history(path: str = HISTORY_FILE) -> bool:
+    """读取上次保存的延迟样本，文件不存在或损坏时返回 False"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return False
+    for name, values in data.items():
+        stats = histogram(name)
+        for value in values[-HISTORY_SIZE:]:
+            stats.record(float(value))
+    return True
+
+
+def take_attempt_latency() -> Optional[float]:
+    """取出并清除本线程最后一次尝试（单个 HTTP 请求）的耗时，没有发出请求时返回 None"""
+    latency = getattr(_attempt, "latency", None)
+    _attempt.latency = None
+    return latency
+
+
+def backoff_delay(retry: int) -> float:
+    """第 retry 次重试（从 0 开始）前的全抖动等待时间"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** retry)))
+
+
+def call_with_retry(provider: str, attempt: Callable[[float], Optional[str]],
+                    request_chars: int = 0, max_attempts: int = MAX_ATTEMPTS):
+    """
+    按统一策略调用 attempt(timeout)
+    KeyRejected / RateLimited 直接抛出交给密钥池处理；其他异常在预算允许时重试，
+    重试时超时加倍，最终失败返回 None（与原来各函数的行为一致）
+    Args:
+        provider: 后端名称
+        attempt: 发送一次请求的函数，参数为本次的超时秒数
+        request_chars: 请求内容的字符数，用于选择延迟分档
+    """
+    stats = histogram(f"{provider}#{size_class(request_chars)}")
+    retry_budget.deposit()
+    for attempt_index in range(max_attempts):
+        started = time.monotonic()
+        try:
+            result = attempt(min(MAX_TIMEOUT, stats.timeout() * (2 ** attempt_index)))
+        except (KeyRejected, RateLimited):
+            _attempt.latency = time.monotonic() - started
+            raise
+        except Exception as e:
+            _attempt.latency = time.monotonic() - started
+            if attempt_index == max_attempts - 1:
+                log.warning("failed after %d attempts: %s", max_attempts, e, extra={"provider": provider})
+                return None
+            if not retry_budget.try_withdraw():
+                log.warning("failed (retry budget exhausted): %s", e, extra={"provider": provider})
+                return None
+            log.info("retry %d: %s", attempt_index + 1, e, extra={"provider": provider})
+            time.sleep(backoff_delay(attempt_index))
+            continue
+        _attempt.latency = time.monotonic() - started
+        stats.record(_attempt.latency)
+        return result
+    return None
+
+
+def summary() -> str:
+    """重试统计和各后端当前的超时"""
+    budget = retry_budget
+    rate = budget.retries / budget.requests if budget.requests else 0.0
+    with _histograms_lock:
+        timeouts = {name: h.timeout() for name, h in _histograms.items()}
+    parts = "，".join(f"{name} {value:.1f}s" for name, value in sorted(timeouts.items()))
+    return (
+        f"🔁 重试 {budget.retries} 次（占请求 {rate:.1%}），因重试预算不足放弃 {budget.denied} 次"
+        + (f"；当前超时: {parts}" if parts else "")
+    )
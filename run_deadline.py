@@ -0,0 +1,111 @@
+"""
+限时运行
+功能：给一次运行设置截止时间或模型调用次数上限。模组已按优先级排序（load_order），
+每次调用模型前（拿到并发名额之后）申请"准入"：剩余时间不足以让这次请求在截止前完成
+（按该后端完整重试序列的最坏耗时估计），或调用次数已用完时不再发出新请求，进行中的请求正常完成，
+未处理的模组在模组目录中保持"未翻译"，下次运行（或在目录中筛选后运行）从这里继续
+"""
+
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import retry_policy
+import run_plan
+
+
+# 截止前额外预留的秒数（写文件、保存缓存和目录）
+DRAIN_MARGIN = 5.0
+
+
+class Deferred(Exception):
+    """限时运行不再准入，请求没有发出，该模组留到下次运行"""
+
+
+def parse_deadline(text: str, now: Optional[datetime] = None) -> Optional[float]:
+    """
+    解析截止时间，返回时间戳；空文本返回 None
+    支持 "06:30"（今天或明天的该时刻）和 "90"（从现在起 90 分钟）
+    Raises:
+        ValueError: 格式不正确
+    """
+    text = text.strip()
+    if not text:
+        return None
+    now = now or datetime.now()
+    match = re.fullmatch(r'(\d{1,2})[:：](\d{2})', text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        if hour > 23 or minute > 59:
+            raise ValueError(f"无效的时刻: {text}")
+        target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if target <= now:
+            target += timedelta(days=1)
+        return target.timestamp()
+    try:
+        minutes = float(text)
+    except ValueError:
+        raise ValueError(f"截止时间应为 HH:MM 或分钟数: {text}")
+    if minutes <= 0:
+        raise ValueError("截止分钟数必须大于 0")
+    return (now + timedelta(minutes=minutes)).timestamp()
+
+
+class RunDeadline:
+    """线程安全的准入控制：截止时间和/或调用次数上限"""
+
+    def __init__(self, deadline: Optional[float] = None, max_calls: int = 0):
+        self.deadline = deadline
+        self.max_calls = max_calls
+        self.calls = 0
+        self.deferred = 0
+        self.reason = ""  # 停止准入的原因，空表示仍在准入
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.deadline is not None or self.max_calls > 0
+
+    def remaining(self) -> Optional[float]:
+        """距截止的秒数，没有截止时间时返回 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def admit(self, provider: str, request_chars: int = 0) -> bool:
+        """申请一次模型调用；返回 False 时该模组留到下次运行"""
+        drain = retry_policy.total_timeout(provider, request_chars) + DRAIN_MARGIN
+        with self._lock:
+            if not self.reason:
+                if self.max_calls and self.calls >= self.max_calls:
+                    self.reason = f"已达到调用上限 {self.max_calls} 次"
+                elif self.deadline is not None and time.time() + drain >= self.deadline:
+                    self.reason = "接近截止时间"
+            if self.reason:
+                self.deferred += 1
+                return False
+            self.calls += 1
+            return True
+
+    def capacity(self, provider: str, request_chars: int = 0) -> Optional[int]:
+        """按测得的延迟、并发上限和限速估计截止前还能完成多少次调用"""
+        limits = []
+        if self.max_calls:
+            limits.append(max(0, self.max_calls - self.calls))
+        remaining = self.remaining()
+        if remaining is not None:
+            latency = retry_policy.typical_latency(provider, request_chars) or run_plan.DEFAULT_LATENCY
+            usable = remaining - retry_policy.total_timeout(provider, request_chars) - DRAIN_MARGIN
+            limits.append(max(0, int(usable / run_plan.seconds_per_request(provider, latency))))
+        return min(limits) if limits else None
+
+    def describe(self) -> str:
+        parts = []
+        if self.deadline is not None:
+            end = datetime.fromtimestamp(self.deadline).strftime("%H:%M")
+            parts.append(f"截止 {end}（剩余 {self.remaining() / 60:.0f} 分钟）")
+        if self.max_calls:
+            parts.append(f"最多调用 {self.max_calls} 次")
+        return "，".join(parts)
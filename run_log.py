@@ -0,0 +1,176 @@
+"""
+运行日志
+功能：工作线程和模型调用通过 logging 写日志，QueueHandler 只把记录放进队列（每条几微秒），
+后台 QueueListener 线程把每条记录以 JSON 行写入按大小轮转的日志文件，作为完整的运行记录；
+界面不再逐条接收信号，而是由定时器从 UiFeed 批量取出各通道的日志，
+一次取出太多时只保留警告/错误和最近的若干条，其余汇总为一行
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+# 日志文件路径，轮转后为 run.log.1、run.log.2 ...
+LOG_FILE = os.getenv("RUN_LOG_FILE", os.path.join("logs", "run.log"))
+
+# 单个日志文件的大小上限和保留的旧文件数
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+# 所有日志记录器的公共前缀
+ROOT_LOGGER = "rimworld"
+
+# 显示在界面上的通道：translate（AI翻译日志框）、rename（重命名/交换日志框）、catalog（状态栏）
+UI_CHANNELS = ("translate", "rename", "catalog")
+
+# 每个通道在界面取走之前最多缓存的条数
+FEED_BUFFER = 2000
+
+# 界面每次最多显示的条数，超出时只保留警告/错误和最近的日志
+MAX_LINES_PER_DRAIN = 200
+
+# 以这些符号开头的工作线程消息按警告记录，界面抽样时总是保留
+WARNING_MARKS = ("❌", "🛑", "⚠️")
+
+# LogRecord 自带的属性，其余属性（extra 传入的字段）都写进 JSON
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录格式化为一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "channel": record.name[len(ROOT_LOGGER) + 1:] or record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_FIELDS and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """不在调用线程里格式化：记录原样入队，格式化全部在后台线程完成"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class UiFeed(logging.Handler):
+    """按通道缓存日志，供界面定时批量取出"""
+
+    def __init__(self, channels=UI_CHANNELS, buffer: int = FEED_BUFFER):
+        super().__init__()
+        self._lines: Dict[str, deque] = {name: deque(maxlen=buffer) for name in channels}
+        self._overflow: Dict[str, int] = {name: 0 for name in channels}
+        self._feed_lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord):
+        lines = self._lines.get(record.name[len(ROOT_LOGGER) + 1:])
+        if lines is None:
+            return
+        with self._feed_lock:
+            if len(lines) == lines.maxlen:
+                self._overflow[record.name[len(ROOT_LOGGER) + 1:]] += 1
+            lines.append((record.levelno, record.getMessage()))
+
+    def drain(self, channel: str, limit: int = MAX_LINES_PER_DRAIN) -> List[str]:
+        """取出某通道的全部新日志；超过 limit 条时抽样并附一行汇总"""
+        with self._feed_lock:
+            items = list(self._lines[channel])
+            self._lines[channel].clear()
+            dropped = self._overflow[channel]
+            self._overflow[channel] = 0
+        if len(items) > limit:
+            important = [i for i, (level, _) in enumerate(items) if level >= logging.WARNING]
+            keep = set(important[-limit:])
+            recent = limit - len(keep)
+            for index in range(len(items) - 1, -1, -1):
+                if recent <= 0:
+                    break
+                if index not in keep:
+                    keep.add(index)
+                    recent -= 1
+            dropped += len(items) - len(keep)
+            items = [item for i, item in enumerate(items) if i in keep]
+        lines = [message for _, message in items]
+        if dropped:
+            lines.insert(0, f"… 省略 {dropped} 条日志（完整记录见 {LOG_FILE}）")
+        return lines
+
+
+class Channel:
+    """工作线程使用的日志函数：channel(message)，可以直接作为 log 回调传递"""
+
+    def __init__(self, name: str):
+        self.logger = get_logger(name)
+
+    def __call__(self, message: str):
+        level = logging.WARNING if message.startswith(WARNING_MARKS) else logging.INFO
+        self.logger.log(level, message)
+
+
+feed = UiFeed()
+_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_queue_handler = _QueueHandler(_queue)
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def setup(path: str = LOG_FILE, level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """启动后台写日志线程（重复调用无副作用）"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+        )
+        file_handler.setFormatter(JsonFormatter())
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(level)
+        root.addHandler(_queue_handler)
+        root.propagate = False
+        _listener = logging.handlers.QueueListener(_queue, file_handler, feed)
+        _listener.start()
+        atexit.register(shutdown)
+        return _listener
+
+
+def flush():
+    """等待队列中已有的记录全部处理完（界面在任务结束时调用，保证最后几行按顺序显示）"""
+    if _listener is not None:
+        _queue.join()
+
+
+def shutdown():
+    """处理完剩余记录后停止后台线程并关闭文件"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
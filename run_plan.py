@@ -0,0 +1,120 @@
+"""
+运行计划（试运行）
+功能：只做模组发现和元数据提取，不调用模型，把每个模组归类为
+跳过 / 缓存命中 / 重复 / 需要调用 API，并根据记录的延迟、并发上限和每分钟请求数
+预估各模型的 token 数、费用和耗时
+"""
+
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import backends
+import retry_policy
+from mod_scanner import ModRecord
+from usage_tracker import DEFAULT_OUTPUT_TOKENS, estimate_run, get_price
+
+
+SKIP = "skip"        # 已有备份或名称已是中文
+CACHED = "cached"    # 集中备份或共享缓存中已有译名
+DEDUP = "dedup"      # 与另一个模组的名称和描述完全相同，复用其结果
+API = "api"          # 需要调用模型
+
+CATEGORY_NAMES = OrderedDict([
+    (SKIP, "跳过"), (CACHED, "缓存命中"), (DEDUP, "重复"), (API, "需要调用 API"),
+])
+
+# 没有延迟记录时假设的单次请求耗时（秒）
+DEFAULT_LATENCY = 3.0
+
+
+def split_duplicates(records: List[ModRecord],
+                     message_of: Callable[[ModRecord], str]) -> tuple:
+    """
+    按发送给模型的消息去重
+    Returns:
+        (每组第一个模组的列表, [(重复的模组, 消息), ...])
+    """
+    seen = set()
+    unique, duplicates = [], []
+    for record in records:
+        message = message_of(record)
+        if message in seen:
+            duplicates.append((record, message))
+        else:
+            seen.add(message)
+            unique.append(record)
+    return unique, duplicates
+
+
+def classify(records: List[ModRecord],
+             needs_translation: Callable[[ModRecord], bool],
+             message_of: Callable[[ModRecord], str],
+             cached_of: Optional[Callable[[ModRecord], Optional[str]]] = None) -> Dict[str, List[ModRecord]]:
+    """把每个模组归入 SKIP / CACHED / DEDUP / API 之一"""
+    plan: Dict[str, List[ModRecord]] = {key: [] for key in CATEGORY_NAMES}
+    pending = []
+    for record in records:
+        if not needs_translation(record):
+            plan[SKIP].append(record)
+        elif cached_of is not None and cached_of(record):
+            plan[CACHED].append(record)
+        else:
+            pending.append(record)
+    unique, duplicates = split_duplicates(pending, message_of)
+    plan[API] = unique
+    plan[DEDUP] = [record for record, _ in duplicates]
+    return plan
+
+
+def seconds_per_request(provider: str, latency: float) -> float:
+    """
+    满并发时平均每个请求占用的秒数：max((单次延迟 + 请求间隔) / 并发上限, 60 / 每分钟请求数)
+    """
+    backend = backends.get_backend(provider)
+    concurrency = backend.max_concurrency if backend else 1
+    interval = backend.request_interval if backend else 0.0
+    rpm = get_price(provider).get("rpm", 0)
+    per_request = (latency + interval) / concurrency
+    if rpm:
+        per_request = max(per_request, 60.0 / rpm)
+    return per_request
+
+
+def project(messages: List[str], prefix: str, providers: Optional[List[str]] = None,
+            languages: int = 1) -> List[dict]:
+    """
+    预估各模型的费用和耗时
+    耗时取 max(单次延迟 / 并发上限, 60 / 每分钟请求数) × 请求数，
+    延迟来自记录的中位数（没有记录时按 DEFAULT_LATENCY）
+    languages 为一次请求返回的语言数，只增加输出 token，不增加请求数
+    """
+    estimates = estimate_run(messages, prefix, providers, DEFAULT_OUTPUT_TOKENS * languages)
+    chars = len(prefix) + (sum(len(m) for m in messages) // len(messages) if messages else 0)
+    for entry in estimates:
+        provider = entry["provider"]
+        latency = retry_policy.typical_latency(provider, chars)
+        entry["latency"] = latency or DEFAULT_LATENCY
+        entry["measured"] = latency is not None
+        entry["minutes"] = len(messages) * seconds_per_request(provider, entry["latency"]) / 60
+    return estimates
+
+
+def format_plan(plan: Dict[str, List[ModRecord]], estimates: List[dict], selected: str = "") -> List[str]:
+    """计划的文本报告"""
+    total = sum(len(items) for items in plan.values())
+    lines = [f"🧮 运行计划：共 {total} 个模组"]
+    for key, title in CATEGORY_NAMES.items():
+        lines.append(f"   {title}: {len(plan[key])}")
+    if not plan[API]:
+        lines.append("   无需调用模型")
+        return lines
+    lines.append("   各模型预估（带 * 的单次延迟来自历史记录）：")
+    for entry in estimates:
+        mark = "👉 " if entry["provider"] == selected else "   "
+        star = "*" if entry["measured"] else ""
+        lines.append(
+            f"{mark}{entry['provider']}: {entry['prompt_tokens'] + entry['completion_tokens']} tokens，"
+            f"约 {entry['cost']:.4f} 元，约 {entry['minutes']:.1f} 分钟"
+            f"（单次 {entry['latency']:.1f}s{star}）"
+        )
+    return lines
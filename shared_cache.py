@@ -0,0 +1,379 @@
+"""
+团队共享翻译缓存
+功能：可自建的小型 HTTP 缓存服务（SQLite 存储）和客户端。
+客户端在调用模型前批量查询缓存，翻译完成后批量回传，
+并带有进程内 LRU 和基于 ETag 的条件同步；InMemoryCacheService 可在测试时替代真实服务。
+服务默认只监听本机；在局域网共享时设置共享令牌，客户端在请求头中携带，令牌不符的请求被拒绝
+"""
+
+import argparse
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+from mod_scanner import ModRecord, content_hash
+
+
+# 每次批量查询/回传的条目数
+BATCH_SIZE = 500
+
+# 进程内 LRU 的容量
+LRU_SIZE = 20000
+
+# 共享令牌：服务端和客户端使用同一个值，为空时不校验（只应在仅监听本机时使用）
+TOKEN = os.getenv("SHARED_CACHE_TOKEN", "")
+TOKEN_HEADER = "X-Cache-Token"
+
+
+def cache_key(record: ModRecord) -> str:
+    """缓存键：packageId + 名称和描述的哈希，模组更新描述后自动失效"""
+    ident = record.package_id or record.name.lower()
+    return f"{ident}:{content_hash(record.name, record.description)}"
+
+
+class CacheStore:
+    """服务端存储（SQLite），每次写入递增版本号，用于条件同步"""
+
+    def __init__(self, path: str = ":memory:"):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, version INTEGER NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_version ON entries(version)")
+        self._db.commit()
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT MAX(version) FROM entries").fetchone()
+        return row[0] or 0
+
+    def lookup(self, keys: List[str]) -> Dict[str, dict]:
+        hits = {}
+        with self._lock:
+            for i in range(0, len(keys), BATCH_SIZE):
+                chunk = keys[i:i + BATCH_SIZE]
+                marks = ",".join("?" * len(chunk))
+                for key, value in self._db.execute(
+                        f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk):
+                    hits[key] = json.loads(value)
+        return hits
+
+    def publish(self, entries: Dict[str, dict]) -> int:
+        if not entries:
+            return self.version
+        with self._lock:
+            row = self._db.execute("SELECT MAX(version) FROM entries").fetchone()
+            version = (row[0] or 0) + 1
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, version) VALUES (?, ?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False), version) for k, v in entries.items()]
+            )
+            self._db.commit()
+        return version
+
+    def since(self, version: int) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                key: json.loads(value) for key, value in self._db.execute(
+                    "SELECT key, value FROM entries WHERE version > ?", (version,))
+            }
+
+
+class InMemoryCacheService:
+    """不经过网络的本地替身，接口与 HTTP 服务一致，用于测试或单机使用"""
+
+    def __init__(self, store: Optional[CacheStore] = None):
+        self.store = store or CacheStore()
+
+    def lookup(self, keys: List[str]) -> Dict[str, dict]:
+        return self.store.lookup(keys)
+
+    def publish(self, entries: Dict[str, dict]):
+        self.store.publish(entries)
+
+    def current_version(self) -> int:
+        return self.store.version
+
+    def changes(self, version: int, etag: str = "") -> Optional[tuple]:
+        """返回 (新版本, 变更条目)；没有变化时返回 None（相当于 304）"""
+        current = self.store.version
+        if etag == str(current):
+            return None
+        return current, self.store.since(version)
+
+
+class HttpCacheService:
+    """HTTP 服务的访问端，使用 requests.Session 保持长连接"""
+
+    def __init__(self, url: str, timeout: float = 5.0, token: str = TOKEN):
+        import requests
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers[TOKEN_HEADER] = token
+
+    def lookup(self, keys: List[str]) -> Dict[str, dict]:
+        response = self.session.post(f"{self.url}/lookup", json={"keys": keys}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("hits", {})
+
+    def publish(self, entries: Dict[str, dict]):
+        response = self.session.post(f"{self.url}/publish", json={"entries": entries}, timeout=self.timeout)
+        response.raise_for_status()
+
+    def current_version(self) -> int:
+        response = self.session.get(f"{self.url}/stats", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["version"]
+
+    def changes(self, version: int, etag: str = "") -> Optional[tuple]:
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(f"{self.url}/entries", params={"since": version},
+                                    headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+        data = response.json()
+        return data["version"], data["entries"]
+
+
+class SharedCacheClient:
+    """
+    共享缓存客户端
+    prefetch() 一次性批量查询，get() 只读进程内 LRU，put() 先缓冲再由 flush() 批量回传
+    同一地址的客户端在进程内共用（get_client），之后每次 prefetch() 先做一次条件同步，
+    只拉取上次之后其他人发布的条目，LRU 中已有的键不再逐个查询
+    """
+
+    def __init__(self, url: str = "", service=None, lru_size: int = LRU_SIZE):
+        self.service = service or HttpCacheService(url)
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._etag = ""
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _remember(self, key: str, value: dict):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def prefetch(self, keys: Iterable[str]) -> int:
+        """批量查询尚未在 LRU 中的键，返回命中数量（含 LRU 和同步得到的）；服务不可用时不影响翻译"""
+        if self._etag:
+            self.sync()
+        else:
+            self._start_sync()
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            missing = [k for k in keys if k not in self._lru]
+        found = len(keys) - len(missing)
+        for i in range(0, len(missing), BATCH_SIZE):
+            try:
+                hits = self.service.lookup(missing[i:i + BATCH_SIZE])
+            except Exception:
+                self.errors += 1
+                break
+            with self._lock:
+                for key, value in hits.items():
+                    self._remember(key, value)
+            found += len(hits)
+        return found
+
+    def _start_sync(self):
+        """记录服务端当前版本作为之后增量同步的起点（查询前记录，查询期间发布的条目下次同步会拉取）"""
+        try:
+            version = self.service.current_version()
+        except Exception:
+            self.errors += 1
+            return
+        with self._lock:
+            self._version = version
+            self._etag = str(version)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.errors = 0
+
+    def sync(self) -> int:
+        """条件同步：拉取上次同步之后其他人发布的条目，没有变化时服务端返回 304"""
+        try:
+            result = self.service.changes(self._version, self._etag)
+        except Exception:
+            self.errors += 1
+            return 0
+        if result is None:
+            return 0
+        version, entries = result
+        with self._lock:
+            for key, value in entries.items():
+                self._remember(key, value)
+            self._version = version
+            self._etag = str(version)
+        return len(entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            value = self._lru.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._lru.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[dict]:
+        """只读 LRU，不计入命中统计（用于运行计划）"""
+        with self._lock:
+            return self._lru.get(key)
+
+    def put(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, value)
+            self._pending[key] = value
+            flush = len(self._pending) >= BATCH_SIZE
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """把缓冲的新结果批量回传"""
+        with self._lock:
+            entries, self._pending = self._pending, {}
+        if not entries:
+            return
+        try:
+            self.service.publish(entries)
+        except Exception:
+            self.errors += 1
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"🗄️ 共享缓存：命中 {self.hits}/{total}（{rate:.1%}），请求失败 {self.errors} 次"
+
+
+_clients: Dict[str, SharedCacheClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str) -> SharedCacheClient:
+    """获取（必要时创建）该地址的共享客户端，多次运行和监视模式共用 LRU 和同步版本"""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = SharedCacheClient(url)
+        return client
+
+
+def make_handler(store: CacheStore, token: str = ""):
+    """创建绑定到 store 的请求处理类；token 非空时拒绝请求头中令牌不符的请求"""
+
+    class CacheHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持长连接
+
+        def _send_json(self, data, status=200, headers=None):
+            body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _authorized(self) -> bool:
+            if not token or hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), token):
+                return True
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))  # 读完请求体，长连接上的下一个请求才能正确解析
+            self._send_json({"error": "unauthorized"}, 401)
+            return False
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            if self.path == "/lookup":
+                self._send_json({"hits": store.lookup(self._read_json().get("keys", []))})
+            elif self.path == "/publish":
+                version = store.publish(self._read_json().get("entries", {}))
+                self._send_json({"version": version})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.startswith("/entries"):
+                since = 0
+                if "since=" in self.path:
+                    since = int(self.path.split("since=")[1].split("&")[0] or 0)
+                version = store.version
+                if self.headers.get("If-None-Match") == str(version):
+                    self.send_response(304)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self._send_json({"version": version, "entries": store.since(since)},
+                                headers={"ETag": str(version)})
+            elif self.path == "/stats":
+                self._send_json({"version": store.version})
+            else:
+                self._send_json({"error": "not found"}, 404)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CacheHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, db_path: str = "team_cache.sqlite3", token: str = TOKEN):
+    """启动共享缓存服务；监听其他地址（如 0.0.0.0）时应设置共享令牌"""
+    server = ThreadingHTTPServer((host, port), make_handler(CacheStore(db_path), token))
+    print(f"共享缓存服务已启动: http://{host}:{port} （数据库: {db_path}）")
+    if not token and host not in ("127.0.0.1", "localhost", "::1"):
+        print("⚠️ 未设置共享令牌（--token 或 SHARED_CACHE_TOKEN），局域网内任何人都可以写入译名")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def cache_value(summary: str, model: str, names: Optional[dict] = None) -> dict:
+    """缓存中保存的内容；names 为多语言模式下各语言的译名"""
+    value = {"name": summary, "model": model, "time": int(time.time())}
+    if names:
+        value["names"] = names
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="团队共享翻译缓存服务")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，局域网共享时用 0.0.0.0 并设置 --token")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default="team_cache.sqlite3")
+    parser.add_argument("--token", default=TOKEN, help="共享令牌，默认读取 SHARED_CACHE_TOKEN")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.db, args.token)
+
+
+if __name__ == "__main__":
+    main()
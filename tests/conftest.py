@@ -0,0 +1,31 @@
+"""测试从仓库根目录导入模块；make_mod 在临时目录中创建模组文件夹"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def write_about(folder, name, description="A mod.", package_id="", languages=()):
+    """写入一个最小的 About.xml，name 为 None 时不写 name 元素"""
+    about = os.path.join(folder, "About")
+    os.makedirs(about, exist_ok=True)
+    name_xml = f"<name>{name}</name>" if name is not None else ""
+    with open(os.path.join(about, "About.xml"), "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="utf-8"?>\n<ModMetaData>{name_xml}'
+                f"<packageId>{package_id or os.path.basename(folder)}</packageId>"
+                f"<description>{description}</description>"
+                "<supportedVersions><li>1.5</li></supportedVersions></ModMetaData>")
+    for language in languages:
+        os.makedirs(os.path.join(folder, "Languages", language), exist_ok=True)
+    return folder
+
+
+@pytest.fixture
+def make_mod(tmp_path):
+    """make_mod(文件夹名, 模组名, ...) 在 tmp_path/mods 下创建模组，返回完整路径"""
+    def make(folder, name, **kwargs):
+        return write_about(str(tmp_path / "mods" / folder), name, **kwargs)
+    return make
@@ -0,0 +1,154 @@
+"""AIMD 并发控制：加性增、乘性减和延迟突增，以及模型调用把每次请求的结果反馈给控制器"""
+
+import pytest
+
+import adaptive_limit
+import backends
+import chat2gpt4o
+import key_pool
+import retry_policy
+from adaptive_limit import AIMDLimiter
+from key_pool import RateLimited
+
+
+def run(limiter, latency=1.0, ok=True, count=1):
+    for _ in range(count):
+        limiter.acquire()
+        limiter.release(latency, ok)
+
+
+def test_additive_increase_up_to_maximum():
+    limiter = AIMDLimiter(maximum=4, initial=2)
+    run(limiter, count=2)
+    assert limiter.current == 2
+    run(limiter, count=2)
+    assert limiter.current == 3
+    run(limiter, count=50)
+    assert limiter.current == 4
+
+
+def test_failure_halves_limit():
+    limiter = AIMDLimiter(maximum=16, initial=8)
+    run(limiter, ok=False)
+    assert limiter.current == 4
+    assert limiter.decreases == 1
+
+
+def test_decrease_once_per_burst():
+    limiter = AIMDLimiter(maximum=16, initial=8)
+    limiter.congested()
+    limiter.congested()
+    assert limiter.current == 4
+    limiter._last_decrease -= 1.0
+    limiter.congested()
+    assert limiter.current == 2
+
+
+def test_limit_not_below_minimum():
+    limiter = AIMDLimiter(maximum=8, minimum=3, initial=4)
+    for _ in range(3):
+        limiter._last_decrease = 0.0
+        limiter.congested()
+    assert limiter.current == 3
+
+
+def test_latency_spike_decreases_after_baseline():
+    limiter = AIMDLimiter(maximum=8, initial=8)
+    run(limiter, latency=1.0, count=adaptive_limit.MIN_SAMPLES)
+    assert limiter.current == 8
+    run(limiter, latency=1.0 * adaptive_limit.LATENCY_FACTOR + 0.1)
+    assert limiter.current == 4
+
+
+def test_early_slow_samples_are_not_spikes():
+    limiter = AIMDLimiter(maximum=8, initial=4)
+    run(limiter, latency=1.0)
+    run(limiter, latency=10.0)
+    assert limiter.decreases == 0
+
+
+def test_fixed_limit_when_not_adaptive():
+    limiter = AIMDLimiter(maximum=6, adaptive=False)
+    assert limiter.current == 6
+    run(limiter, ok=False)
+    limiter.congested()
+    assert limiter.current == 6
+
+
+def test_context_manager_releases_on_error():
+    limiter = AIMDLimiter(maximum=4, initial=4)
+    try:
+        with limiter:
+            assert limiter.in_flight == 1
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert limiter.in_flight == 0
+    assert limiter.current == 2
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """注册一个测试后端，模型函数由各测试替换"""
+    monkeypatch.setattr(backends, "_registry", dict(backends._registry))
+    monkeypatch.setattr(retry_policy, "_histograms", retry_policy.defaultdict(retry_policy.LatencyHistogram))
+    monkeypatch.setattr(retry_policy, "retry_budget", retry_policy.RetryBudget())
+    backend = backends.Backend("aimd-test", "http://127.0.0.1:9/v1", "m", max_concurrency=8)
+    backend.slots = AIMDLimiter(maximum=8, initial=4)
+    backends.register_backend(backend)
+    return backend
+
+
+def use_attempts(monkeypatch, attempt):
+    """让模型函数经过统一重试层调用 attempt(timeout)"""
+    def openai_compatible(message, pormet, backend, **kwargs):
+        return retry_policy.call_with_retry(backend.name, attempt)
+    monkeypatch.setattr(chat2gpt4o, "openai_compatible", openai_compatible)
+
+
+def test_limiter_sees_attempt_latency_not_backoff(backend, monkeypatch):
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda retry: 0.3)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise ConnectionError
+        return "战斗扩展"
+
+    use_attempts(monkeypatch, attempt)
+    assert chat2gpt4o.call_model("aimd-test", "m", "p") == "战斗扩展"
+    assert backend.slots.in_flight == 0
+    assert backend.slots.samples == 1
+    assert backend.slots.baseline < 0.1
+    assert backend.slots.limit > 4
+
+
+def test_failed_call_halves_limit(backend, monkeypatch):
+    def attempt(timeout):
+        raise ConnectionError
+
+    use_attempts(monkeypatch, attempt)
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda retry: 0.0)
+    assert chat2gpt4o.call_model("aimd-test", "m", "p") is None
+    assert backend.slots.current == 2
+    assert backend.slots.in_flight == 0
+
+
+def test_rate_limit_signals_congestion(backend, monkeypatch):
+    monkeypatch.setattr(key_pool, "RATE_LIMIT_COOLDOWN", 0.01)
+    retry_policy.retry_budget.tokens = 0.0
+    keys = []
+
+    def attempt(timeout):
+        raise RateLimited("429")
+
+    def openai_compatible(message, pormet, backend, api_key=None, **kwargs):
+        keys.append(api_key)
+        return retry_policy.call_with_retry(backend.name, attempt)
+
+    monkeypatch.setattr(chat2gpt4o, "openai_compatible", openai_compatible)
+    assert chat2gpt4o.call_model("aimd-test", "m", "p", api_key="only-key") is None
+    assert keys == ["only-key"]
+    assert backend.slots.decreases == 1
+    assert backend.slots.in_flight == 0
@@ -0,0 +1,63 @@
+"""后端注册表：本地地址判断、配置加载和按名称/地址解析"""
+
+import pytest
+
+import backends
+import usage_tracker
+from backends import Backend, is_local_url
+
+
+@pytest.mark.parametrize("url", [
+    "http://localhost:8080/v1",
+    "http://127.0.0.1:8080/v1",
+    "http://[::1]:8000/v1",
+    "http://10.0.0.5/v1",
+    "http://172.16.3.4:8000/v1",
+    "http://172.31.255.1/v1",
+    "http://192.168.1.20:8080/v1",
+    "http://[fd00::1]:8080/v1",
+    "192.168.1.20:8080/v1",
+])
+def test_local_urls(url):
+    assert is_local_url(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://api.deepseek.com",
+    "http://10.example.com/v1",
+    "http://192.168.example.com/v1",
+    "http://172.32.0.1/v1",
+    "http://8.8.8.8/v1",
+    "http://[2001:4860::8888]/v1",
+    "",
+])
+def test_remote_urls(url):
+    assert not is_local_url(url)
+
+
+def test_local_backend_defaults():
+    local = Backend.from_dict("local", {"base_url": "http://127.0.0.1:8080/v1"})
+    remote = Backend.from_dict("remote", {"base_url": "https://example.com/v1"})
+    assert (local.api_key_required, local.request_interval, local.max_concurrency) == (False, 0.0, 8)
+    assert (remote.api_key_required, remote.request_interval, remote.max_concurrency) == (True, 1.0, 16)
+
+
+def test_load_backends_registers_price(monkeypatch):
+    monkeypatch.setattr(backends, "_registry", dict(backends._registry))
+    monkeypatch.setattr(usage_tracker, "PRICE_TABLE", dict(usage_tracker.PRICE_TABLE))
+    backends.load_backends({"Local": {"base_url": "http://127.0.0.1:8080/v1", "model": "qwen2.5-7b",
+                                      "price": {"rpm": 600}}})
+    backend = backends.get_backend("local")
+    assert backend.model == "qwen2.5-7b"
+    assert usage_tracker.PRICE_TABLE["local"] == {"input": 0.0, "output": 0.0, "rpm": 600}
+
+
+def test_resolve(monkeypatch):
+    monkeypatch.setattr(backends, "_registry", dict(backends._registry))
+    glm = backends.get_backend("glm")
+    assert backends.resolve("glm") is glm
+    moved = backends.resolve("glm", "http://127.0.0.1:9000/v1")
+    assert moved.base_url == "http://127.0.0.1:9000/v1" and moved.slots is glm.slots
+    assert backends.resolve("unknown") is glm
+    custom = backends.resolve("mistral", "http://127.0.0.1:9000/v1")
+    assert custom.model == "mistral" and backends.get_backend("mistral") is custom
@@ -0,0 +1,105 @@
+"""集中备份库：按内容去重、索引、日志恢复和批量还原/重新应用"""
+
+import os
+
+import pytest
+
+import mod_scanner
+from backup_store import BackupStore
+
+
+def quiet(message):
+    pass
+
+
+def about_bytes(folder):
+    with open(os.path.join(folder, "About", "About.xml"), "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(str(tmp_path / "store"))
+
+
+def test_put_deduplicates(store):
+    first = store.put(b"<ModMetaData/>")
+    assert store.put(b"<ModMetaData/>") == first
+    assert store.get(first) == b"<ModMetaData/>"
+    assert sum(len(files) for _, _, files in os.walk(store.objects_dir)) == 1
+
+
+def test_backup_indexes_by_package_id(store, make_mod):
+    folder = make_mod("ce", "Combat Extended", package_id="CETeam.CE")
+    original = about_bytes(folder)
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    assert not os.path.exists(os.path.join(folder, "About", "About_old.xml"))
+    entry = store.lookup(folder)
+    assert (entry["f"], entry["t"]) == ("ce", "战斗扩展")
+    assert store.get(entry["o"]) == original
+
+
+def test_backup_without_about_raises(store, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        store.backup(str(tmp_path), "译名")
+
+
+def test_journal_recovers_unsaved_backups(store, make_mod):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    # 没有调用 save() 就中断：重新打开时从日志恢复
+    reopened = BackupStore(store.root)
+    assert reopened.lookup(folder)["t"] == "战斗扩展"
+
+
+def test_save_writes_index_and_clears_journal(store, make_mod):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    store.save()
+    assert os.path.getsize(store.journal_path) == 0
+    assert BackupStore(store.root).lookup(folder)["t"] == "战斗扩展"
+
+
+def test_torn_journal_line_skipped(store, make_mod):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write('["half", {"f"')
+    assert BackupStore(store.root).lookup(folder)["t"] == "战斗扩展"
+
+
+def test_restore_and_reapply(store, make_mod):
+    directory = os.path.dirname(make_mod("ce", "Combat Extended", package_id="ceteam.ce"))
+    folders = {name: os.path.join(directory, name) for name in ("ce", "hud")}
+    make_mod("hud", "RimHUD", package_id="jaxe.rimhud")
+    originals = {name: about_bytes(folder) for name, folder in folders.items()}
+    mod_scanner.write_translated_name(folders["ce"], "战斗扩展", store)
+    mod_scanner.write_translated_name(folders["hud"], "信息面板", store)
+    # hud 在翻译后被模组作者更新
+    make_mod("hud", "RimHUD 2", package_id="jaxe.rimhud")
+
+    stats = store.restore_all(directory, log=quiet)
+    assert stats == {"restored": 1, "drifted": 1}
+    assert about_bytes(folders["ce"]) == originals["ce"]
+    assert store.restore_all(directory, log=quiet)["already"] == 1
+
+    stats = store.reapply_all(directory, log=quiet)
+    assert stats == {"reapplied": 1, "drifted": 1}
+    assert mod_scanner.extract_about(folders["ce"]).name == "战斗扩展"
+    assert store.translated_for(folders["ce"]) is None
+
+
+def test_translated_for_detects_steam_overwrite(store, make_mod):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    assert store.translated_for(folder) is None
+    make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    assert store.translated_for(folder) == "战斗扩展"
+
+
+def test_missing_folder_counted(store, make_mod, tmp_path):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    assert store.restore_all(str(empty), log=quiet) == {"missing": 1}
@@ -0,0 +1,51 @@
+"""模型调用：固定前缀的消息结构和前缀缓存用量的读取"""
+
+import types
+
+import pytest
+
+import chat2gpt4o
+from usage_tracker import UsageTracker
+
+SHOTS = [("Combat Extended", "战斗扩展"), ("RimHUD", "信息面板")]
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = UsageTracker()
+    monkeypatch.setattr(chat2gpt4o, "usage_tracker", tracker)
+    return tracker
+
+
+def test_requests_share_prefix():
+    first = chat2gpt4o.build_messages("Mod A", "提示词", SHOTS)
+    second = chat2gpt4o.build_messages("Mod B", "提示词", SHOTS)
+    assert first[:-1] == second[:-1]
+    assert [m["role"] for m in first] == ["system", "user", "assistant", "user", "assistant", "user"]
+    assert first[-1] == {"role": "user", "content": "Mod A"}
+
+
+def test_deepseek_cache_hit_tokens(tracker):
+    chat2gpt4o._record_usage("deepseek", {"prompt_tokens": 100, "completion_tokens": 10,
+                                          "prompt_cache_hit_tokens": 80}, "mod")
+    assert tracker.cached_tokens == 80
+    assert tracker.by_mod["mod"]["prompt_tokens"] == 100
+
+
+def test_openai_style_cached_tokens(tracker):
+    chat2gpt4o._record_usage("qwen", {"prompt_tokens": 100, "completion_tokens": 10,
+                                      "prompt_tokens_details": {"cached_tokens": 64}})
+    assert tracker.cached_tokens == 64
+
+
+def test_sdk_object_extra_fields(tracker):
+    usage = types.SimpleNamespace(prompt_tokens=50, completion_tokens=5, prompt_tokens_details=None,
+                                  model_extra={"prompt_cache_hit_tokens": 32})
+    chat2gpt4o._record_usage("deepseek", usage)
+    assert (tracker.prompt_tokens, tracker.cached_tokens) == (50, 32)
+
+
+def test_missing_usage_ignored(tracker):
+    chat2gpt4o._record_usage("glm", None)
+    chat2gpt4o._record_usage("glm", {"prompt_tokens": 10, "completion_tokens": 2})
+    assert (tracker.requests, tracker.cached_tokens) == (1, 0)
@@ -0,0 +1,119 @@
+"""连接预热：共享连接池、预热测量、被拒绝的密钥和省下的冷启动时间"""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import connections
+from connections import Warmer
+
+GOOD_KEY = "sk-good-0000000000"
+BAD_KEY = "sk-bad-11111111111"
+
+
+class ModelsHandler(BaseHTTPRequestHandler):
+    """GET /v1/models：BAD_KEY 返回 401，其余返回 200"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        status = 401 if self.headers.get("Authorization") == f"Bearer {BAD_KEY}" else 200
+        body = b'{"data": []}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients(monkeypatch):
+    """每个测试使用独立的连接池，结束时关闭"""
+    clients = {}
+    monkeypatch.setattr(connections, "_clients", clients)
+    monkeypatch.setattr(connections, "_openai_clients", {})
+    monkeypatch.setattr(connections, "_last_used", {})
+    yield
+    for http in clients.values():
+        http.close()
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ModelsHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/v1"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_origin_groups_by_scheme_host_and_port():
+    assert connections.origin("https://api.example.com/v1/chat") == "https://api.example.com"
+    assert connections.origin("http://127.0.0.1:8080/v1") == "http://127.0.0.1:8080"
+
+
+def test_client_shared_per_origin():
+    first = connections.client("http://127.0.0.1:9/v1")
+    assert connections.client("http://127.0.0.1:9/other") is first
+    assert connections.client("http://127.0.0.1:10/v1") is not first
+
+
+def test_openai_client_per_key_shares_pool():
+    first = connections.openai_client("http://127.0.0.1:9/v1", "a")
+    assert connections.openai_client("http://127.0.0.1:9/v1", "a") is first
+    assert connections.openai_client("http://127.0.0.1:9/v1", "b") is not first
+
+
+def test_warm_reports_rejected_keys(server):
+    result = connections.warm(server, [GOOD_KEY, BAD_KEY], connections=2)
+    assert result["error"] == ""
+    assert result["connections"] == 2
+    assert result["cold"] > 0 and result["warm"] > 0
+    assert result["rejected"] == ["sk-bad...1111"]
+
+
+def test_warm_unreachable():
+    result = connections.warm(f"http://127.0.0.1:{unused_port()}/v1", [])
+    assert result["error"] == "无法连接"
+    assert result["connections"] == 0
+
+
+def test_warmer_logs_and_summarizes(server):
+    lines = []
+    warmer = Warmer(log=lines.append)
+    warmer.start([("local", server, [GOOD_KEY], 2), ("file", "file:///tmp", [], 1)])
+    deadline = time.monotonic() + 10
+    while "local" not in warmer.results or not lines:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    warmer.stop()
+    assert list(warmer.results) == ["local"]
+    assert lines[0].startswith("🔥 预热 local")
+    assert warmer.summary().startswith("🔥 连接预热省下约")
+
+
+def test_saved_counts_each_connection():
+    warmer = Warmer()
+    warmer.results = {
+        "a": {"dns": 0.1, "cold": 0.5, "warm": 0.1, "connections": 3, "error": ""},
+        "b": {"dns": 1.0, "cold": 9.0, "warm": 0.0, "connections": 1, "error": "无法连接"},
+    }
+    assert warmer.saved() == pytest.approx(0.4 * 3 + 0.1)
+
+
+def test_summary_empty_when_every_warmup_failed():
+    warmer = Warmer()
+    warmer.results = {"a": {"dns": 0.0, "cold": 0.0, "warm": 0.0, "connections": 0, "error": "无法连接"}}
+    assert warmer.summary() == ""
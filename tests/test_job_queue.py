@@ -0,0 +1,113 @@
+"""任务队列：领取互斥、租约过期、过期租约提交、尝试次数上限（包括租约多次过期）和结果轮询"""
+
+import threading
+
+import pytest
+
+import job_queue
+from job_queue import InMemoryJobService, JobStore
+
+SETTINGS = {"prompt": "p", "few_shots": [], "languages": ["zh"]}
+
+
+@pytest.fixture
+def service():
+    return InMemoryJobService(JobStore())
+
+
+def enqueue(service, *keys):
+    return service.enqueue([{"key": key, "message": key, "mod_id": key} for key in keys], SETTINGS)
+
+
+def test_job_claimed_once_by_concurrent_workers(service):
+    enqueue(service, "a")
+    claimed = []
+    barrier = threading.Barrier(8)
+
+    def worker(name):
+        barrier.wait()
+        claimed.extend(service.claim(name, 1))
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == 1
+    assert service.claim("late", 1) == []
+
+
+def test_expired_lease_is_reclaimed(service):
+    enqueue(service, "a")
+    first = service.claim("w1", 1, lease_seconds=-1)[0]
+    second = service.claim("w2", 1)[0]
+    assert second["id"] == first["id"]
+    assert second["lease"] != first["lease"]
+
+
+def test_stale_lease_completion_rejected(service):
+    enqueue(service, "a")
+    first = service.claim("w1", 1, lease_seconds=-1)[0]
+    second = service.claim("w2", 1)[0]
+    assert not service.complete(first["id"], first["lease"], {"name": "旧"})
+    assert service.complete(second["id"], second["lease"], {"name": "新"})
+    assert not service.complete(second["id"], second["lease"], {"name": "重复"})
+    _, finished = service.results()
+    assert [item["result"]["name"] for item in finished] == ["新"]
+
+
+def test_job_fails_after_max_attempts(service):
+    enqueue(service, "a")
+    for attempt in range(job_queue.MAX_ATTEMPTS):
+        job = service.claim("w", 1)[0]
+        assert service.fail(job["id"], job["lease"], f"error {attempt}")
+    assert service.claim("w", 1) == []
+    assert service.stats() == {job_queue.FAILED: 1}
+    _, finished = service.results()
+    assert finished[0]["status"] == job_queue.FAILED
+    assert finished[0]["error"] == f"error {job_queue.MAX_ATTEMPTS - 1}"
+
+
+def test_repeatedly_expired_lease_fails(service):
+    enqueue(service, "a", "b")
+    for _ in range(job_queue.MAX_ATTEMPTS):
+        assert service.claim("crashing", 1, lease_seconds=-1)[0]["key"] == "a"
+    # "a" 的租约已过期 MAX_ATTEMPTS 次，不再领取，轮到 "b"
+    assert service.claim("w", 1)[0]["key"] == "b"
+    assert service.stats() == {job_queue.FAILED: 1, job_queue.LEASED: 1}
+    _, finished = service.results()
+    assert [(item["key"], item["status"]) for item in finished] == [("a", job_queue.FAILED)]
+    assert finished[0]["error"] == "租约多次过期"
+
+
+def test_failed_job_requeued_on_enqueue(service):
+    enqueue(service, "a")
+    for _ in range(job_queue.MAX_ATTEMPTS):
+        job = service.claim("w", 1)[0]
+        service.fail(job["id"], job["lease"])
+    assert enqueue(service, "a") == 0
+    assert len(service.claim("w", 1)) == 1
+
+
+def test_results_poll_skips_consumed_history(service):
+    enqueue(service, "old", "a", "b")
+    for job in service.claim("w", 3):
+        if job["key"] != "b":
+            service.complete(job["id"], job["lease"], {"name": job["key"]})
+        else:
+            b = job
+
+    version, finished = service.results(0, ["a", "b"])
+    assert [item["key"] for item in finished] == ["a"]
+    assert service.results(version) == (version, [])
+
+    service.complete(b["id"], b["lease"], {"name": "b"})
+    version, finished = service.results(version)
+    assert [item["key"] for item in finished] == ["b"]
+    assert service.results(version)[1] == []
+
+
+def test_settings_shared_by_jobs(service):
+    enqueue(service, "a")
+    job = service.claim("w", 1)[0]
+    assert service.settings(job["s"]) == SETTINGS
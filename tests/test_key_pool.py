@@ -0,0 +1,132 @@
+"""密钥池：调度、限流冷却和移除，以及模型调用在限流时换密钥或等待冷却"""
+
+import pytest
+
+import chat2gpt4o
+import key_pool
+import retry_policy
+from adaptive_limit import AIMDLimiter
+from key_pool import KeyPool, NoKeyAvailable, RateLimited, load_keys, split_keys
+
+
+def test_split_keys():
+    assert split_keys(" a, b;c\nd ,, ") == ["a", "b", "c", "d"]
+
+
+def test_load_keys_merges_sources(monkeypatch):
+    monkeypatch.setenv("GPT_API_KEYS", "b,c")
+    monkeypatch.setenv("ALIYY_API_KEY", "a")
+    monkeypatch.delenv("GPT_API_KEY", raising=False)
+    monkeypatch.delenv("ALIYY_API_KEYS", raising=False)
+    assert load_keys("gpt", "a") == ["a", "b", "c"]
+
+
+def test_round_robin():
+    pool = KeyPool(["a", "b", "c"], strategy="round_robin")
+    picked = []
+    for _ in range(6):
+        key = pool.acquire()
+        picked.append(key)
+        pool.release(key)
+    assert picked == ["a", "b", "c", "a", "b", "c"]
+
+
+def test_least_loaded_prefers_idle_key():
+    pool = KeyPool(["a", "b"], strategy="least_loaded")
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first, second} == {"a", "b"}
+    pool.release(first)
+    assert pool.acquire() == first
+
+
+def test_rate_limited_key_cools_down(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(key_pool.time, "monotonic", lambda: now[0])
+    pool = KeyPool(["a", "b"], strategy="round_robin")
+    pool.release(pool.acquire(), rate_limited=True)
+    assert [pool.acquire() for _ in range(2)] == ["b", "b"]
+    now[0] += key_pool.RATE_LIMIT_COOLDOWN
+    assert "a" in {pool.acquire() for _ in range(2)}
+
+
+def test_cooldown_doubles_up_to_max():
+    pool = KeyPool(["a"])
+    for _ in range(10):
+        pool._find("a").cooldown_until = 0.0
+        pool.release(pool.acquire(), rate_limited=True)
+    assert pool._find("a").cooldown == key_pool.MAX_COOLDOWN
+
+
+def test_all_keys_cooling_times_out():
+    pool = KeyPool(["a"])
+    pool.release(pool.acquire(), rate_limited=True)
+    with pytest.raises(NoKeyAvailable):
+        pool.acquire(timeout=0)
+
+
+def test_removed_key_not_restored():
+    pool = KeyPool(["a", "b"])
+    pool.remove("a")
+    pool.set_keys(["a", "b", "c"])
+    assert len(pool) == 2
+    assert [row["removed"] for row in pool.stats()] == [False, False, True]
+    pool.remove("b")
+    pool.remove("c")
+    with pytest.raises(NoKeyAvailable):
+        pool.acquire()
+
+
+class Backend:
+    def __init__(self, name):
+        self.name = name
+        self.slots = AIMDLimiter(maximum=4)
+
+
+def rate_limited_then(answers):
+    """依次抛出 RateLimited（None）或返回答案的模型函数"""
+    calls = []
+
+    def func(message, pormet, mod_id="", api_key=None):
+        calls.append(api_key)
+        answer = answers[len(calls) - 1]
+        if answer is None:
+            raise RateLimited("429")
+        return answer
+
+    return func, calls
+
+
+@pytest.fixture
+def fast_cooldown(monkeypatch):
+    monkeypatch.setattr(key_pool, "RATE_LIMIT_COOLDOWN", 0.01)
+    monkeypatch.setattr(retry_policy, "retry_budget", retry_policy.RetryBudget())
+
+
+def test_single_key_waits_out_rate_limit(fast_cooldown):
+    func, calls = rate_limited_then([None, None, "战斗扩展"])
+    result = chat2gpt4o._call_with_keys(Backend("test-single-key"), func, "m", "p", "only-key", "mod")
+    assert result == "战斗扩展"
+    assert calls == ["only-key"] * 3
+    assert retry_policy.retry_budget.retries == 2
+
+
+def test_rate_limit_switches_key_without_budget(fast_cooldown):
+    func, calls = rate_limited_then([None, "战斗扩展"])
+    result = chat2gpt4o._call_with_keys(Backend("test-two-keys"), func, "m", "p", "key-a,key-b", "mod")
+    assert result == "战斗扩展"
+    assert sorted(calls) == ["key-a", "key-b"]
+    assert retry_policy.retry_budget.retries == 0
+
+
+def test_rate_limit_gives_up_when_budget_exhausted(fast_cooldown):
+    retry_policy.retry_budget.tokens = 0.0
+    func, calls = rate_limited_then([None, "战斗扩展"])
+    assert chat2gpt4o._call_with_keys(Backend("test-no-budget"), func, "m", "p", "only-key", "mod") is None
+    assert len(calls) == 1
+
+
+def test_rate_limit_retries_capped(fast_cooldown):
+    func, calls = rate_limited_then([None] * 10)
+    assert chat2gpt4o._call_with_keys(Backend("test-capped"), func, "m", "p", "only-key", "mod") is None
+    assert len(calls) == 1 + retry_policy.MAX_ATTEMPTS
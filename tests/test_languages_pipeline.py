@@ -0,0 +1,93 @@
+"""Defs/Keyed 文本翻译：提取、分批、占位符检查和写入 LanguageData 文件"""
+
+import json
+import os
+
+import pytest
+
+import languages_pipeline
+from languages_pipeline import (LanguagesPipeline, expected_output_tokens, iter_strings, make_batches,
+                                parse_batch_response, placeholders_match, write_language_file)
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def mod(tmp_path):
+    folder = tmp_path / "mod"
+    write(str(folder / "Languages" / "English" / "Keyed" / "Keys.xml"),
+          "<LanguageData><Hello>Hello {0}</Hello><Done>Done</Done><Empty> </Empty></LanguageData>")
+    write(str(folder / "1.5" / "Defs" / "Things.xml"),
+          "<Defs><ThingDef><defName>Wall</defName><label>wall</label><description>A wall.</description></ThingDef>"
+          '<ThingDef Abstract="True"><defName>Base</defName><label>base</label></ThingDef></Defs>')
+    write(str(folder / "Languages" / "ChineseSimplified" / "Keyed" / "Keys.xml"),
+          "<LanguageData><Done>完成</Done></LanguageData>")
+    return str(folder)
+
+
+def test_iter_strings_skips_existing_and_abstract(mod):
+    items = {(item.kind, item.key): item for item in iter_strings(mod)}
+    assert set(items) == {("Keyed", "Hello"), ("DefInjected", "Wall.label"), ("DefInjected", "Wall.description")}
+    assert items[("DefInjected", "Wall.label")].target_file.endswith(
+        os.path.join("1.5", "Languages", "ChineseSimplified", "DefInjected", "ThingDef", "Things.xml"))
+
+
+def test_make_batches_respects_token_limit(mod):
+    items = list(iter_strings(mod)) * 10
+    batches = list(make_batches(iter(items), max_tokens=20))
+    assert sum(len(batch) for batch in batches) == len(items)
+    assert all(sum(languages_pipeline.estimate_tokens(item.text) + 4 for item in batch) <= 20
+               for batch in batches if len(batch) > 1)
+
+
+def test_expected_output_tokens_grows_with_batch():
+    assert expected_output_tokens(["word"] * 50) > expected_output_tokens(["word"])
+
+
+def test_placeholders_match():
+    assert placeholders_match("{PAWN_nameDef} built {1}.\\n", "{PAWN_nameDef}建好了{1}。\\n")
+    assert not placeholders_match("Hello {0}", "你好")
+    assert placeholders_match("<color=red>[PAWN_pronoun]</color>", "<color=red>[PAWN_pronoun]</color>")
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"0": "木墙", "1": 2}\n```', {"0": "木墙"}),
+    ('结果：{"0": "木墙"}', {"0": "木墙"}),
+    ("不是 JSON", {}),
+    ('{"0": ', {}),
+    ("", {}),
+])
+def test_parse_batch_response(text, expected):
+    assert parse_batch_response(text) == expected
+
+
+def test_write_language_file_keeps_existing(tmp_path):
+    path = str(tmp_path / "Keyed" / "Keys.xml")
+    write_language_file(path, {"A": "甲 & 乙"})
+    write_language_file(path, {"A": "覆盖", "B": "丙"})
+    root = languages_pipeline.ET.parse(path).getroot()
+    assert {child.tag: child.text for child in root} == {"A": "甲 & 乙", "B": "丙"}
+
+
+def test_pipeline_writes_translations(mod, monkeypatch):
+    requests = []
+
+    def call_model(message, max_tokens=0, **kwargs):
+        request = json.loads(message)
+        requests.append((request, max_tokens))
+        # 丢掉占位符的译文会被拒绝
+        return json.dumps({key: "你好" if "{0}" in text else "译文" for key, text in request.items()},
+                          ensure_ascii=False)
+
+    monkeypatch.setattr(languages_pipeline.chat2gpt4o, "call_model", call_model)
+    pipeline = LanguagesPipeline("glm", workers=2, log=lambda message: None)
+    stats = pipeline.run([mod])
+    assert (stats["strings"], stats["translated"], stats["rejected"]) == (3, 2, 1)
+    assert all(max_tokens >= expected_output_tokens(list(request.values())) for request, max_tokens in requests)
+    def_file = os.path.join(mod, "1.5", "Languages", "ChineseSimplified", "DefInjected", "ThingDef", "Things.xml")
+    root = languages_pipeline.ET.parse(def_file).getroot()
+    assert {child.tag: child.text for child in root} == {"Wall.label": "译文", "Wall.description": "译文"}
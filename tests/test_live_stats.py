@@ -0,0 +1,70 @@
+"""实时统计：滑动窗口的速率、延迟分位数、错误率和剩余时间估算"""
+
+import pytest
+
+import live_stats
+from live_stats import EtaEstimator, LiveStats, format_duration, percentile
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(live_stats.time, "monotonic", clock)
+    return clock
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.95) == 95.0
+
+
+def test_snapshot(clock):
+    stats = LiveStats(window=60)
+    for latency, ok in [(1.0, True), (2.0, True), (3.0, False)]:
+        started = stats.begin("glm")
+        clock.now += latency
+        stats.end("glm", started, ok)
+    stats.rate_limited("glm")
+    in_flight = stats.begin("qwen")
+    clock.now = 1010.0
+    snapshot = stats.snapshot()
+    glm = snapshot["providers"]["glm"]
+    assert snapshot["in_flight"] == 1
+    assert snapshot["rps"] == pytest.approx(3 / 10)
+    assert (glm["requests"], glm["p50"]) == (3, 2.0)
+    assert glm["error_rate"] == pytest.approx(1 / 3)
+    assert glm["rate_limit_rate"] == pytest.approx(1 / 4)
+    stats.end("qwen", in_flight)
+    assert stats.snapshot()["in_flight"] == 0
+
+
+def test_old_samples_leave_window(clock):
+    stats = LiveStats(window=60)
+    stats.end("glm", stats.begin("glm"))
+    clock.now += 61
+    assert stats.snapshot()["providers"]["glm"]["requests"] == 0
+
+
+def test_eta(clock):
+    eta = EtaEstimator(window=60)
+    assert eta.update(0, 100) is None
+    clock.now += 10
+    assert eta.update(10, 100) == pytest.approx(90.0)
+    clock.now += 10
+    assert eta.update(10, 100) == pytest.approx(180.0)
+    assert eta.update(100, 100) == 0.0
+
+
+@pytest.mark.parametrize("seconds, text", [(None, "--"), (42, "42秒"), (192, "3分12秒"), (7260, "2小时1分")])
+def test_format_duration(seconds, text):
+    assert format_duration(seconds) == text
@@ -0,0 +1,78 @@
+"""加载顺序：读取 ModsConfig.xml 和 Steam acf，按 已启用 → 近期更新 → 其余 排序"""
+
+import time
+
+from load_order import prioritize, read_active_mods, read_workshop_times, schedule
+from mod_scanner import ModRecord
+
+ACF = '''"AppWorkshop"
+{
+    "WorkshopItemsInstalled"
+    {
+        "1001"
+        {
+            "size"        "10"
+            "timeupdated"        "%d"
+        }
+        "1002"
+        {
+            "timeupdated"        "%d"
+        }
+    }
+    "WorkshopItemDetails"
+    {
+        "1001"
+        {
+            "timeupdated"        "1"
+        }
+    }
+}
+'''
+
+
+def record(folder, package_id):
+    return ModRecord(folder, package_id, package_id, "", "", (), False, ())
+
+
+def test_read_active_mods(tmp_path):
+    path = tmp_path / "ModsConfig.xml"
+    path.write_text("<ModsConfigData><activeMods><li>Ludeon.RimWorld</li><li>CETeam.CE_steam</li>"
+                    "<li>ceteam.ce</li><li> </li></activeMods></ModsConfigData>", encoding="utf-8")
+    assert read_active_mods(str(path)) == ["ludeon.rimworld", "ceteam.ce"]
+    assert read_active_mods(str(tmp_path / "missing.xml")) == []
+
+
+def write_acf(tmp_path, first, second):
+    content = tmp_path / "workshop" / "content" / "294100"
+    content.mkdir(parents=True)
+    (tmp_path / "workshop" / "appworkshop_294100.acf").write_text(ACF % (first, second), encoding="utf-8")
+    return str(content)
+
+
+def test_read_workshop_times(tmp_path):
+    content = write_acf(tmp_path, 100, 200)
+    assert read_workshop_times(content) == {"1001": 100, "1002": 200}
+    assert read_workshop_times(str(tmp_path / "nowhere" / "294100")) == {}
+
+
+def test_prioritize():
+    now = int(time.time())
+    records = [
+        record("/mods/old", "old"),
+        record("/mods/1002", "recent.b"),
+        record("/mods/1001", "recent.a"),
+        record("/mods/second", "active.second"),
+        record("/mods/first", "active.first"),
+    ]
+    times = {"old": now - 400 * 86400, "1001": now - 86400, "1002": now - 2 * 86400}
+    ordered, active, recent = prioritize(records, ["active.first", "active.second"], times)
+    assert [r.package_id for r in ordered] == ["active.first", "active.second", "recent.a", "recent.b", "old"]
+    assert (active, recent) == (2, 2)
+
+
+def test_schedule_without_config(tmp_path, monkeypatch):
+    monkeypatch.setenv("RIMWORLD_MODS_CONFIG", str(tmp_path / "missing.xml"))
+    content = write_acf(tmp_path, int(time.time()), 0)
+    ordered, active, recent = schedule([record(f"{content}/1002", "b"), record(f"{content}/1001", "a")], content)
+    assert [r.package_id for r in ordered] == ["a", "b"]
+    assert (active, recent) == (0, 1)
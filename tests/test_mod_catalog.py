@@ -0,0 +1,42 @@
+"""模组目录：搜索和状态计数使用相同的筛选条件"""
+
+import os
+
+import pytest
+
+import mod_catalog
+from mod_catalog import ModCatalog
+from mod_scanner import ModRecord
+
+
+def record(folder, package_id, name):
+    return ModRecord(folder, package_id, name, "", "", ("1.5",), False, ())
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = ModCatalog(str(tmp_path / "catalog.sqlite3"))
+    a, b = tmp_path / "a", tmp_path / "b"
+    catalog.upsert_records([
+        record(str(a / "1"), "x.combat", "Combat Extended"),
+        record(str(a / "2"), "x.hud", "RimHUD"),
+        record(str(b / "3"), "y.combat", "Combat Armor"),
+    ])
+    catalog.mark_translated(record(str(a / "1"), "x.combat", "Combat Extended"), "战斗扩展", "gpt")
+    yield catalog
+    catalog.close()
+
+
+def test_counts_follow_search_filter(catalog, tmp_path):
+    assert catalog.counts() == {mod_catalog.PENDING: 2, mod_catalog.TRANSLATED: 1}
+    assert catalog.counts("Combat") == {mod_catalog.PENDING: 1, mod_catalog.TRANSLATED: 1}
+    directory = str(tmp_path / "a")
+    assert catalog.counts("Combat", directory) == {mod_catalog.TRANSLATED: 1}
+    assert len(catalog.search("Combat", directory=directory)) == 1
+    assert catalog.counts(directory=directory) == {mod_catalog.PENDING: 1, mod_catalog.TRANSLATED: 1}
+
+
+def test_search_by_status(catalog):
+    rows = catalog.search(status=mod_catalog.PENDING)
+    assert [row["original_name"] for row in rows] == ["Combat Armor", "RimHUD"]
+    assert os.path.basename(catalog.search("HUD")[0]["folder"]) == "2"
@@ -0,0 +1,91 @@
+"""模组扫描：单进程和进程池解析，解析失败的模组记为 ScanError，以及自带中文的判断"""
+
+import os
+
+import pytest
+
+import mod_scanner
+from mod_scanner import ScanError, extract_about, scan_mods
+
+
+def test_extract_about(make_mod):
+    folder = make_mod("ce", "Combat Extended", description="Guns.", package_id="CETeam.CE",
+                      languages=["ChineseSimplified"])
+    record = extract_about(folder)
+    assert record.name == "Combat Extended"
+    assert record.package_id == "ceteam.ce"
+    assert record.supported_versions == ("1.5",)
+    assert record.description_hash == mod_scanner.text_hash("Guns.")
+    assert record.languages == ("ChineseSimplified",)
+    assert not record.has_backup
+
+
+def test_folder_without_about_is_skipped(tmp_path):
+    assert extract_about(str(tmp_path)) is None
+    assert list(scan_mods([str(tmp_path)])) == []
+
+
+def make_broken(make_mod, tmp_path):
+    bad_xml = make_mod("bad", "Bad")
+    with open(os.path.join(bad_xml, "About", "About.xml"), "w", encoding="utf-8") as f:
+        f.write("<ModMetaData><name>Bad</ModMetaData>")
+    no_name = make_mod("noname", None)
+    return [bad_xml, no_name]
+
+
+def test_errors_reported_in_process(make_mod, tmp_path):
+    good = make_mod("good", "Good")
+    broken = make_broken(make_mod, tmp_path)
+    errors = []
+    records = list(scan_mods([good] + broken, errors=errors))
+    assert [record.folder for record in records] == [good]
+    assert sorted(error.folder for error in errors) == sorted(broken)
+    assert all(isinstance(error, ScanError) and error.error for error in errors)
+
+
+def test_process_pool_matches_single_process(make_mod, tmp_path):
+    folders = [make_mod(f"mod{i:03d}", f"Mod {i}") for i in range(mod_scanner.MIN_PARALLEL_FOLDERS + 10)]
+    broken = make_broken(make_mod, tmp_path)
+    errors = []
+    records = list(scan_mods(folders + broken, workers=2, errors=errors))
+    assert sorted(record.folder for record in records) == sorted(folders)
+    assert sorted(error.folder for error in errors) == sorted(broken)
+
+
+def test_errors_dropped_without_list(make_mod, tmp_path):
+    broken = make_broken(make_mod, tmp_path)
+    assert list(scan_mods(broken)) == []
+
+
+def localized(name="Combat Extended", description="Guns and armor.", languages=(), has_backup=False):
+    record = mod_scanner.ModRecord("/mods/ce", "ce", name, description, "", ("1.5",), has_backup, tuple(languages))
+    return mod_scanner.chinese_localization(record)
+
+
+@pytest.mark.parametrize("languages", [["ChineseSimplified"], ["ChineseTraditional (繁體中文)"], ["简体中文"]])
+def test_chinese_language_folder(languages):
+    assert localized(languages=["English"] + languages) == f"已有中文本地化（Languages/{languages[0]}）"
+
+
+def test_chinese_name_and_description():
+    assert localized(name="战斗扩展") == "已包含中文"
+    assert localized(description="为殖民者添加全新的武器和护甲 with CE") == "描述为中文"
+    assert localized(description="Adds guns. 添加枪械") == ""
+    assert localized(languages=["English", "Japanese"]) == ""
+
+
+def test_translated_mod_only_checks_name(monkeypatch):
+    # 已有备份的模组更新后仍可重新翻译，不因本地化文件夹或描述跳过
+    assert localized(languages=["ChineseSimplified"], has_backup=True) == ""
+    assert localized(name="战斗扩展", has_backup=True) == "已包含中文"
+    monkeypatch.setattr(mod_scanner, "SKIP_LOCALIZED", False)
+    assert localized(languages=["ChineseSimplified"]) == ""
+    assert localized(description="为殖民者添加全新的武器") == ""
+
+
+def test_language_folders_in_version_directories(make_mod):
+    folder = make_mod("ce", "Combat Extended", languages=["English"])
+    os.makedirs(os.path.join(folder, "1.5", "Languages", "ChineseSimplified"))
+    record = extract_about(folder)
+    assert record.languages == ("English", "ChineseSimplified")
+    assert mod_scanner.chinese_localization(record) == "已有中文本地化（Languages/ChineseSimplified）"
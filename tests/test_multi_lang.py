@@ -0,0 +1,103 @@
+"""多语言译名：解析、保存、原名恢复和切换语言"""
+
+import os
+
+import pytest
+
+import mod_scanner
+import multi_lang
+from backup_store import BackupStore
+
+
+def current_name(folder):
+    return mod_scanner.extract_about(folder).name
+
+
+def test_parse_languages():
+    assert multi_lang.parse_languages("") == [multi_lang.DEFAULT_LANGUAGE]
+    assert multi_lang.parse_languages("ja，zh-Hans ja") == ["ja", "zh-Hans"]
+    with pytest.raises(ValueError):
+        multi_lang.parse_languages("fr")
+
+
+def test_parse_response_in_code_block():
+    text = '```json\n{"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}\n```'
+    assert multi_lang.parse_response(text, ["zh-Hans", "ja"]) == {"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}
+
+
+@pytest.mark.parametrize("text", ["战斗扩展", '{"zh-Hans": "战斗扩展"', '{"zh-Hans": "战斗扩展", "ja": ""}'])
+def test_parse_response_rejects_bad_json(text):
+    with pytest.raises(ValueError):
+        multi_lang.parse_response(text, ["zh-Hans", "ja"])
+
+
+def test_few_shots_only_with_all_languages():
+    shots = [("q1", "原版扩展系列前置框架"), ("q2", "没有多语言答案")]
+    result = multi_lang.build_few_shots(shots, ["zh-Hans", "ja"])
+    assert [question for question, _ in result] == ["q1"]
+
+
+def test_cached_names_requires_every_language():
+    value = {"name": "战斗扩展", "names": {"ja": "戦闘拡張"}}
+    assert multi_lang.cached_names(value, ["zh-Hans", "ja"]) == {"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}
+    assert multi_lang.cached_names(value, ["zh-Hant"]) is None
+    assert multi_lang.cached_names(None, ["zh-Hans"]) is None
+
+
+def test_apply_and_switch_languages(make_mod):
+    folder = make_mod("ce", "Combat Extended")
+    names = {"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}
+    assert multi_lang.apply_names(folder, "Combat Extended", names, "zh-Hans") == multi_lang.SWITCHED
+    assert current_name(folder) == "战斗扩展"
+    assert os.path.exists(os.path.join(folder, "About", "About_old.xml"))
+    assert multi_lang.has_languages(folder, ["zh-Hans", "ja"])
+
+    assert multi_lang.switch_language(folder, "ja") == multi_lang.SWITCHED
+    assert current_name(folder) == "戦闘拡張"
+    assert multi_lang.switch_language(folder, "ja") == multi_lang.UNCHANGED
+    assert multi_lang.switch_language(folder, "zh-Hant") == multi_lang.MISSING
+
+
+def test_save_names_keeps_other_languages(make_mod):
+    folder = make_mod("ce", "Combat Extended")
+    multi_lang.save_names(folder, "Combat Extended", {"ja": "戦闘拡張"})
+    multi_lang.save_names(folder, "ignored", {"zh-Hans": "战斗扩展"})
+    data = multi_lang.read_names(folder)
+    assert data["original"] == "Combat Extended"
+    assert data["names"] == {"ja": "戦闘拡張", "zh-Hans": "战斗扩展"}
+
+
+def test_source_record_from_names_file(make_mod):
+    folder = make_mod("ce", "Combat Extended")
+    multi_lang.apply_names(folder, "Combat Extended", {"zh-Hans": "战斗扩展"}, "zh-Hans")
+    record = mod_scanner.extract_about(folder)
+    assert multi_lang.source_record(record).name == "Combat Extended"
+
+
+def test_source_record_from_local_backup(make_mod):
+    folder = make_mod("ce", "Combat Extended")
+    mod_scanner.write_translated_name(folder, "战斗扩展")
+    record = mod_scanner.extract_about(folder)
+    assert multi_lang.source_record(record).name == "Combat Extended"
+
+
+def test_source_record_from_backup_store(make_mod, tmp_path):
+    store = BackupStore(str(tmp_path / "backups"))
+    folder = make_mod("ce", "Combat Extended")
+    mod_scanner.write_translated_name(folder, "战斗扩展", store)
+    record = mod_scanner.extract_about(folder)
+    assert not record.has_backup
+    assert multi_lang.source_record(record).name == "战斗扩展"
+    assert multi_lang.source_record(record, store).name == "Combat Extended"
+
+
+def test_switch_all_counts(make_mod, tmp_path):
+    first = make_mod("a", "Alpha")
+    make_mod("b", "Beta")
+    multi_lang.save_names(first, "Alpha", {"ja": "アルファ"})
+    lines = []
+    stats = multi_lang.switch_all(str(tmp_path / "mods"), "ja", log=lines.append)
+    assert stats[multi_lang.SWITCHED] == 1
+    assert stats[multi_lang.MISSING] == 1
+    assert current_name(first) == "アルファ"
+    assert lines[-1].startswith("🌐 已切换到 日本語")
@@ -0,0 +1,86 @@
+"""译名检查：修正、拒绝规则和批量结果解析"""
+
+import pytest
+
+import output_check
+from output_check import check, check_names, clean, parse_batch, validate
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("  更好的殖民者  ", "更好的殖民者"),
+    ("“更好的殖民者”", "更好的殖民者"),
+    ("「『战斗扩展』」", "战斗扩展"),
+    ("总结：更好的殖民者。", "更好的殖民者"),
+    ("译名: 战斗扩展", "战斗扩展"),
+    ("战斗扩展！", "战斗扩展"),
+])
+def test_clean(text, expected):
+    assert clean(text) == expected
+
+
+def test_clean_keeps_unpaired_quote():
+    assert clean("“战斗扩展") == "“战斗扩展"
+
+
+def test_validate_accepts_target_script():
+    assert validate("更好的殖民者") is None
+    assert validate("RimHUD 信息面板") is None
+    assert validate("戦闘システム拡張", "ja") is None
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("", "结果为空"),
+    ("第一行\n第二行", "包含换行"),
+    ("“战斗扩展", "包含引号"),
+    ("这个模组增加了新武器", "包含说明性文字"),
+    ("Combat Extended", "目标语言文字比例过低"),
+    ("Combat Extended 战", "目标语言文字比例过低"),
+])
+def test_validate_rejects(text, reason):
+    assert validate(text) == reason
+
+
+def test_validate_length_limit_per_language():
+    assert validate("战" * output_check.MAX_LENGTH["zh-Hans"]) is None
+    assert validate("战" * (output_check.MAX_LENGTH["zh-Hans"] + 1)).startswith("过长")
+
+
+def test_script_ratio_depends_on_language():
+    assert validate("せんとう", "ja") is None
+    assert validate("せんとう", "zh-Hans") == "目标语言文字比例过低"
+
+
+def test_check_cleans_before_validating():
+    assert check("总结：战斗扩展。") == ("战斗扩展", None)
+
+
+def test_check_names_reports_first_problem():
+    cleaned, reason = check_names({"zh-Hans": "“战斗扩展”", "ja": "Combat"})
+    assert cleaned == {"zh-Hans": "战斗扩展", "ja": "Combat"}
+    assert reason == "ja 目标语言文字比例过低"
+
+
+def test_parse_batch_single_language():
+    text = '以下是结果：{"1": "战斗扩展", "2": 3}'
+    assert parse_batch(text, 3, ["zh-Hans"]) == [{"zh-Hans": "战斗扩展"}, None, None]
+
+
+def test_parse_batch_multi_language():
+    text = '{"1": {"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}, "2": {"zh-Hans": "只有一种"}}'
+    assert parse_batch(text, 2, ["zh-Hans", "ja"]) == [
+        {"zh-Hans": "战斗扩展", "ja": "戦闘拡張"}, None]
+
+
+@pytest.mark.parametrize("text", ["", "没有 JSON", '["战斗扩展"]'])
+def test_parse_batch_rejects_non_object(text):
+    with pytest.raises(ValueError):
+        parse_batch(text, 1, ["zh-Hans"])
+
+
+def test_batch_max_tokens_scales_with_batch_and_languages():
+    one = output_check.batch_max_tokens(1, ["zh-Hans"])
+    full = output_check.batch_max_tokens(output_check.RETRY_BATCH_SIZE, ["zh-Hans", "zh-Hant", "ja"])
+    assert one < full
+    # gpt 后端默认的 max_tokens 为 400，多语言整批需要更多
+    assert full > 400
+    assert full >= output_check.RETRY_BATCH_SIZE * 3 * output_check.MAX_LENGTH["ja"]
@@ -0,0 +1,102 @@
+"""采样性能分析：采样线程栈，输出折叠栈、speedscope 和汇总"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from profiler import SamplingProfiler
+
+FRAME_ROOT = ("main", "/src/app.py", 1)
+FRAME_WORK = ("work", "/src/app.py", 10)
+FRAME_WAIT = ("Event.wait", "/lib/threading.py", 600)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def profiler():
+    """两个线程、三种栈的固定采样结果"""
+    profiler = SamplingProfiler(interval=0.01)
+    profiler.samples[("MainThread", (FRAME_ROOT, FRAME_WORK))] = 6
+    profiler.samples[("MainThread", (FRAME_ROOT,))] = 2
+    profiler.samples[("worker", (FRAME_WAIT,))] = 2
+    profiler.sample_count = 8
+    profiler.elapsed = 0.08
+    return profiler
+
+
+def test_samples_busy_thread():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    assert profiler.running
+    deadline = time.monotonic() + 10
+    while profiler.sample_count < 20:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    profiler.stop()
+    stop.set()
+    worker.join()
+    assert not profiler.running
+    busy = [stack for (thread, stack), _ in profiler.samples.items() if thread == "busy"]
+    assert any(frame[0] == "busy_loop" for stack in busy for frame in stack)
+    assert all(thread != "profiler" for thread, _ in profiler.samples)
+
+
+def test_collapsed_lines(profiler):
+    lines = profiler.collapsed()
+    assert lines[0] == "MainThread;main (app.py:1);work (app.py:10) 6"
+    assert sorted(lines[1:]) == ["MainThread;main (app.py:1) 2", "worker;Event.wait (threading.py:600) 2"]
+
+
+def test_collapsed_escapes_semicolons():
+    profiler = SamplingProfiler()
+    profiler.samples[("t", (("a;b", "/x.py", 1),))] = 1
+    assert profiler.collapsed() == ["t;a,b (x.py:1) 1"]
+
+
+def test_speedscope_structure(profiler):
+    data = profiler.speedscope("run")
+    frames = data["shared"]["frames"]
+    assert {frame["name"] for frame in frames} == {"main", "work", "Event.wait"}
+    main, worker = data["profiles"]
+    assert (main["name"], worker["name"]) == ("MainThread", "worker")
+    assert main["type"] == "sampled" and main["unit"] == "seconds"
+    assert main["endValue"] == pytest.approx(0.08)
+    assert len(main["samples"]) == len(main["weights"]) == 2
+    for ids in main["samples"]:
+        assert frames[ids[0]]["name"] == "main"
+    assert data["name"] == "run"
+
+
+def test_function_stats_own_and_total(profiler):
+    stats = {frame[0]: (own, total) for frame, own, total in profiler.function_stats()}
+    assert stats == {"main": (2, 8), "work": (6, 6), "Event.wait": (2, 2)}
+
+
+def test_summary(profiler):
+    lines = profiler.summary(top=2)
+    assert lines[0].startswith("采样 8 次，间隔 10 毫秒")
+    assert lines[1] == "线程: MainThread 8，worker 2"
+    assert len(lines) == 5
+    assert lines[3].split()[:3] == ["2", "8", "80.0%"]
+
+
+def test_save_writes_three_files(profiler, tmp_path):
+    paths = profiler.save(str(tmp_path / "profiles"), "run")
+    assert sorted(paths) == ["collapsed", "speedscope", "summary"]
+    for path in paths.values():
+        assert os.path.basename(path).startswith("run.")
+        assert os.path.getsize(path) > 0
+    with open(paths["speedscope"], encoding="utf-8") as f:
+        assert json.load(f)["name"] == "run"
+    with open(paths["collapsed"], encoding="utf-8") as f:
+        assert f.read().splitlines() == profiler.collapsed()
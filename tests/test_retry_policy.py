@@ -0,0 +1,143 @@
+"""重试层：p99 超时、重试预算和重试行为"""
+
+import pytest
+
+import retry_policy
+from key_pool import RateLimited
+from retry_policy import LatencyHistogram, RetryBudget, backoff_delay, call_with_retry
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(retry_policy, "_histograms", retry_policy.defaultdict(LatencyHistogram))
+    monkeypatch.setattr(retry_policy, "retry_budget", RetryBudget())
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda retry: 0.0)
+
+
+def test_default_timeout_until_enough_samples():
+    stats = LatencyHistogram()
+    for _ in range(retry_policy.MIN_SAMPLES - 1):
+        stats.record(1.0)
+    assert stats.timeout() == retry_policy.DEFAULT_TIMEOUT
+
+
+def test_timeout_follows_p99():
+    stats = LatencyHistogram()
+    for value in range(1, 101):
+        stats.record(value / 10)
+    assert stats.quantile(0.99) == 10.0
+    assert stats.timeout() == pytest.approx(10.0 * retry_policy.TIMEOUT_FACTOR)
+
+
+@pytest.mark.parametrize("latency, expected", [(0.1, retry_policy.MIN_TIMEOUT), (100.0, retry_policy.MAX_TIMEOUT)])
+def test_timeout_clamped(latency, expected):
+    stats = LatencyHistogram()
+    for _ in range(retry_policy.MIN_SAMPLES):
+        stats.record(latency)
+    assert stats.timeout() == expected
+
+
+def test_size_classes_have_separate_timeouts():
+    for _ in range(retry_policy.MIN_SAMPLES):
+        retry_policy.histogram("gpt#0").record(4.0)
+    assert retry_policy.request_timeout("gpt", 100) == pytest.approx(4.0 * retry_policy.TIMEOUT_FACTOR)
+    assert retry_policy.request_timeout("gpt", retry_policy.SIZE_CLASSES[0]) == retry_policy.DEFAULT_TIMEOUT
+
+
+def test_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, reserve=2.0)
+    assert budget.try_withdraw() and budget.try_withdraw()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    assert budget.try_withdraw()
+    assert (budget.requests, budget.retries, budget.denied) == (2, 3, 2)
+
+
+def test_budget_capped_at_reserve():
+    budget = RetryBudget(ratio=1.0, reserve=2.0)
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2.0
+
+
+def test_backoff_within_cap():
+    for retry in range(10):
+        delay = backoff_delay(retry)
+        assert 0 <= delay <= min(retry_policy.BACKOFF_CAP, retry_policy.BACKOFF_BASE * 2 ** retry)
+
+
+def test_retry_doubles_timeout_then_succeeds():
+    timeouts = []
+
+    def attempt(timeout):
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise TimeoutError
+        return "ok"
+
+    assert call_with_retry("gpt", attempt) == "ok"
+    base = retry_policy.DEFAULT_TIMEOUT
+    assert timeouts == [base, base * 2, min(retry_policy.MAX_TIMEOUT, base * 4)]
+    assert len(retry_policy.histogram("gpt#0").samples()) == 1
+
+
+def test_gives_up_after_max_attempts():
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise ConnectionError
+
+    assert call_with_retry("gpt", attempt) is None
+    assert len(calls) == retry_policy.MAX_ATTEMPTS
+
+
+def test_no_retry_when_budget_exhausted():
+    retry_policy.retry_budget.tokens = 0.0
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        raise ConnectionError
+
+    assert call_with_retry("gpt", attempt) is None
+    assert len(calls) == 1
+    assert retry_policy.retry_budget.denied == 1
+
+
+def test_rate_limit_not_retried():
+    def attempt(timeout):
+        raise RateLimited("429")
+
+    with pytest.raises(RateLimited):
+        call_with_retry("gpt", attempt)
+    assert retry_policy.retry_budget.retries == 0
+
+
+def test_attempt_latency_excludes_backoff(monkeypatch):
+    monkeypatch.setattr(retry_policy, "backoff_delay", lambda retry: 0.2)
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            raise ConnectionError
+        return "ok"
+
+    retry_policy.take_attempt_latency()
+    assert call_with_retry("gpt", attempt) == "ok"
+    assert retry_policy.take_attempt_latency() < 0.1
+    assert retry_policy.take_attempt_latency() is None
+
+
+def test_history_round_trip(tmp_path):
+    for value in (1.0, 2.0):
+        retry_policy.histogram("glm#0").record(value)
+    path = str(tmp_path / "latency.json")
+    retry_policy.save_history(path)
+    retry_policy._histograms.clear()
+    assert retry_policy.load_history(path)
+    assert retry_policy.histogram("glm#0").samples() == [1.0, 2.0]
+    assert not retry_policy.load_history(str(tmp_path / "missing.json"))
@@ -0,0 +1,129 @@
+"""限时运行：截止时间解析、准入控制，以及模型调用在拿到并发名额后才申请准入"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import backends
+import chat2gpt4o
+import retry_policy
+import run_deadline
+from adaptive_limit import AIMDLimiter
+from run_deadline import Deferred, RunDeadline, parse_deadline
+
+NOW = datetime(2024, 5, 1, 22, 15, 30)
+
+
+def test_empty_means_no_deadline():
+    assert parse_deadline("  ", NOW) is None
+
+
+def test_clock_time_later_today():
+    assert parse_deadline("23:30", NOW) == datetime(2024, 5, 1, 23, 30).timestamp()
+
+
+def test_clock_time_passed_means_tomorrow():
+    assert parse_deadline("06:30", NOW) == datetime(2024, 5, 2, 6, 30).timestamp()
+    assert parse_deadline("22:15", NOW) == datetime(2024, 5, 2, 22, 15).timestamp()
+
+
+def test_full_width_colon():
+    assert parse_deadline("23：30", NOW) == datetime(2024, 5, 1, 23, 30).timestamp()
+
+
+def test_minutes_from_now():
+    assert parse_deadline("90", NOW) == (NOW + timedelta(minutes=90)).timestamp()
+    assert parse_deadline("1.5", NOW) == (NOW + timedelta(minutes=1.5)).timestamp()
+
+
+@pytest.mark.parametrize("text", ["24:00", "12:60", "明早", "0", "-5"])
+def test_invalid_deadline(text):
+    with pytest.raises(ValueError):
+        parse_deadline(text, NOW)
+
+
+def test_call_limit():
+    deadline = RunDeadline(max_calls=2)
+    assert deadline.admit("gpt") and deadline.admit("gpt")
+    assert not deadline.admit("gpt")
+    assert not deadline.admit("gpt")
+    assert (deadline.calls, deadline.deferred) == (2, 2)
+    assert deadline.reason
+
+
+def test_total_timeout_covers_every_attempt(monkeypatch):
+    monkeypatch.setattr(retry_policy, "request_timeout", lambda provider, chars=0: 10.0)
+    # 10 + 20 + 40 秒的三次尝试，加上两次重试前最长 1 + 2 秒的退避
+    assert retry_policy.total_timeout("gpt") == pytest.approx(73.0)
+    monkeypatch.setattr(retry_policy, "request_timeout", lambda provider, chars=0: 40.0)
+    assert retry_policy.total_timeout("gpt") == pytest.approx(40.0 + 2 * retry_policy.MAX_TIMEOUT + 3.0)
+
+
+def test_deadline_leaves_room_to_finish(monkeypatch):
+    monkeypatch.setattr(retry_policy, "request_timeout", lambda provider, chars=0: 10.0)
+    monkeypatch.setattr(run_deadline.time, "time", lambda: 1000.0)
+    drain = 73.0 + run_deadline.DRAIN_MARGIN
+    assert RunDeadline(deadline=1000.0 + drain + 1).admit("gpt")
+    late = RunDeadline(deadline=1000.0 + drain)
+    assert not late.admit("gpt")
+    assert late.reason == "接近截止时间"
+
+
+def test_no_limits():
+    deadline = RunDeadline()
+    assert not deadline.enabled
+    assert deadline.remaining() is None
+    assert deadline.capacity("gpt") is None
+    assert deadline.admit("gpt")
+
+
+def test_capacity_reserves_retry_schedule(monkeypatch):
+    monkeypatch.setattr(retry_policy, "total_timeout", lambda provider, chars=0: 60.0)
+    monkeypatch.setattr(run_deadline.run_plan, "seconds_per_request", lambda provider, latency: 2.0)
+    monkeypatch.setattr(run_deadline.time, "time", lambda: 1000.0)
+    deadline = RunDeadline(deadline=1000.0 + 60.0 + run_deadline.DRAIN_MARGIN + 20.0, max_calls=100)
+    assert deadline.capacity("gpt") == 10
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """只有一个并发名额的测试后端"""
+    monkeypatch.setattr(backends, "_registry", dict(backends._registry))
+    backend = backends.Backend("deadline-test", "http://127.0.0.1:9/v1", "m", max_concurrency=1)
+    backend.slots = AIMDLimiter(maximum=1)
+    backends.register_backend(backend)
+    return backend
+
+
+class RecordingDeadline(RunDeadline):
+    """记录申请准入时后端已占用的并发名额"""
+
+    def __init__(self, slots, **kwargs):
+        super().__init__(**kwargs)
+        self.slots = slots
+        self.in_flight = []
+
+    def admit(self, provider, request_chars=0):
+        self.in_flight.append(self.slots.in_flight)
+        return super().admit(provider, request_chars)
+
+
+def test_call_model_admits_after_acquiring_slot(backend, monkeypatch):
+    monkeypatch.setattr(chat2gpt4o, "openai_compatible", lambda message, pormet, **kwargs: "战斗扩展")
+    deadline = RecordingDeadline(backend.slots, max_calls=1)
+    assert chat2gpt4o.call_model("deadline-test", "m", "p", deadline=deadline) == "战斗扩展"
+    assert deadline.in_flight == [1]
+    assert deadline.calls == 1
+
+
+def test_call_model_deferred_releases_slot(backend, monkeypatch):
+    calls = []
+    monkeypatch.setattr(chat2gpt4o, "openai_compatible", lambda message, pormet, **kwargs: calls.append(message))
+    deadline = RunDeadline(max_calls=1)
+    deadline.calls = 1
+    with pytest.raises(Deferred):
+        chat2gpt4o.call_model("deadline-test", "m", "p", deadline=deadline)
+    assert calls == []
+    assert backend.slots.in_flight == 0
+    assert backend.slots.current == 1
+    assert deadline.deferred == 1
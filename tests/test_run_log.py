@@ -0,0 +1,103 @@
+"""运行日志：JSON 行格式、后台写文件、轮转和界面抽样"""
+
+import json
+import logging
+import os
+
+import pytest
+
+import run_log
+from run_log import UiFeed
+
+
+@pytest.fixture
+def log_file(tmp_path, monkeypatch):
+    """在临时目录启动日志线程，测试结束时停止"""
+    monkeypatch.setattr(run_log, "feed", UiFeed())
+    path = str(tmp_path / "logs" / "run.log")
+    yield path
+    run_log.shutdown()
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def make_record(message, channel="translate", level=logging.INFO, **extra):
+    record = logging.makeLogRecord({
+        "name": f"{run_log.ROOT_LOGGER}.{channel}", "levelno": level,
+        "levelname": logging.getLevelName(level), "msg": message,
+    })
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_fields_and_extra():
+    entry = json.loads(run_log.JsonFormatter().format(make_record("你好", "api", mod_id="m1")))
+    assert entry["channel"] == "api"
+    assert entry["level"] == "INFO"
+    assert entry["message"] == "你好"
+    assert entry["mod_id"] == "m1"
+
+
+def test_setup_writes_json_lines(log_file):
+    run_log.setup(log_file)
+    assert run_log.setup(log_file) is run_log._listener
+    run_log.get_logger("api").info("请求完成", extra={"provider": "glm"})
+    run_log.flush()
+    run_log.shutdown()
+    entries = read_lines(log_file)
+    assert entries[-1]["message"] == "请求完成"
+    assert entries[-1]["provider"] == "glm"
+
+
+def test_log_file_rotates(log_file, monkeypatch):
+    monkeypatch.setattr(run_log, "MAX_BYTES", 500)
+    run_log.setup(log_file)
+    logger = run_log.get_logger("api")
+    for index in range(50):
+        logger.info("第 %d 条日志", index)
+    run_log.shutdown()
+    assert os.path.exists(log_file + ".1")
+    assert os.path.getsize(log_file) <= 500
+
+
+def test_channel_marks_warnings(log_file):
+    run_log.setup(log_file)
+    channel = run_log.Channel("rename")
+    channel("✅ 完成")
+    channel("❌ 失败")
+    run_log.flush()
+    run_log.shutdown()
+    levels = [(entry["level"], entry["message"]) for entry in read_lines(log_file)]
+    assert levels[-2:] == [("INFO", "✅ 完成"), ("WARNING", "❌ 失败")]
+
+
+def test_feed_routes_by_channel():
+    feed = UiFeed()
+    feed.emit(make_record("翻译", "translate"))
+    feed.emit(make_record("重命名", "rename"))
+    feed.emit(make_record("其他", "api"))
+    assert feed.drain("translate") == ["翻译"]
+    assert feed.drain("rename") == ["重命名"]
+    assert feed.drain("translate") == []
+
+
+def test_feed_keeps_warnings_when_sampling():
+    feed = UiFeed()
+    feed.emit(make_record("❌ 早期错误", level=logging.WARNING))
+    for index in range(20):
+        feed.emit(make_record(f"第 {index} 条"))
+    lines = feed.drain("translate", limit=5)
+    assert lines[0].startswith("… 省略 16 条日志")
+    assert lines[1:] == ["❌ 早期错误", "第 16 条", "第 17 条", "第 18 条", "第 19 条"]
+
+
+def test_feed_counts_overflow():
+    feed = UiFeed(buffer=3)
+    for index in range(5):
+        feed.emit(make_record(f"第 {index} 条"))
+    lines = feed.drain("translate")
+    assert lines[0].startswith("… 省略 2 条日志")
+    assert lines[1:] == ["第 2 条", "第 3 条", "第 4 条"]
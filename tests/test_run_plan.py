@@ -0,0 +1,116 @@
+"""运行计划：分类、去重和耗时预估"""
+
+import pytest
+
+import backends
+import retry_policy
+import run_plan
+import usage_tracker
+from mod_scanner import ModRecord
+
+
+def record(name, description="A mod.", has_backup=False):
+    return ModRecord(f"/mods/{name}", name.lower(), name, description, "", ("1.5",), has_backup, ())
+
+
+def message_of(item):
+    return f"{item.name}\n{item.description}"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """注册一个测试后端，并使用固定的价格表和空的延迟记录"""
+    monkeypatch.setattr(backends, "_registry", dict(backends._registry))
+    monkeypatch.setattr(retry_policy, "_histograms", retry_policy.defaultdict(retry_policy.LatencyHistogram))
+    monkeypatch.setitem(usage_tracker.PRICE_TABLE, "plan-test",
+                        {"input": 1.0, "output": 2.0, "cached": 0.5, "rpm": 120})
+    backend = backends.Backend("plan-test", "http://127.0.0.1:9/v1", "m",
+                               max_concurrency=4, request_interval=1.0)
+    backends.register_backend(backend)
+    return backend
+
+
+def test_classify_categories():
+    skipped = record("Backed Up", has_backup=True)
+    cached = record("Cached")
+    first = record("Twin")
+    twin = record("Twin")
+    fresh = record("Fresh")
+    plan = run_plan.classify(
+        [skipped, cached, first, twin, fresh],
+        needs_translation=lambda item: not item.has_backup,
+        message_of=message_of,
+        cached_of=lambda item: "缓存译名" if item.name == "Cached" else None,
+    )
+    assert plan[run_plan.SKIP] == [skipped]
+    assert plan[run_plan.CACHED] == [cached]
+    assert plan[run_plan.API] == [first, fresh]
+    assert plan[run_plan.DEDUP] == [twin]
+
+
+def test_classify_without_cache_lookup():
+    items = [record("A"), record("B")]
+    plan = run_plan.classify(items, lambda item: True, message_of)
+    assert plan[run_plan.API] == items
+    assert not plan[run_plan.CACHED]
+
+
+def test_split_duplicates_keeps_first():
+    first, second = record("Same"), record("Same")
+    unique, duplicates = run_plan.split_duplicates([first, second], message_of)
+    assert unique == [first]
+    assert duplicates == [(second, message_of(second))]
+
+
+def test_seconds_per_request_limited_by_concurrency(backend):
+    # (3 + 1) / 4 = 1.0 秒，高于 60 / 120 = 0.5 秒
+    assert run_plan.seconds_per_request("plan-test", 3.0) == pytest.approx(1.0)
+
+
+def test_seconds_per_request_limited_by_rpm(backend, monkeypatch):
+    monkeypatch.setitem(usage_tracker.PRICE_TABLE, "plan-test", {"input": 1.0, "output": 2.0, "rpm": 6})
+    assert run_plan.seconds_per_request("plan-test", 3.0) == pytest.approx(10.0)
+
+
+def test_seconds_per_request_unknown_backend():
+    # 未注册的后端按单并发、无间隔计算，rpm 默认 60
+    assert run_plan.seconds_per_request("no-such-backend", 3.0) == pytest.approx(3.0)
+
+
+def test_project_uses_default_latency_without_history(backend):
+    estimates = run_plan.project(["m1", "m2"], "prefix", ["plan-test"])
+    entry = estimates[0]
+    assert entry["latency"] == run_plan.DEFAULT_LATENCY
+    assert entry["measured"] is False
+    assert entry["minutes"] == pytest.approx(2 * (run_plan.DEFAULT_LATENCY + 1.0) / 4 / 60)
+
+
+def test_project_uses_recorded_latency(backend):
+    chars = len("prefix") + len("m1")
+    stats = retry_policy.histogram(f"plan-test#{retry_policy.size_class(chars)}")
+    for _ in range(retry_policy.MIN_SAMPLES):
+        stats.record(7.0)
+    entry = run_plan.project(["m1"], "prefix", ["plan-test"])[0]
+    assert entry["measured"] is True
+    assert entry["latency"] == pytest.approx(7.0)
+
+
+def test_project_languages_add_output_tokens(backend):
+    one = run_plan.project(["m1"], "prefix", ["plan-test"])[0]
+    three = run_plan.project(["m1"], "prefix", ["plan-test"], languages=3)[0]
+    assert three["completion_tokens"] == 3 * one["completion_tokens"]
+    assert three["requests"] == one["requests"]
+
+
+def test_format_plan_marks_selected_provider(backend):
+    plan = run_plan.classify([record("A"), record("B", has_backup=True)],
+                             lambda item: not item.has_backup, message_of)
+    lines = run_plan.format_plan(plan, run_plan.project(["m1"], "prefix", ["plan-test"]), "plan-test")
+    assert lines[0].endswith("共 2 个模组")
+    assert any(line.startswith("👉 plan-test") for line in lines)
+
+
+def test_format_plan_without_api_calls():
+    plan = run_plan.classify([record("A", has_backup=True)], lambda item: not item.has_backup, message_of)
+    lines = run_plan.format_plan(plan, [])
+    assert lines[-1].strip() == "无需调用模型"
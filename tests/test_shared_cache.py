@@ -0,0 +1,144 @@
+"""共享缓存：批量预取、增量同步、缓冲回传、ETag 和共享令牌"""
+
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import shared_cache
+from mod_scanner import ModRecord
+from shared_cache import CacheStore, HttpCacheService, InMemoryCacheService, SharedCacheClient, cache_key, cache_value
+
+
+def value(name):
+    return cache_value(name, "glm")
+
+
+class CountingService(InMemoryCacheService):
+    """记录 lookup 调用的本地服务"""
+
+    def __init__(self, store=None):
+        super().__init__(store)
+        self.lookups = []
+
+    def lookup(self, keys):
+        self.lookups.append(list(keys))
+        return super().lookup(keys)
+
+
+@pytest.fixture
+def store():
+    return CacheStore()
+
+
+def test_cache_key_changes_with_description():
+    record = ModRecord("f", "ceteam.ce", "Combat Extended", "Guns.", "", (), False, ())
+    assert cache_key(record).startswith("ceteam.ce:")
+    assert cache_key(record) != cache_key(record._replace(description="More guns."))
+
+
+def test_prefetch_and_get(store):
+    store.publish({"a": value("甲"), "b": value("乙")})
+    client = SharedCacheClient(service=InMemoryCacheService(store))
+    assert client.prefetch(["a", "b", "c", "a"]) == 2
+    assert client.get("a")["name"] == "甲"
+    assert client.get("c") is None
+    assert (client.hits, client.misses) == (1, 1)
+    assert client.peek("b")["name"] == "乙" and client.hits == 1
+
+
+def test_second_prefetch_syncs_instead_of_looking_up(store):
+    service = CountingService(store)
+    client = SharedCacheClient(service=service)
+    store.publish({"a": value("甲")})
+    client.prefetch(["a"])
+    assert service.lookups == [["a"]]
+
+    # 其他人发布的条目通过增量同步进入 LRU，之后的 prefetch 不再逐个查询
+    store.publish({"b": value("乙")})
+    assert client.prefetch(["a", "b"]) == 2
+    assert service.lookups == [["a"]]
+    assert client.get("b")["name"] == "乙"
+
+
+def test_sync_returns_only_new_entries(store):
+    client = SharedCacheClient(service=InMemoryCacheService(store))
+    client.prefetch([])
+    assert client.sync() == 0
+    store.publish({"a": value("甲")})
+    store.publish({"b": value("乙")})
+    assert client.sync() == 2
+    assert client.sync() == 0
+
+
+def test_changes_not_modified_for_current_etag(store):
+    service = InMemoryCacheService(store)
+    store.publish({"a": value("甲")})
+    version, entries = service.changes(0)
+    assert set(entries) == {"a"}
+    assert service.changes(version, str(version)) is None
+    store.publish({"b": value("乙")})
+    assert service.changes(version, str(version)) == (version + 1, {"b": value("乙")})
+
+
+def test_put_buffers_until_flush(store, monkeypatch):
+    client = SharedCacheClient(service=InMemoryCacheService(store))
+    client.put("a", value("甲"))
+    assert store.lookup(["a"]) == {}
+    assert client.get("a")["name"] == "甲"
+    client.flush()
+    assert store.lookup(["a"])["a"]["name"] == "甲"
+
+    monkeypatch.setattr(shared_cache, "BATCH_SIZE", 2)
+    client.put("b", value("乙"))
+    client.put("c", value("丙"))
+    assert set(store.lookup(["b", "c"])) == {"b", "c"}
+
+
+def test_lru_evicts_oldest(store):
+    client = SharedCacheClient(service=InMemoryCacheService(store), lru_size=2)
+    for key in "abc":
+        client.put(key, value(key))
+    assert client.peek("a") is None and client.peek("c") is not None
+
+
+def test_unavailable_service_does_not_raise():
+    class Down:
+        def __getattr__(self, name):
+            def fail(*args, **kwargs):
+                raise ConnectionError
+            return fail
+
+    client = SharedCacheClient(service=Down())
+    assert client.prefetch(["a"]) == 0
+    client.put("a", value("甲"))
+    client.flush()
+    assert client.errors == 3
+
+
+@pytest.fixture
+def server(store):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), shared_cache.make_handler(store, token="secret"))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_http_requires_token(server, store):
+    pytest.importorskip("requests")
+    intruder = HttpCacheService(server, token="")
+    with pytest.raises(Exception):
+        intruder.publish({"a": value("坏名字")})
+    with pytest.raises(Exception):
+        intruder.lookup(["a"])
+    assert store.lookup(["a"]) == {}
+
+    member = HttpCacheService(server, token="secret")
+    member.publish({"a": value("甲")})
+    assert member.lookup(["a"])["a"]["name"] == "甲"
+    version, entries = member.changes(0)
+    assert set(entries) == {"a"}
+    assert member.changes(version, str(version)) is None
+    assert member.current_version() == version
@@ -0,0 +1,117 @@
+"""翻译包：导出（含集中备份库）、批量应用、已更新模组和写入失败"""
+
+import gzip
+import json
+import os
+
+import pytest
+
+import mod_scanner
+from backup_store import BackupStore
+from conftest import write_about
+from translation_pack import apply_pack, export_pack, load_pack, read_translation
+
+
+def quiet(message):
+    pass
+
+
+def translate(folder, name, store=None):
+    mod_scanner.write_translated_name(folder, name, store)
+
+
+@pytest.fixture
+def source(make_mod):
+    folders = {
+        "ce": make_mod("ce", "Combat Extended", package_id="ceteam.ce"),
+        "hud": make_mod("hud", "RimHUD", package_id="jaxe.rimhud"),
+        "new": make_mod("new", "Untranslated"),
+    }
+    translate(folders["ce"], "战斗扩展")
+    translate(folders["hud"], "信息面板")
+    return folders
+
+
+def copy_mods(tmp_path, target):
+    """另一台电脑上的同一批模组（尚未翻译，其中 hud 在导出后已更新）"""
+    directory = str(tmp_path / target)
+    return {
+        "ce": write_about(os.path.join(directory, "ce"), "Combat Extended", package_id="ceteam.ce"),
+        "hud": write_about(os.path.join(directory, "hud"), "RimHUD", package_id="jaxe.rimhud",
+                           description="Updated."),
+    }, directory
+
+
+def test_read_translation(source):
+    entry = read_translation(source["ce"])
+    assert (entry["p"], entry["o"], entry["t"]) == ("ceteam.ce", "Combat Extended", "战斗扩展")
+    assert entry["h"] == mod_scanner.content_hash("Combat Extended", "A mod.")
+    assert read_translation(source["new"]) is None
+
+
+def test_export_and_load(source, tmp_path):
+    pack = str(tmp_path / "pack.jsonl.gz")
+    assert export_pack(os.path.dirname(source["ce"]), pack, log=quiet) == 2
+    entries = load_pack(pack)
+    assert {key: entry["t"] for key, entry in entries.items()} == {"ceteam.ce": "战斗扩展", "jaxe.rimhud": "信息面板"}
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = str(tmp_path / "other.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"format": "other"}) + "\n")
+    with pytest.raises(ValueError):
+        load_pack(path)
+
+
+def test_apply_reports_drifted_and_applies(source, tmp_path):
+    pack = str(tmp_path / "pack.jsonl.gz")
+    export_pack(os.path.dirname(source["ce"]), pack, log=quiet)
+    target, directory = copy_mods(tmp_path, "other")
+
+    stats = apply_pack(directory, pack, log=quiet)
+    assert stats["applied"] == 1
+    assert stats["drifted"] == ["hud"]
+    assert mod_scanner.extract_about(target["ce"]).name == "战斗扩展"
+    assert os.path.exists(os.path.join(target["ce"], "About", "About_old.xml"))
+
+    stats = apply_pack(directory, pack, force=True, log=quiet)
+    assert (stats["applied"], stats["already"]) == (1, 1)
+    assert mod_scanner.extract_about(target["hud"]).name == "信息面板"
+
+
+def test_export_and_apply_with_central_store(make_mod, tmp_path):
+    store = BackupStore(str(tmp_path / "store"))
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    translate(folder, "战斗扩展", store)
+    assert not os.path.exists(os.path.join(folder, "About", "About_old.xml"))
+    assert read_translation(folder) is None
+    assert read_translation(folder, store)["o"] == "Combat Extended"
+
+    pack = str(tmp_path / "pack.jsonl.gz")
+    assert export_pack(os.path.dirname(folder), pack, log=quiet, store=store) == 1
+
+    target_store = BackupStore(str(tmp_path / "target_store"))
+    target, directory = copy_mods(tmp_path, "other")
+    apply_pack(directory, pack, log=quiet, store=target_store)
+    assert target_store.lookup(target["ce"])["t"] == "战斗扩展"
+    assert os.path.exists(target_store.index_path)
+
+
+def test_apply_failure_reported_per_mod(source, tmp_path, monkeypatch):
+    pack = str(tmp_path / "pack.jsonl.gz")
+    export_pack(os.path.dirname(source["ce"]), pack, log=quiet)
+    target, directory = copy_mods(tmp_path, "other")
+    write = mod_scanner.write_translated_name
+
+    def failing_write(folder, translated, store=None):
+        if os.path.basename(folder) == "ce":
+            raise OSError("磁盘已满")
+        write(folder, translated, store)
+
+    monkeypatch.setattr(mod_scanner, "write_translated_name", failing_write)
+    messages = []
+    stats = apply_pack(directory, pack, force=True, log=messages.append)
+    assert stats["failed"] == [("ce", "磁盘已满")]
+    assert stats["applied"] == 1
+    assert any("磁盘已满" in message for message in messages)
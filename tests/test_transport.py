@@ -0,0 +1,133 @@
+"""录制/回放传输层：轨迹格式、严格与非严格回放、错误回放和轨迹统计"""
+
+import pytest
+
+import transport
+from key_pool import RateLimited
+from transport import Player, ReplayMiss
+
+REQUEST = {"model": "m", "messages": [{"role": "user", "content": "Combat Extended"}]}
+
+
+@pytest.fixture(autouse=True)
+def live_mode(monkeypatch):
+    """每个测试从 live 模式开始，结束时关闭录制文件"""
+    monkeypatch.setattr(transport, "MODE", transport.LIVE)
+    monkeypatch.setattr(transport, "_recorder", None)
+    monkeypatch.setattr(transport, "_player", None)
+    yield
+    if transport._recorder is not None:
+        transport._recorder.close()
+
+
+def record(path, replies):
+    """按顺序录制若干次请求，replies 中的异常作为失败录制"""
+    transport.configure(transport.RECORD, path)
+    for reply in replies:
+        def send(timeout):
+            if isinstance(reply, Exception):
+                raise reply
+            return reply, {"prompt_tokens": 10, "completion_tokens": 5}
+        try:
+            transport.exchange("glm", REQUEST, 5.0, send)
+        except Exception:
+            pass
+    transport.configure(transport.LIVE, path)
+
+
+def test_live_mode_sends_directly():
+    assert transport.exchange("glm", REQUEST, 5.0, lambda timeout: ("战斗扩展", None)) == ("战斗扩展", None)
+    assert transport.summary() == ""
+
+
+def test_request_key_ignores_order_and_depends_on_provider():
+    reordered = {"messages": REQUEST["messages"], "model": "m"}
+    assert transport.request_key("glm", REQUEST) == transport.request_key("glm", reordered)
+    assert transport.request_key("glm", REQUEST) != transport.request_key("qwen", REQUEST)
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, ["战斗扩展"])
+    entry = transport.load_trace(path)[0]
+    assert entry["p"] == "glm"
+    assert entry["c"] == len("Combat Extended")
+    assert entry["r"] == "战斗扩展"
+
+    transport.configure(transport.REPLAY, path, time_scale=0)
+    assert transport.offline()
+    reply = transport.exchange("glm", REQUEST, 5.0, lambda timeout: pytest.fail("回放时不应发送请求"))
+    assert reply == ("战斗扩展", {"prompt_tokens": 10, "completion_tokens": 5})
+    assert transport.summary() == "📼 回放命中 1 个请求，未录制 0 个"
+
+
+def test_gzip_trace(tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    record(path, ["战斗扩展"])
+    assert transport.load_trace(path)[0]["r"] == "战斗扩展"
+
+
+def test_recorded_error_is_replayed(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, [RateLimited("429")])
+    assert transport.load_trace(path)[0]["e"] == "RateLimited:429"
+    transport.configure(transport.REPLAY, path, time_scale=0)
+    with pytest.raises(RateLimited):
+        transport.exchange("glm", REQUEST, 5.0, lambda timeout: ("", None))
+
+
+def test_repeated_request_replays_in_order(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, ["第一次", "第二次"])
+    player = Player(path, time_scale=0)
+    key = transport.request_key("glm", REQUEST)
+    assert [player.lookup("glm", key)["r"] for _ in range(3)] == ["第一次", "第二次", "第二次"]
+
+
+def test_strict_replay_miss(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, ["战斗扩展"])
+    player = Player(path, time_scale=0)
+    with pytest.raises(ReplayMiss):
+        player.lookup("glm", "unknown")
+    assert player.misses == 1
+
+
+def test_non_strict_replay_borrows(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record(path, ["战斗扩展"])
+    transport.configure(transport.REPLAY, path, time_scale=0, strict=False)
+    assert transport.borrowing()
+    other = {"model": "m", "messages": [{"role": "user", "content": "Other"}]}
+    assert transport.exchange("glm", other, 5.0, lambda timeout: ("", None))[0] == "战斗扩展"
+    with pytest.raises(ReplayMiss):
+        transport.exchange("qwen", other, 5.0, lambda timeout: ("", None))
+
+
+def test_replay_delay_over_timeout_fails(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text('{"p":"glm","k":"a","c":1,"l":2.0,"r":"x"}\n', encoding="utf-8")
+    player = Player(str(path), time_scale=1.0)
+    with pytest.raises(TimeoutError):
+        player.play(player.lookup("glm", "a"), timeout=0.01)
+
+
+def test_trace_stats_skips_partial_lines(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text(
+        '{"p":"glm","k":"a","c":10,"l":1.0,"r":"x"}\n'
+        '{"p":"glm","k":"b","c":20,"l":3.0,"r":"y"}\n'
+        '{"p":"glm","k":"c","c":30,"l":9.0,"e":"TimeoutError:"}\n'
+        '{"p":"glm","k":"d"',
+        encoding="utf-8",
+    )
+    stats = transport.trace_stats(str(path))["glm"]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 1
+    assert stats["chars"] == 20
+    assert stats["p99"] <= 3.0
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        transport.configure("offline")
@@ -0,0 +1,69 @@
+"""用量统计：token 估算、费用、按模型/模组汇总和预算控制"""
+
+import pytest
+
+import usage_tracker
+from usage_tracker import BudgetExceeded, TokenBudget, UsageTracker, calc_cost, estimate_run, estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("战斗扩展") == 4
+    assert estimate_tokens("Combat") == 2
+    assert estimate_tokens("战斗 CE") == 3
+
+
+def test_cost_uses_cached_price():
+    price = usage_tracker.PRICE_TABLE["deepseek"]
+    full = calc_cost("deepseek", 1_000_000, 0)
+    cached = calc_cost("deepseek", 1_000_000, 0, cached_tokens=1_000_000)
+    assert full == pytest.approx(price["input"])
+    assert cached == pytest.approx(price["cached"])
+    assert calc_cost("unknown", 1000, 1000) == 0.0
+
+
+def test_record_aggregates_by_provider_and_mod():
+    tracker = UsageTracker()
+    tracker.record("glm", 100, 20, mod_id="a", cached_tokens=50)
+    tracker.record("glm", 100, 20, mod_id="b")
+    tracker.record("qwen", 10, 5)
+    assert tracker.requests == 3
+    assert tracker.total_tokens == 255
+    assert tracker.by_provider["glm"]["requests"] == 2
+    assert set(tracker.by_mod) == {"a", "b"}
+    assert tracker.cache_hit_requests == 1
+    assert tracker.cache_hit_rate == pytest.approx(50 / 210)
+    tracker.reset()
+    assert tracker.requests == 0 and tracker.by_mod == {}
+
+
+def test_budget_throttles_then_stops(monkeypatch):
+    delays = []
+    monkeypatch.setattr(usage_tracker.time, "sleep", delays.append)
+    tracker = UsageTracker()
+    tracker.set_budget(max_tokens=1000)
+    tracker.record("glm", 500, 0)
+    tracker.check_budget()
+    assert delays == []
+    tracker.record("glm", 400, 0)
+    tracker.check_budget()
+    assert delays and 0 < delays[0] < tracker.budget.max_delay
+    tracker.record("glm", 100, 0)
+    with pytest.raises(BudgetExceeded):
+        tracker.check_budget()
+
+
+def test_budget_ratio_uses_higher_of_tokens_and_cost():
+    budget = TokenBudget(max_tokens=100, max_cost=1.0)
+    assert budget.used_ratio(10, 0.5) == 0.5
+    assert budget.throttle_delay(0.5) == 0.0
+    assert budget.throttle_delay(1.0) == budget.max_delay
+    assert not TokenBudget().enabled
+
+
+def test_estimate_run_sorted_by_cost():
+    estimates = estimate_run(["Combat Extended"] * 10, "提示词")
+    costs = [entry["cost"] for entry in estimates]
+    assert costs == sorted(costs)
+    assert usage_tracker.cheapest_provider(estimates) == estimates[0]["provider"]
+    assert usage_tracker.cheapest_provider(estimates, max_minutes=1e-9) is None
@@ -0,0 +1,82 @@
+"""监视模式：译名记录、事件路径归类、变化分类和轮询监视"""
+
+import os
+import threading
+
+import pytest
+
+import mod_scanner
+import watch_mode
+from conftest import write_about
+from watch_mode import ModWatcher, NameMemory, classify_changes
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return NameMemory(str(tmp_path / "memory.json"))
+
+
+def test_memory_round_trip(make_mod, memory):
+    folder = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(folder, "战斗扩展")
+    assert memory.update_from([folder, make_mod("new", "New")]) == 1
+    memory.save()
+    loaded = NameMemory(memory.path)
+    assert loaded.get("ceteam.ce")["t"] == "战斗扩展"
+
+
+def test_corrupt_memory_file_ignored(tmp_path):
+    path = tmp_path / "memory.json"
+    path.write_text("{", encoding="utf-8")
+    assert NameMemory(str(path)).entries == {}
+
+
+def test_mod_of(tmp_path):
+    watcher = ModWatcher(str(tmp_path), on_changes=lambda folders: None)
+    mod = str(tmp_path / "ce")
+    assert watcher._mod_of(mod) == mod
+    assert watcher._mod_of(os.path.join(mod, "About", "About.xml")) == mod
+    assert watcher._mod_of(os.path.join(mod, "Textures", "a.png")) is None
+    assert watcher._mod_of(str(tmp_path.parent / "other")) is None
+
+
+def test_classify_changes(make_mod, memory):
+    steam_restored = make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    mod_scanner.write_translated_name(steam_restored, "战斗扩展")
+    memory.update_from([steam_restored])
+    # Steam 用原文覆盖了 About.xml（内容未变）
+    make_mod("ce", "Combat Extended", package_id="ceteam.ce")
+    updated = make_mod("hud", "RimHUD", package_id="jaxe.rimhud")
+    memory.entries["jaxe.rimhud"] = {"h": "old", "t": "信息面板"}
+    translated = make_mod("zh", "已翻译")
+    broken = make_mod("bad", None)
+
+    reapply, translate = classify_changes([steam_restored, updated, translated, broken], memory)
+    assert reapply == [(steam_restored, "战斗扩展")]
+    assert translate == [updated, broken]
+
+
+def test_polling_watcher_reports_new_mod(tmp_path, monkeypatch):
+    monkeypatch.setattr(watch_mode, "HAS_WATCHDOG", False)
+    changes = []
+    changed = threading.Event()
+
+    def on_changes(folders):
+        changes.append(folders)
+        changed.set()
+
+    watcher = ModWatcher(str(tmp_path), on_changes, debounce=0.05, poll_interval=0.05, log=lambda message: None)
+    thread = threading.Thread(target=watcher.run, daemon=True)
+    thread.start()
+    try:
+        # 轮询线程的第一次快照可能晚于写入，每次写入不同的内容直到被发现
+        for attempt in range(50):
+            write_about(str(tmp_path / "new"), "New Mod", description="x" * attempt)
+            if changed.wait(0.2):
+                break
+        assert changed.is_set()
+    finally:
+        watcher.stop()
+        thread.join(5)
+    assert changes[0] == [str(tmp_path / "new")]
+    assert not thread.is_alive()
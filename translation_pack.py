@@ -0,0 +1,211 @@
+"""
+翻译包导出/导入
+功能：把已翻译模组的译名导出为带版本号的压缩 JSON Lines 翻译包
+（packageId → 原文哈希 → 译名），在另一台电脑上不调用任何 API 即可并行批量应用，
+并报告导出后已经更新（原文哈希不一致）的模组
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import mod_scanner
+from backup_store import BackupStore
+from mod_scanner import ModRecord, contains_chinese, content_hash
+
+
+PACK_FORMAT = "rimworld-mod-translator-pack"
+PACK_VERSION = 1
+
+# 写文件的线程数
+APPLY_WORKERS = 16
+
+
+def _list_mod_folders(directory: str) -> List[str]:
+    return [
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name))
+    ]
+
+
+def read_translation(folder: str, store=None) -> Optional[dict]:
+    """
+    读取一个已翻译模组的原名和译名；About.xml 与 About_old.xml 哪个是中文都可以
+    Args:
+        store: 集中备份库（backup_store.BackupStore），模组内没有 About_old.xml 时从中读取原文
+    """
+    about_path = os.path.join(folder, 'About', 'About.xml')
+    backup_path = os.path.join(folder, 'About', 'About_old.xml')
+    if not os.path.exists(about_path):
+        return None
+    if not os.path.exists(backup_path):
+        return _read_from_store(folder, store) if store is not None else None
+    try:
+        about = ET.parse(about_path).getroot()
+        backup = ET.parse(backup_path).getroot()
+    except ET.ParseError:
+        return None
+
+    about_name = about.findtext('name') or ''
+    backup_name = backup.findtext('name') or ''
+    if contains_chinese(about_name) and not contains_chinese(backup_name):
+        original, translated = backup, about_name
+    elif contains_chinese(backup_name) and not contains_chinese(about_name):
+        original, translated = about, backup_name  # 已被还原为英文
+    else:
+        return None
+    return _pack_entry(folder, original, translated)
+
+
+def _read_from_store(folder: str, store) -> Optional[dict]:
+    """从集中备份库的索引和原文件读取"""
+    entry = store.lookup(folder)
+    if entry is None:
+        return None
+    try:
+        original = ET.fromstring(store.get(entry["o"]))
+    except (OSError, ET.ParseError):
+        return None
+    return _pack_entry(folder, original, entry["t"])
+
+
+def _pack_entry(folder: str, original: ET.Element, translated: str) -> dict:
+    name = original.findtext('name') or '未找到名称'
+    description = original.findtext('description') or '未找到描述'
+    return {
+        "p": (original.findtext('packageId') or '').strip().lower(),
+        "f": os.path.basename(folder),
+        "h": content_hash(name, description),
+        "o": name,
+        "t": translated,
+    }
+
+
+def export_pack(directory: str, pack_path: str, log: Callable[[str], None] = print, store=None) -> int:
+    """导出翻译包，返回导出的条目数；store 为集中备份库，使用集中备份翻译的模组也会导出"""
+    start_time = time.time()
+    folders = _list_mod_folders(directory)
+    with ThreadPoolExecutor(max_workers=APPLY_WORKERS) as executor:
+        entries = [e for e in executor.map(lambda folder: read_translation(folder, store), folders) if e]
+
+    header = {"format": PACK_FORMAT, "version": PACK_VERSION,
+              "created": int(time.time()), "count": len(entries)}
+    with gzip.open(pack_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+    log(f"📦 已导出 {len(entries)} 个译名到 {pack_path}，用时 {time.time() - start_time:.2f} 秒")
+    return len(entries)
+
+
+def load_pack(pack_path: str) -> Dict[str, dict]:
+    """读取翻译包，返回 packageId（没有时为文件夹名）→ 条目"""
+    with gzip.open(pack_path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("format") != PACK_FORMAT:
+            raise ValueError("不是有效的翻译包")
+        if header.get("version", 0) > PACK_VERSION:
+            raise ValueError(f"翻译包版本 {header['version']} 过新，请升级工具")
+        entries = {}
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["p"] or entry["f"]] = entry
+    return entries
+
+
+def _apply_one(record: ModRecord, entry: dict, force: bool, store=None) -> tuple:
+    """应用单个模组，返回 (applied / drifted / failed, 错误信息)，单个模组失败不影响其他模组"""
+    if entry["h"] != content_hash(record.name, record.description):
+        if not force:
+            return "drifted", ""
+    try:
+        mod_scanner.write_translated_name(record.folder, entry["t"], store)
+    except (OSError, ET.ParseError) as e:
+        return "failed", str(e)
+    return "applied", ""
+
+
+def apply_pack(directory: str, pack_path: str, force: bool = False,
+               log: Callable[[str], None] = print, store=None) -> dict:
+    """
+    批量应用翻译包
+    Args:
+        directory: 模组所在文件夹
+        pack_path: 翻译包路径
+        force: 模组在导出后已更新时仍然应用译名
+        store: 集中备份库，为 None 时备份为模组内的 About_old.xml
+    Returns:
+        统计信息，其中 drifted 为导出后已更新的模组文件夹列表，failed 为 (文件夹, 错误) 列表
+    """
+    start_time = time.time()
+    entries = load_pack(pack_path)
+    scan_errors = []
+    records = list(mod_scanner.scan_mods(_list_mod_folders(directory), errors=scan_errors))
+    for error in scan_errors:
+        log(f"   ❌ 解析失败 [{os.path.basename(error.folder)}]: {error.error}")
+
+    stats = {"applied": 0, "already": 0, "missing": 0, "drifted": [], "failed": []}
+    jobs = []
+    for record in records:
+        if record.has_backup or contains_chinese(record.name):
+            stats["already"] += 1
+            continue
+        entry = entries.get(record.package_id) or entries.get(os.path.basename(record.folder))
+        if entry is None:
+            stats["missing"] += 1
+            continue
+        jobs.append((record, entry))
+
+    with ThreadPoolExecutor(max_workers=APPLY_WORKERS) as executor:
+        results = executor.map(lambda job: (job[0], _apply_one(job[0], job[1], force, store)), jobs)
+        for record, (status, error) in results:
+            if status == "applied":
+                stats["applied"] += 1
+            elif status == "failed":
+                stats["failed"].append((os.path.basename(record.folder), error))
+            else:
+                stats["drifted"].append(os.path.basename(record.folder))
+    if store is not None:
+        store.save()
+
+    log(
+        f"📥 已应用 {stats['applied']} 个，已翻译跳过 {stats['already']} 个，"
+        f"包中没有 {stats['missing']} 个，导出后已更新 {len(stats['drifted'])} 个，"
+        f"失败 {len(stats['failed'])} 个，用时 {time.time() - start_time:.2f} 秒"
+    )
+    for folder_name in stats["drifted"]:
+        log(f"   ⚠️ 已更新: {folder_name}")
+    for folder_name, error in stats["failed"]:
+        log(f"   ❌ 写入失败 [{folder_name}]: {error}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="翻译包导出/导入")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="导出翻译包")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("pack")
+    export_parser.add_argument("--store", default="", help="集中备份目录")
+    apply_parser = subparsers.add_parser("apply", help="批量应用翻译包")
+    apply_parser.add_argument("directory")
+    apply_parser.add_argument("pack")
+    apply_parser.add_argument("--force", action="store_true", help="模组已更新时仍然应用")
+    apply_parser.add_argument("--store", default="", help="集中备份目录")
+    args = parser.parse_args()
+
+    store = BackupStore(args.store) if args.store else None
+    if args.command == "export":
+        export_pack(args.directory, args.pack, store=store)
+    else:
+        apply_pack(args.directory, args.pack, force=args.force, store=store)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+模型请求的传输层（录制/回放）
+功能：chat2gpt4o 的每次 HTTP 请求都经过 exchange()：
+  live   直接请求（默认）
+  record 请求的同时把 请求哈希、请求长度、回答、用量、延迟和错误 追加到轨迹文件（每行一条紧凑 JSON）
+  replay 不访问网络，按请求哈希从轨迹文件返回录制的回答，并按原始延迟（可缩放）等待，
+         录制时失败的请求（限流、密钥无效、超时）回放时同样失败
+这样可以用真实运行的轨迹离线跑基准测试和回归测试，比较流程改动在真实延迟分布下的效果
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from key_pool import KeyRejected, RateLimited
+from live_stats import percentile
+
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+# 模式和轨迹文件，可用环境变量设置，也可以调用 configure()
+MODE = os.getenv("TRANSPORT_MODE", LIVE)
+TRACE_FILE = os.getenv("TRANSPORT_TRACE", "provider_trace.jsonl")
+
+# 回放时延迟的缩放系数：1 为原始时间，0.5 为加速一倍，0 为不等待
+TIME_SCALE = float(os.getenv("REPLAY_TIME_SCALE", "1"))
+
+# 回放时找不到完全相同的请求：strict（默认）按调用失败处理，抛出 ReplayMiss；
+# 设为 0 时借用同一后端录制的回答和延迟，只适合测吞吐，回答与模组无关，不会写入模组和缓存
+STRICT = os.getenv("REPLAY_STRICT", "1") != "0"
+
+# 错误类型名 → 回放时抛出的异常
+_ERRORS = {
+    "KeyRejected": KeyRejected,
+    "RateLimited": RateLimited,
+    "TimeoutError": TimeoutError,
+}
+
+
+class ReplayMiss(RuntimeError):
+    """回放模式下轨迹中没有该请求"""
+
+
+def request_key(provider: str, request: dict) -> str:
+    """请求内容（模型、消息、参数）的哈希，不包含密钥"""
+    data = json.dumps({"p": provider, **request}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:20]
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def load_trace(path: str) -> List[dict]:
+    """读取轨迹文件（跳过写了一半的行）"""
+    entries = []
+    with _open(path, 'r') as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+
+class Recorder:
+    """线程安全地追加轨迹"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = _open(path, 'a')
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class Player:
+    """按请求哈希回放录制的回答"""
+
+    def __init__(self, path: str, time_scale: float = TIME_SCALE, strict: bool = True):
+        self.time_scale = time_scale
+        self.strict = strict
+        self._by_key: Dict[str, deque] = defaultdict(deque)
+        self._by_provider: Dict[str, List[dict]] = defaultdict(list)
+        for entry in load_trace(path):
+            self._by_key[entry["k"]].append(entry)
+            self._by_provider[entry["p"]].append(entry)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, provider: str, key: str) -> dict:
+        """同一请求录制了多次时按顺序返回，最后一条重复使用"""
+        with self._lock:
+            entries = self._by_key.get(key)
+            if entries:
+                self.hits += 1
+                return entries.popleft() if len(entries) > 1 else entries[0]
+            self.misses += 1
+            candidates = self._by_provider.get(provider)
+        if self.strict or not candidates:
+            raise ReplayMiss(f"轨迹中没有该请求（{provider} {key}）")
+        return random.choice(candidates)
+
+    def play(self, entry: dict, timeout: float) -> Tuple[str, Optional[dict]]:
+        """按录制的延迟等待后返回 (回答, 用量)；缩放后的延迟超过本次超时则按超时失败"""
+        delay = entry["l"] * self.time_scale
+        if delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"回放延迟 {delay:.1f}s 超过超时 {timeout:.1f}s")
+        time.sleep(delay)
+        if entry.get("e"):
+            kind, _, detail = entry["e"].partition(":")
+            raise _ERRORS.get(kind, RuntimeError)(detail)
+        return entry["r"], entry.get("u")
+
+
+_recorder: Optional[Recorder] = None
+_player: Optional[Player] = None
+_setup_lock = threading.Lock()
+
+
+def configure(mode: str = MODE, path: str = TRACE_FILE, time_scale: float = TIME_SCALE,
+              strict: bool = STRICT):
+    """切换模式（重复调用会关闭之前的录制文件）"""
+    if mode not in (LIVE, RECORD, REPLAY):
+        raise ValueError(f"未知的传输模式: {mode}")
+    with _setup_lock:
+        _configure(mode, path, time_scale, strict)
+
+
+def _configure(mode: str, path: str, time_scale: float, strict: bool):
+    """在 _setup_lock 内调用"""
+    global MODE, _recorder, _player
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = Recorder(path) if mode == RECORD else None
+    _player = Player(path, time_scale, strict) if mode == REPLAY else None
+    MODE = mode
+
+
+def offline() -> bool:
+    """回放模式不访问网络，也不需要 API 密钥"""
+    return MODE == REPLAY
+
+
+def borrowing() -> bool:
+    """非严格回放：回答可能来自其他请求，不能写入模组和共享缓存"""
+    return MODE == REPLAY and not (_player.strict if _player is not None else STRICT)
+
+
+def _ensure_configured():
+    """首次请求时按环境变量创建录制/回放对象；并发的首次请求只有一个会创建"""
+    if _recorder is not None or _player is not None:
+        return
+    with _setup_lock:
+        if MODE != LIVE and _recorder is None and _player is None:
+            _configure(MODE, TRACE_FILE, TIME_SCALE, STRICT)
+
+
+def exchange(provider: str, request: dict, timeout: float,
+             send: Callable[[float], Tuple[str, Optional[dict]]]) -> Tuple[str, Optional[dict]]:
+    """
+    发送一次请求
+    Args:
+        provider: 后端名称
+        request: 决定回答的请求内容（model、messages、参数），用于计算哈希
+        timeout: 本次超时秒数
+        send: 真正发送请求的函数，返回 (回答, 用量 dict)，失败时抛出异常
+    """
+    if MODE == LIVE:
+        return send(timeout)
+    _ensure_configured()
+    key = request_key(provider, request)
+    if _player is not None:
+        return _player.play(_player.lookup(provider, key), timeout)
+
+    chars = sum(len(m.get("content") or '') for m in request.get("messages", []))
+    started = time.monotonic()
+    try:
+        content, usage = send(timeout)
+    except Exception as e:
+        kind = type(e).__name__ if type(e).__name__ in _ERRORS else (
+            "TimeoutError" if "timeout" in type(e).__name__.lower() else type(e).__name__)
+        _recorder.write({"t": round(time.time(), 3), "p": provider, "k": key, "c": chars,
+                         "l": round(time.monotonic() - started, 3), "e": f"{kind}:{e}"})
+        raise
+    _recorder.write({"t": round(time.time(), 3), "p": provider, "k": key, "c": chars,
+                     "l": round(time.monotonic() - started, 3), "r": content, "u": usage})
+    return content, usage
+
+
+def summary() -> str:
+    if _recorder is not None:
+        return f"📼 已录制 {_recorder.count} 个请求到 {_recorder.path}"
+    if _player is not None:
+        return f"📼 回放命中 {_player.hits} 个请求，未录制 {_player.misses} 个"
+    return ""
+
+
+def trace_stats(path: str) -> Dict[str, dict]:
+    """按后端统计轨迹：请求数、错误数、延迟分位数和平均请求长度"""
+    groups: Dict[str, List[dict]] = defaultdict(list)
+    for entry in load_trace(path):
+        groups[entry["p"]].append(entry)
+    stats = {}
+    for provider, entries in groups.items():
+        latencies = sorted(e["l"] for e in entries if not e.get("e"))
+        stats[provider] = {
+            "requests": len(entries),
+            "errors": sum(1 for e in entries if e.get("e")),
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "chars": sum(e["c"] for e in entries) // len(entries),
+        }
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看模型请求轨迹")
+    parser.add_argument("trace", nargs="?", default=TRACE_FILE)
+    args = parser.parse_args()
+    for provider, entry in sorted(trace_stats(args.trace).items()):
+        print(
+            f"{provider}: {entry['requests']} 个请求，错误 {entry['errors']} 个，"
+            f"p50 {entry['p50']:.2f}s，p95 {entry['p95']:.2f}s，p99 {entry['p99']:.2f}s，"
+            f"平均 {entry['chars']} 字符"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Token 用量与费用统计
+功能：按请求记录各模型的 prompt/completion token 数，按运行、模型、模组汇总，
+并提供预算控制（接近上限时降速，超出时停止）和运行前的费用预估
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+# 各模型的参考价格（元 / 百万 tokens）和大致每分钟请求数
+# cached 为命中服务端前缀缓存的输入价格
+# 仅用于预估和预算控制，实际价格以服务商官网为准
+PRICE_TABLE: Dict[str, dict] = {
+    "glm": {"input": 0.5, "output": 0.5, "cached": 0.25, "rpm": 60},
+    "deepseek": {"input": 2.0, "output": 8.0, "cached": 0.5, "rpm": 60},
+    "qwen": {"input": 0.15, "output": 1.5, "cached": 0.06, "rpm": 120},
+    "gpt": {"input": 1.05, "output": 4.2, "cached": 0.525, "rpm": 30},
+}
+
+# 预估时假设每次回答的 token 数（约 20 个汉字）
+DEFAULT_OUTPUT_TOKENS = 40
+
+
+class BudgetExceeded(Exception):
+    """预算已用完"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数：中日韩字符约 1 token/字，其余约 4 字符/token"""
+    if not text:
+        return 0
+    cjk = sum(1 for char in text if '\u3000' <= char <= '\u9fff' or '\uf900' <= char <= '\uffef')
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def get_price(provider: str) -> dict:
+    """获取模型价格，未知模型按 0 计费"""
+    return PRICE_TABLE.get(provider.lower(), {"input": 0.0, "output": 0.0, "rpm": 60})
+
+
+def calc_cost(provider: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """根据价格表计算费用（元），cached_tokens 为 prompt_tokens 中命中缓存的部分"""
+    price = get_price(provider)
+    cached_price = price.get("cached", price["input"])
+    return ((prompt_tokens - cached_tokens) * price["input"] + cached_tokens * cached_price
+            + completion_tokens * price["output"]) / 1_000_000
+
+
+class TokenBudget:
+    """
+    token / 费用预算
+    用量超过 slow_ratio 后逐步降速，用完后抛出 BudgetExceeded
+    """
+
+    def __init__(self, max_tokens: int = 0, max_cost: float = 0.0,
+                 slow_ratio: float = 0.8, max_delay: float = 5.0):
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.slow_ratio = slow_ratio
+        self.max_delay = max_delay
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_tokens > 0 or self.max_cost > 0
+
+    def used_ratio(self, tokens: int, cost: float) -> float:
+        """返回已用预算比例（取 token 和费用中较高者）"""
+        ratios = [0.0]
+        if self.max_tokens > 0:
+            ratios.append(tokens / self.max_tokens)
+        if self.max_cost > 0:
+            ratios.append(cost / self.max_cost)
+        return max(ratios)
+
+    def throttle_delay(self, ratio: float) -> float:
+        """根据已用比例计算每次请求前的等待时间"""
+        if ratio <= self.slow_ratio:
+            return 0.0
+        return self.max_delay * (ratio - self.slow_ratio) / (1 - self.slow_ratio)
+
+
+class UsageTracker:
+    """线程安全的用量统计器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.budget = TokenBudget()
+        self.reset()
+
+    def reset(self):
+        """开始新一轮运行时清空统计"""
+        with self._lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.cached_tokens = 0
+            self.cache_hit_requests = 0
+            self.cost = 0.0
+            self.by_provider: Dict[str, dict] = {}
+            self.by_mod: Dict[str, dict] = {}
+
+    def set_budget(self, max_tokens: int = 0, max_cost: float = 0.0):
+        """设置本轮运行的预算，0 表示不限制"""
+        self.budget = TokenBudget(max_tokens=max_tokens, max_cost=max_cost)
+
+    def record(self, provider: str, prompt_tokens: int, completion_tokens: int, mod_id: str = "",
+               cached_tokens: int = 0):
+        """记录一次请求的用量，cached_tokens 为命中服务端前缀缓存的输入 token 数"""
+        cost = calc_cost(provider, prompt_tokens, completion_tokens, cached_tokens)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cached_tokens += cached_tokens
+            if cached_tokens:
+                self.cache_hit_requests += 1
+            self.cost += cost
+            targets = [self.by_provider.setdefault(provider, self._empty())]
+            if mod_id:
+                targets.append(self.by_mod.setdefault(mod_id, self._empty()))
+            for entry in targets:
+                entry["requests"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["cached_tokens"] += cached_tokens
+                entry["cost"] += cost
+
+    @staticmethod
+    def _empty() -> dict:
+        return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "cached_tokens": 0, "cost": 0.0}
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """前缀缓存命中率：命中缓存的输入 token 占全部输入 token 的比例"""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def check_budget(self):
+        """
+        请求前调用：预算将尽时等待一段时间降速，预算用完时抛出 BudgetExceeded
+        """
+        if not self.budget.enabled:
+            return
+        with self._lock:
+            ratio = self.budget.used_ratio(self.total_tokens, self.cost)
+        if ratio >= 1:
+            raise BudgetExceeded(
+                f"预算已用完：{self.total_tokens} tokens，{self.cost:.4f} 元"
+            )
+        delay = self.budget.throttle_delay(ratio)
+        if delay > 0:
+            time.sleep(delay)
+
+    def summary(self) -> str:
+        """生成本轮运行的用量摘要"""
+        with self._lock:
+            lines = [
+                f"💰 用量统计：请求 {self.requests} 次，"
+                f"输入 {self.prompt_tokens} tokens，输出 {self.completion_tokens} tokens，"
+                f"费用约 {self.cost:.4f} 元",
+                f"   前缀缓存：命中 {self.cached_tokens} tokens（{self.cache_hit_rate:.1%}），"
+                f"{self.cache_hit_requests}/{self.requests} 次请求命中"
+            ]
+            for provider, entry in self.by_provider.items():
+                lines.append(
+                    f"   {provider}: {entry['requests']} 次，"
+                    f"{entry['prompt_tokens']}+{entry['completion_tokens']} tokens，"
+                    f"{entry['cost']:.4f} 元"
+                )
+        return "\n".join(lines)
+
+
+def estimate_run(messages: List[str], system_prompt: str,
+                 providers: Optional[List[str]] = None,
+                 output_tokens: int = DEFAULT_OUTPUT_TOKENS) -> List[dict]:
+    """
+    运行前预估各模型的 token 数、费用和耗时
+    Args:
+        messages: 将要发送的用户消息列表
+        system_prompt: 系统提示词
+        providers: 参与比较的模型，默认为价格表中的全部模型
+        output_tokens: 每次回答的预估 token 数
+    Returns:
+        按费用从低到高排序的预估结果列表
+    """
+    prompt_tokens = sum(estimate_tokens(m) for m in messages)
+    prompt_tokens += estimate_tokens(system_prompt) * len(messages)
+    completion_tokens = output_tokens * len(messages)
+
+    results = []
+    for provider in providers or list(PRICE_TABLE):
+        rpm = get_price(provider)["rpm"]
+        results.append({
+            "provider": provider,
+            "requests": len(messages),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cost": calc_cost(provider, prompt_tokens, completion_tokens),
+            "minutes": len(messages) / rpm if rpm else 0.0,
+        })
+    results.sort(key=lambda r: r["cost"])
+    return results
+
+
+def cheapest_provider(estimates: List[dict], max_minutes: float = 0.0) -> Optional[str]:
+    """在预计耗时不超过 max_minutes 的模型中选出最便宜的（0 表示不限时）"""
+    for entry in estimates:
+        if max_minutes <= 0 or entry["minutes"] <= max_minutes:
+            return entry["provider"]
+    return None
@@ -0,0 +1,214 @@
+"""
+监视模式
+功能：长期运行，监视模组目录中新订阅或更新的模组。
+优先使用 watchdog（Linux 上基于 inotify，Windows 上基于 ReadDirectoryChangesW），
+未安装或监视数量超限时退回到低频轮询；事件经过防抖后只处理变化的 About.xml，
+Steam 覆盖了已翻译的 About.xml 而内容未变时直接写回中文名
+"""
+
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, List, Optional
+
+import mod_scanner
+import translation_pack
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+
+# 最后一次事件之后等待多久再处理（秒），Steam 更新时会连续写入很多文件
+DEBOUNCE_SECONDS = 5.0
+
+# 轮询模式下的检查间隔（秒）
+POLL_INTERVAL = 10.0
+
+# 已翻译名称的记录文件，Steam 覆盖 About.xml 后用它写回中文名
+MEMORY_FILE = "watch_memory.json"
+
+
+class NameMemory:
+    """packageId → {原文哈希, 译名}，持久化为 JSON"""
+
+    def __init__(self, path: str = MEMORY_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def update_from(self, folders: List[str]) -> int:
+        """从已翻译的模组读取译名，返回更新的条目数"""
+        count = 0
+        for folder in folders:
+            entry = translation_pack.read_translation(folder)
+            if entry:
+                with self._lock:
+                    self.entries[entry["p"] or entry["f"]] = {"h": entry["h"], "t": entry["t"]}
+                count += 1
+        return count
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self.entries, ensure_ascii=False)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+
+class ModWatcher:
+    """
+    监视模组目录，把发生变化的模组文件夹经防抖后批量交给 on_changes
+    """
+
+    def __init__(self, directory: str, on_changes: Callable[[List[str]], None],
+                 debounce: float = DEBOUNCE_SECONDS, poll_interval: float = POLL_INTERVAL,
+                 log: Callable[[str], None] = print):
+        self.directory = os.path.abspath(directory)
+        self.on_changes = on_changes
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.log = log
+        self.is_running = True
+        self._pending = set()
+        self._last_event = 0.0
+        self._cond = threading.Condition()
+        self._observer = None
+
+    def stop(self):
+        self.is_running = False
+        with self._cond:
+            self._cond.notify_all()
+
+    def notify(self, path: str):
+        """记录一个文件系统事件"""
+        folder = self._mod_of(path)
+        if folder is None:
+            return
+        with self._cond:
+            self._pending.add(folder)
+            self._last_event = time.monotonic()
+            self._cond.notify_all()
+
+    def _mod_of(self, path: str) -> Optional[str]:
+        """事件路径对应的模组文件夹；只关心新文件夹和 About.xml"""
+        rel = os.path.relpath(os.path.abspath(path), self.directory)
+        parts = rel.split(os.sep)
+        if rel.startswith('..') or not parts or parts[0] in ('', '.'):
+            return None
+        if len(parts) == 1 or (len(parts) >= 3 and parts[-2] == 'About' and parts[-1] == 'About.xml'):
+            return os.path.join(self.directory, parts[0])
+        return None
+
+    def _start_native(self) -> bool:
+        """启动 watchdog 监视，失败时返回 False"""
+        if not HAS_WATCHDOG:
+            return False
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                watcher.notify(event.src_path)
+                if getattr(event, 'dest_path', ''):
+                    watcher.notify(event.dest_path)
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(Handler(), self.directory, recursive=True)
+            self._observer.start()
+        except OSError as e:
+            self.log(f"⚠️ 文件系统监视启动失败（{e}），改用轮询")
+            self._observer = None
+            return False
+        return True
+
+    @staticmethod
+    def _stat(folder: str) -> Optional[tuple]:
+        try:
+            st = os.stat(os.path.join(folder, 'About', 'About.xml'))
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _snapshot(self) -> Dict[str, Optional[tuple]]:
+        snapshot = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    snapshot[entry.path] = self._stat(entry.path)
+        return snapshot
+
+    def _poll_loop(self):
+        """轮询模式：定期比较每个 About.xml 的修改时间和大小"""
+        previous = self._snapshot()
+        while self.is_running:
+            with self._cond:
+                self._cond.wait(self.poll_interval)
+            if not self.is_running:
+                break
+            current = self._snapshot()
+            for folder, stat in current.items():
+                if previous.get(folder) != stat:
+                    self.notify(folder)
+            previous = current
+
+    def run(self):
+        """阻塞运行，直到 stop() 被调用"""
+        if self._start_native():
+            self.log("👁️ 已启动文件系统事件监视")
+        else:
+            self.log(f"👁️ 已启动轮询监视（每 {self.poll_interval:.0f} 秒检查一次）")
+            threading.Thread(target=self._poll_loop, daemon=True).start()
+
+        try:
+            while self.is_running:
+                with self._cond:
+                    if not self._pending:
+                        self._cond.wait()
+                        continue
+                    quiet = time.monotonic() - self._last_event
+                    if quiet < self.debounce:
+                        self._cond.wait(self.debounce - quiet)
+                        continue
+                    folders, self._pending = sorted(self._pending), set()
+                self.on_changes(folders)
+        finally:
+            if self._observer is not None:
+                self._observer.stop()
+                self._observer.join()
+
+
+def classify_changes(folders: List[str], memory: NameMemory) -> tuple:
+    """
+    把变化的模组分为 (需要写回中文名的, 需要重新翻译的)
+    名称已是中文的（包括我们自己写入的）直接忽略
+    """
+    reapply, translate = [], []
+    for folder in folders:
+        try:
+            record = mod_scanner.extract_about(folder)
+        except (OSError, ET.ParseError, ValueError):
+            translate.append(folder)  # 交给翻译流程，扫描时会报告解析错误
+            continue
+        if record is None or mod_scanner.contains_chinese(record.name):
+            continue
+        remembered = memory.get(record.package_id or os.path.basename(folder))
+        if remembered and remembered["h"] == mod_scanner.content_hash(record.name, record.description):
+            reapply.append((folder, remembered["t"]))
+        else:
+            translate.append(folder)
+    return reapply, translate